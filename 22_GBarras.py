@@ -1,8 +1,10 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from figuras import figura
 import io
+from carga_datos import archivo_compartido, cargar_csv, exigir_bytes, hojas_excel, leer_excel
+from instrumentacion import etapa, iniciar_medicion, mostrar_tiempos
 
 # --- 1. Configuración de la Página y Estilos ---
 st.set_page_config(
@@ -11,6 +13,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_medicion(__file__)
 
 # --- INYECTAR CSS PARA PERSONALIZACIÓN COMPLETA ---
 st.markdown(
@@ -76,6 +79,76 @@ st.markdown(
 )
 # ---------------------------------------------------
 
+# --- Etapas: ingestión (en caché por archivo) -> agregación (en caché por columnas) -> gráfico (fragmento) ---
+# Cambiar la función, el Top N u 'Otros' solo vuelve a ejecutar el fragmento del gráfico.
+@etapa("cálculo", "agregación")
+@st.cache_data(max_entries=16, show_spinner=False)
+def resumir_por_categoria(id_archivo, hoja, label_col, value_col, _df):
+    resumen = _df.groupby(label_col, observed=True)[value_col].agg(['sum', 'count'])
+    resumen['mean'] = resumen['sum'] / resumen['count']
+    return resumen
+
+
+@st.fragment
+def mostrar_grafico(resumen, label_col, value_col):
+    from matplotlib import colormaps
+
+    st.subheader("Agregación")
+    col1, col2, col3 = st.columns(3)
+    agregaciones = {"Suma": "sum", "Promedio": "mean", "Conteo": "count"}
+    nombre_agregacion = col1.selectbox("Función para agrupar por categoría:", list(agregaciones))
+    funcion = agregaciones[nombre_agregacion]
+    top_n = col2.number_input("Número máximo de barras (Top N):", min_value=1, max_value=200, value=20, step=1)
+    agrupar_otros = col3.checkbox("Agrupar las categorías restantes en 'Otros'", value=True)
+
+    # --- Solo las Top N llegan al gráfico ---
+    top = resumen[funcion].nlargest(top_n)
+    top.index = top.index.astype(str)
+
+    resto = resumen[~resumen.index.astype(str).isin(top.index)]
+    if agrupar_otros and not resto.empty:
+        # El promedio de 'Otros' se pondera con los conteos, no es el promedio de los promedios
+        valor_otros = resto['sum'].sum() / resto['count'].sum() if funcion == 'mean' else resto[funcion].sum()
+        top = pd.concat([top, pd.Series({'Otros': valor_otros})])
+
+    processed_data = top.rename(value_col).rename_axis(label_col).reset_index()
+    st.subheader(f"Resultado: Gráfico de Barras para {value_col} ({nombre_agregacion})")
+    if len(resumen) > top_n:
+        st.caption(f"Se muestran las {top_n} categorías con mayor valor de un total de {len(resumen):,}.")
+
+    with figura(figsize=(11, 7)) as (fig, ax):
+        num_bars = len(processed_data)
+        posiciones = np.arange(num_bars)
+        colors = colormaps['viridis'](np.linspace(0.2, 0.8, num_bars))
+
+        # Una sola llamada a bar y una sola a bar_label, sin importar el número de filas del archivo
+        bars = ax.bar(posiciones, processed_data[value_col], color=colors)
+        etiquetas = [f'{v:.1%}' if (v < 1 and v > 0) else f'{v:,.0f}' for v in processed_data[value_col]]
+        ax.bar_label(bars, labels=etiquetas, fontsize=9, fontweight='bold')
+        ax.set_xticks(posiciones, processed_data[label_col], rotation=45, ha="right")
+
+        ax.set_ylabel(value_col)
+        ax.set_xlabel(label_col)
+        if not processed_data.empty:
+            ax.set_ylim(0, processed_data[value_col].max() * 1.15)
+
+        ax.set_title(f"Distribución de {value_col}", fontsize=16, fontweight='bold')
+        ax.grid(axis='y', linestyle='--', alpha=0.6)
+        fig.tight_layout()
+
+        st.pyplot(fig)
+
+        buf = io.BytesIO()
+        with etapa("exportación"):
+            fig.savefig(buf, format="png", dpi=300, bbox_inches='tight')
+        st.download_button(
+            label="📥 Descargar Gráfico",
+            data=buf.getvalue(),
+            file_name=f"{value_col.replace(' ', '_').lower()}_chart.png",
+            mime="image/png"
+        )
+
+
 # --- RESTO DEL CÓDIGO ---
 with st.sidebar:
     st.title("Fundamentos de Estadística")
@@ -87,19 +160,28 @@ with st.sidebar:
     
     st.header("1. Cargar Archivo de Datos")
     
-    uploaded_file = st.file_uploader(
+    uploaded_file = archivo_compartido(
         "Carga tu archivo (CSV o Excel)",
-        type=["csv", "xlsx"],
+        ["csv", "xlsx"],
         label_visibility="collapsed"
     )
     
     df = None
+    datos_excel = None
+    hoja = 0
     if uploaded_file is not None:
+        if not uploaded_file.name.endswith('.csv'):
+            exigir_bytes(uploaded_file)  # Las hojas de Excel se leen de los bytes, que la sesión no guarda
         try:
             if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file)
+                df = cargar_csv(uploaded_file)
             else:
-                df = pd.read_excel(uploaded_file)
+                datos_excel = uploaded_file.getvalue()
+                hojas = hojas_excel(datos_excel)
+                if len(hojas) > 1:
+                    hoja = st.selectbox("Selecciona la hoja del libro:", hojas)
+                # Para la vista previa y el mapeo de columnas bastan las primeras filas
+                df = leer_excel(datos_excel, hoja=hoja, nrows=5)
         except Exception as e:
             st.error(f"Error al leer el archivo: {e}")
 
@@ -120,47 +202,15 @@ if df is not None:
         label_col = st.selectbox("Selecciona la columna para las Etiquetas/Categorías:", columnas)
         value_col = st.selectbox("Selecciona la columna para los Valores (Numéricos):", columnas, index=1 if len(columnas) > 1 else 0)
 
-    if pd.api.types.is_numeric_dtype(df[value_col]):
-        
-        processed_data = df.groupby(label_col)[value_col].sum().reset_index()
-        fig, ax = plt.subplots(figsize=(11, 7))
-
-        st.subheader(f"Resultado: Gráfico de Barras para {value_col}")
-        
-        processed_data = processed_data.sort_values(by=value_col, ascending=False)
-        
-        num_bars = len(processed_data)
-        colors = plt.get_cmap('viridis')(np.linspace(0.2, 0.8, num_bars))
-        
-        bars = ax.bar(processed_data[label_col], processed_data[value_col], color=colors)
-        
-        for bar in bars:
-            height = bar.get_height()
-            label_text = f'{height:.1%}' if (height < 1 and height > 0) else f'{height:,.0f}'
-            
-            ax.text(bar.get_x() + bar.get_width() / 2, height, label_text,
-                    ha='center', va='bottom', fontsize=9, fontweight='bold')
+    if datos_excel is not None:
+        # De la hoja elegida solo se parsean las dos columnas mapeadas
+        df = leer_excel(datos_excel, hoja=hoja, usecols=list(dict.fromkeys([label_col, value_col])))
 
-        ax.set_ylabel(value_col)
-        ax.set_xlabel(label_col)
-        plt.xticks(rotation=45, ha="right")
-        if not processed_data.empty:
-            ax.set_ylim(0, processed_data[value_col].max() * 1.15)
-        
-        ax.set_title(f"Distribución de {value_col}", fontsize=16, fontweight='bold')
-        ax.grid(axis='y', linestyle='--', alpha=0.6)
-        fig.tight_layout()
-
-        st.pyplot(fig)
+    if pd.api.types.is_numeric_dtype(df[value_col]):
         
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png", dpi=300, bbox_inches='tight')
-        st.download_button(
-            label="📥 Descargar Gráfico",
-            data=buf.getvalue(),
-            file_name=f"{value_col.replace(' ', '_').lower()}_chart.png",
-            mime="image/png"
-        )
+        # --- Agregación: una fila por categoría, calculada una vez por archivo y par de columnas ---
+        resumen = resumir_por_categoria(uploaded_file.file_id, hoja, label_col, value_col, df)
+        mostrar_grafico(resumen, label_col, value_col)
         
     else:
         st.error(f"Error: La columna de valores ('{value_col}') no es numérica. Por favor, elige una columna con números.")
@@ -185,3 +235,6 @@ if uploaded_file is None:
         - Debe tener una **columna de encabezados** en la primera fila.
         - Asegúrate de tener al menos una columna con texto (categorías) y otra con números (valores).
         """)
+
+# --- Tiempos por Etapa (solo con MEDIR_ETAPAS=1) ---
+mostrar_tiempos()
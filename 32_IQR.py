@@ -3,8 +3,72 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from figuras import enlace_descarga, figura
 import io
+from carga_datos import archivo_compartido, cargar_csv
+from estadisticas import FACTOR_IQR, catalogo_columna, mostrar_precalculo, precalcular
+from graficos_interactivos import diagrama_caja, elegir_motor_graficos
+from instrumentacion import etapa, iniciar_medicion, mostrar_tiempos
+
+# Etapas: ingestión (cargar_csv, en caché por archivo) -> cálculo (catálogo de estadísticos por columna, estadisticas.py) -> presentación (fragmento).
+# Cambiar el color solo vuelve a ejecutar el fragmento del diagrama. El fragmento se llama en la
+# barra lateral, donde quedan sus controles, y dibuja el gráfico y su descarga en `espacio` (un st.empty del panel principal).
+@st.fragment
+def mostrar_diagrama(espacio, datos, columna, Q1, mediana, Q3, IQR, outliers, usar_plotly=False):
+    color = st.color_picker("Elige un color para la caja:", value='#A9CCE3')
+
+    if usar_plotly:
+        # Al navegador solo viajan los cuartiles, los extremos de los bigotes y los outliers
+        dentro = datos[datos.between(Q1 - FACTOR_IQR * IQR, Q3 + FACTOR_IQR * IQR)]
+        espacio.plotly_chart(diagrama_caja(Q1, mediana, Q3, dentro.min(), dentro.max(), outliers, color,
+                                           f'Distribución de {columna}', columna), use_container_width=True)
+        return
+
+    with figura(figsize=(12, 4)) as (fig, ax):
+
+        # 1. Dibujar el Boxplot. flierprops=dict(marker='') para ocultar los outliers por defecto de matplotlib
+        box = ax.boxplot(datos, vert=False, patch_artist=True, widths=0.6, whis=FACTOR_IQR,
+                         boxprops=dict(facecolor=color, linewidth=2),
+                         medianprops=dict(color='cyan', linewidth=3),
+                         whiskerprops=dict(linewidth=2),
+                         capprops=dict(linewidth=2),
+                         flierprops=dict(marker='')) # Ocultamos los outliers automáticos
+
+        # --- NUEVA SECCIÓN: Dibujar los puntos de datos ---
+        # Usamos un 'jitter' vertical para que los puntos no se solapen perfectamente
+        y_jitter = np.random.normal(1, 0.04, size=len(datos))
+
+        # Separar outliers de los datos normales para colorearlos diferente
+        datos_normales = [d for d in datos if d not in outliers]
+        y_jitter_normales = y_jitter[:len(datos_normales)] # Asegurar misma longitud
+
+        # Dibujar puntos normales en verde
+        ax.scatter(datos_normales, y_jitter_normales, color='green', s=50, alpha=0.6, zorder=3, label='Datos Normales')
+        # Dibujar outliers en rojo
+        if outliers:
+            ax.scatter(outliers, np.full(len(outliers), 1), color='blue', s=80, zorder=4, edgecolor='black', label='Outliers')
+
+        # Anotaciones
+        ax.annotate(f'Q1={Q1:.2f}', xy=(Q1, 0.7), xytext=(0, -40), textcoords='offset points', ha='center', arrowprops=dict(arrowstyle="->", color='blue'))
+        ax.annotate(f'Mediana={mediana:.2f}', xy=(mediana, 0.7), xytext=(0, -30), textcoords='offset points', ha='center', arrowprops=dict(arrowstyle="->", color='blue'))
+        ax.annotate(f'Q3={Q3:.2f}', xy=(Q3, 0.7), xytext=(0, -40), textcoords='offset points', ha='center', arrowprops=dict(arrowstyle="->", color='blue'))
+        ax.annotate(f'IQR = {IQR:.2f}', xy=((Q1+Q3)/2, 1.4), ha='center', va='center', fontsize=12, fontweight='bold', color='darkgreen')
+
+        # Personalización
+        ax.set_title(f'Distribución de {columna}', fontsize=16, fontweight='bold')
+        ax.set_xlabel('Valores', fontsize=12)
+        ax.set_yticks([])
+        ax.grid(axis='x', linestyle='--', alpha=0.6)
+
+        # --- Botón de descarga ---
+        buf = io.BytesIO()
+        with etapa("exportación"):
+            fig.savefig(buf, format="png", bbox_inches='tight')
+        # La descarga va con el gráfico, en el panel principal (el fragmento corre en la barra lateral)
+        with espacio.container():
+            enlace_descarga(buf.getvalue(), f"boxplot_iqr_{columna}.png")
+            st.pyplot(fig)
+
 
 # --- 1. Configuración de la Página ---
 st.set_page_config(
@@ -13,6 +77,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_medicion(__file__)
 
 # --- 2. Barra Lateral con Controles ---
 with st.sidebar:
@@ -25,14 +90,14 @@ with st.sidebar:
     st.markdown("---")
     
     st.header("1. Cargar Datos")
-    uploaded_file = st.file_uploader("Sube un archivo CSV", type="csv", label_visibility="collapsed")
+    uploaded_file = archivo_compartido("Sube un archivo CSV", "csv", label_visibility="collapsed")
     
     df = None
     columna = None
-    color = '#A9CCE3'
+    usar_plotly = False
 
     if uploaded_file:
-        df = pd.read_csv(uploaded_file)
+        df = cargar_csv(uploaded_file)
         st.header("2. Seleccionar Variable y Opciones")
         numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
         
@@ -40,7 +105,11 @@ with st.sidebar:
             st.error("El archivo no contiene columnas numéricas."); st.stop()
         
         columna = st.selectbox("Elige la columna para analizar:", options=numeric_cols)
-        color = st.color_picker("Elige un color para la caja:", value='#A9CCE3')
+        controles_grafico = st.container()  # Aquí se dibujan los controles del fragmento del diagrama
+        usar_plotly = elegir_motor_graficos()
+
+        # Los estadísticos de todas las columnas se calculan en segundo plano, en el orden del selector
+        mostrar_precalculo(precalcular(df.attrs["huella"], tuple(numeric_cols), df))
 
 # --- 3. Panel Principal ---
 st.title("📦Rango Intercuartílico (IQR)")
@@ -65,13 +134,12 @@ if datos.empty or not pd.api.types.is_numeric_dtype(datos):
     st.warning("La columna seleccionada no tiene datos numéricos válidos.")
 else:
     # --- Cálculo de Estadísticas Clave ---
-    Q1 = np.percentile(datos, 25)
-    mediana = np.median(datos)
-    Q3 = np.percentile(datos, 75)
-    IQR = Q3 - Q1
-    lim_inf = Q1 - 1.5 * IQR
-    lim_sup = Q3 + 1.5 * IQR
-    outliers = [x for x in datos if x < lim_inf or x > lim_sup]
+    # La mediana, los cuartiles y los outliers salen del mismo arreglo ordenado del catálogo
+    with etapa("cálculo"):
+        catalogo = catalogo_columna(df.attrs["huella"], columna, datos)
+        Q1, mediana, Q3, IQR, lim_inf, lim_sup, outliers = (
+            catalogo[nombre] for nombre in ("q1", "mediana", "q3", "iqr", "limite_inferior", "limite_superior", "outliers")
+        )
     
     # --- Mostrar las métricas ---
     st.subheader("Medidas de Posición y Dispersión")
@@ -91,51 +159,9 @@ else:
 
     # --- Visualización ---
     st.subheader("Diagrama de Caja y Bigotes Detallado")
-    
-    fig, ax = plt.subplots(figsize=(12, 4))
-    
-    # 1. Dibujar el Boxplot. flierprops=dict(marker='') para ocultar los outliers por defecto de matplotlib
-    box = ax.boxplot(datos, vert=False, patch_artist=True, widths=0.6,
-                     boxprops=dict(facecolor=color, linewidth=2),
-                     medianprops=dict(color='cyan', linewidth=3),
-                     whiskerprops=dict(linewidth=2),
-                     capprops=dict(linewidth=2),
-                     flierprops=dict(marker='')) # Ocultamos los outliers automáticos
-
-    # --- NUEVA SECCIÓN: Dibujar los puntos de datos ---
-    # Usamos un 'jitter' vertical para que los puntos no se solapen perfectamente
-    y_jitter = np.random.normal(1, 0.04, size=len(datos))
-    
-    # Separar outliers de los datos normales para colorearlos diferente
-    datos_normales = [d for d in datos if d not in outliers]
-    y_jitter_normales = y_jitter[:len(datos_normales)] # Asegurar misma longitud
-    
-    # Dibujar puntos normales en verde
-    ax.scatter(datos_normales, y_jitter_normales, color='green', s=50, alpha=0.6, zorder=3, label='Datos Normales')
-    # Dibujar outliers en rojo
-    if outliers:
-        ax.scatter(outliers, np.full(len(outliers), 1), color='blue', s=80, zorder=4, edgecolor='black', label='Outliers')
-
-    # Anotaciones
-    ax.annotate(f'Q1={Q1:.2f}', xy=(Q1, 0.7), xytext=(0, -40), textcoords='offset points', ha='center', arrowprops=dict(arrowstyle="->", color='blue'))
-    ax.annotate(f'Mediana={mediana:.2f}', xy=(mediana, 0.7), xytext=(0, -30), textcoords='offset points', ha='center', arrowprops=dict(arrowstyle="->", color='blue'))
-    ax.annotate(f'Q3={Q3:.2f}', xy=(Q3, 0.7), xytext=(0, -40), textcoords='offset points', ha='center', arrowprops=dict(arrowstyle="->", color='blue'))
-    ax.annotate(f'IQR = {IQR:.2f}', xy=((Q1+Q3)/2, 1.4), ha='center', va='center', fontsize=12, fontweight='bold', color='darkgreen')
-
-    # Personalización
-    ax.set_title(f'Distribución de {columna}', fontsize=16, fontweight='bold')
-    ax.set_xlabel('Valores', fontsize=12)
-    ax.set_yticks([])
-    ax.grid(axis='x', linestyle='--', alpha=0.6)
-    
-    # --- Botón de descarga ---
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", bbox_inches='tight')
-    st.download_button(
-        label="📥 Descargar Gráfico",
-        data=buf,
-        file_name=f"boxplot_iqr_{columna}.png",
-        mime="image/png"
-    )
-    
-    st.pyplot(fig)
+    espacio_grafico = st.empty()
+    with controles_grafico:
+        mostrar_diagrama(espacio_grafico, datos, columna, Q1, mediana, Q3, IQR, outliers, usar_plotly)
+
+# --- Tiempos por Etapa (solo con MEDIR_ETAPAS=1) ---
+mostrar_tiempos()
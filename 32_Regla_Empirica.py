@@ -3,9 +3,69 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+from figuras import enlace_descarga, figura
 import io
+from carga_datos import archivo_compartido, cargar_csv
+from estadisticas import catalogo_columna, mostrar_precalculo, precalcular
+from graficos_interactivos import elegir_motor_graficos, histograma
+from instrumentacion import etapa, iniciar_medicion, mostrar_tiempos
+
+# La curva de densidad del gráfico interactivo se estima con una muestra de este tamaño
+MUESTRA_KDE = 10_000
+
+
+# Etapas: ingestión (cargar_csv, en caché por archivo) -> cálculo (catálogo de estadísticos por columna, estadisticas.py) -> presentación (fragmento).
+# Cambiar el color solo vuelve a ejecutar el fragmento del histograma. El fragmento se llama en la
+# barra lateral, donde quedan sus controles, y dibuja el gráfico y su descarga en `espacio` (un st.empty del panel principal).
+@st.fragment
+def mostrar_histograma(espacio, datos, columna, media, desviacion_estandar, usar_plotly=False):
+    color = st.color_picker("Elige un color para el histograma:", value='#6495ED') # Color "Cornflower Blue"
+
+    if usar_plotly:
+        from scipy.stats import gaussian_kde
+
+        # Al navegador solo viajan los conteos por bin, la curva de densidad evaluada y las líneas
+        frecuencias, bins = np.histogram(datos, bins='auto')
+        muestra = datos.sample(min(len(datos), MUESTRA_KDE), random_state=0)
+        x_curva = np.linspace(bins[0], bins[-1], 200)
+        curva = (x_curva, gaussian_kde(muestra)(x_curva) * len(datos) * np.diff(bins).mean()) if muestra.nunique() > 1 else None
+        espacio.plotly_chart(histograma(frecuencias, bins, color, f'Distribución de {columna}', columna, curva=curva, lineas=[
+            dict(x=media, color='red', estilo='dashed', nombre=f'Media = {media:.2f}'),
+            dict(x=media - desviacion_estandar, color='orange', estilo='dotted', nombre=f'±1 DE ({desviacion_estandar:.2f})'),
+            dict(x=media + desviacion_estandar, color='orange', estilo='dotted'),
+            dict(x=media - 2 * desviacion_estandar, color='green', estilo='dotted', nombre='±2 DE'),
+            dict(x=media + 2 * desviacion_estandar, color='green', estilo='dotted'),
+        ]), use_container_width=True)
+        return
+
+    import seaborn as sns
+
+    with figura(figsize=(10, 5)) as (fig, ax):
+        # Usamos Seaborn para añadir la curva de densidad (KDE) fácilmente
+        sns.histplot(datos, bins='auto', kde=True, color=color, edgecolor='black', ax=ax)
+
+        # --- Añadir las líneas verticales ---
+        ax.axvline(media, color='red', linestyle='dashed', linewidth=2, label=f'Media = {media:.2f}')
+        ax.axvline(media - desviacion_estandar, color='orange', linestyle='dotted', linewidth=2, label=f'±1 DE ({desviacion_estandar:.2f})')
+        ax.axvline(media + desviacion_estandar, color='orange', linestyle='dotted', linewidth=2)
+        ax.axvline(media - 2 * desviacion_estandar, color='green', linestyle='dotted', linewidth=2, label=f'±2 DE')
+        ax.axvline(media + 2 * desviacion_estandar, color='green', linestyle='dotted', linewidth=2)
+
+        ax.set_title(f'Distribución de {columna}')
+        ax.set_xlabel(columna)
+        ax.set_ylabel('Frecuencia')
+        ax.legend()
+        ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+        # --- Botón de descarga ---
+        buf = io.BytesIO()
+        with etapa("exportación"):
+            fig.savefig(buf, format="png")
+        # La descarga va con el gráfico, en el panel principal (el fragmento corre en la barra lateral)
+        with espacio.container():
+            enlace_descarga(buf.getvalue(), f"histograma_regla_empirica_{columna}.png")
+            st.pyplot(fig)
+
 
 # --- 1. Configuración de la Página ---
 st.set_page_config(
@@ -14,6 +74,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_medicion(__file__)
 
 # --- 2. Barra Lateral con Controles ---
 with st.sidebar:
@@ -26,14 +87,14 @@ with st.sidebar:
     st.markdown("---")
     
     st.header("1. Cargar Datos")
-    uploaded_file = st.file_uploader("Sube un archivo CSV", type="csv", label_visibility="collapsed")
+    uploaded_file = archivo_compartido("Sube un archivo CSV", "csv", label_visibility="collapsed")
     
     df = None
     columna = None
-    color = '#6495ED' # Color "Cornflower Blue"
+    usar_plotly = False
 
     if uploaded_file:
-        df = pd.read_csv(uploaded_file)
+        df = cargar_csv(uploaded_file)
         
         st.header("2. Seleccionar Variable y Opciones")
         numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
@@ -42,7 +103,11 @@ with st.sidebar:
             st.error("El archivo no contiene columnas numéricas."); st.stop()
         
         columna = st.selectbox("Elige la columna a analizar:", options=numeric_cols)
-        color = st.color_picker("Elige un color para el histograma:", value='#6495ED')
+        controles_grafico = st.container()  # Aquí se dibujan los controles del fragmento del histograma
+        usar_plotly = elegir_motor_graficos()
+
+        # Los estadísticos de todas las columnas se calculan en segundo plano, en el orden del selector
+        mostrar_precalculo(precalcular(df.attrs["huella"], tuple(numeric_cols), df))
 
 # --- 3. Panel Principal ---
 st.title("🔔 Visualizador de la Regla Empírica (68-95-99.7)")
@@ -67,19 +132,11 @@ if datos.empty or not pd.api.types.is_numeric_dtype(datos):
     st.warning("La columna seleccionada no tiene datos numéricos válidos.")
 else:
     # --- Cálculo de Estadísticas ---
-    media = datos.mean()
-    desviacion_estandar = datos.std() # Desviación estándar muestral
-    total_datos = len(datos)
-    
-    # Calcular rangos
-    rango_1_min, rango_1_max = media - desviacion_estandar, media + desviacion_estandar
-    rango_2_min, rango_2_max = media - 2 * desviacion_estandar, media + 2 * desviacion_estandar
-    rango_3_min, rango_3_max = media - 3 * desviacion_estandar, media + 3 * desviacion_estandar
-    
-    # Calcular porcentajes reales de datos dentro de cada rango
-    porc_1_de = datos.between(rango_1_min, rango_1_max).mean() * 100
-    porc_2_de = datos.between(rango_2_min, rango_2_max).mean() * 100
-    porc_3_de = datos.between(rango_3_min, rango_3_max).mean() * 100
+    with etapa("cálculo"):
+        catalogo = catalogo_columna(df.attrs["huella"], columna, datos)
+        media, desviacion_estandar = catalogo["media"], catalogo["desviacion"]
+        porcentajes, resumen = catalogo["porcentajes_regla_empirica"], catalogo.resumen(columna)
+        porc_1_de, porc_2_de, porc_3_de = porcentajes
     
     # --- Mostrar las métricas ---
     st.subheader("Resultados del Análisis")
@@ -100,37 +157,15 @@ else:
 
     with tab_grafico:
         st.subheader("Histograma con Media y Desviaciones Estándar")
-        
-        fig, ax = plt.subplots(figsize=(10, 5))
-        # Usamos Seaborn para añadir la curva de densidad (KDE) fácilmente
-        sns.histplot(datos, bins='auto', kde=True, color=color, edgecolor='black', ax=ax)
-        
-        # --- Añadir las líneas verticales ---
-        ax.axvline(media, color='red', linestyle='dashed', linewidth=2, label=f'Media = {media:.2f}')
-        ax.axvline(rango_1_min, color='orange', linestyle='dotted', linewidth=2, label=f'±1 DE ({desviacion_estandar:.2f})')
-        ax.axvline(rango_1_max, color='orange', linestyle='dotted', linewidth=2)
-        ax.axvline(rango_2_min, color='green', linestyle='dotted', linewidth=2, label=f'±2 DE')
-        ax.axvline(rango_2_max, color='green', linestyle='dotted', linewidth=2)
-        
-        ax.set_title(f'Distribución de {columna}')
-        ax.set_xlabel(columna)
-        ax.set_ylabel('Frecuencia')
-        ax.legend()
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        # --- Botón de descarga ---
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png")
-        st.download_button(
-            label="📥 Descargar Gráfico",
-            data=buf,
-            file_name=f"histograma_regla_empirica_{columna}.png",
-            mime="image/png"
-        )
-        st.pyplot(fig)
+        espacio_grafico = st.empty()
+    with controles_grafico:
+        mostrar_histograma(espacio_grafico, datos, columna, media, desviacion_estandar, usar_plotly)
 
     with tab_datos:
         st.subheader("Resumen Estadístico Completo")
-        stats_csv = datos.describe().to_csv().encode('utf-8')
+        stats_csv = resumen.to_csv().encode('utf-8')
         st.download_button("📥 Descargar Estadísticas (CSV)", data=stats_csv, file_name=f"estadisticas_{columna}.csv", mime="text/csv")
-        st.dataframe(datos.describe())
\ No newline at end of file
+        st.dataframe(resumen)
+
+# --- Tiempos por Etapa (solo con MEDIR_ETAPAS=1) ---
+mostrar_tiempos()
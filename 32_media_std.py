@@ -2,8 +2,9 @@
 
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
+from figuras import figura
 import seaborn as sns
+from instrumentacion import etapa, iniciar_medicion, mostrar_tiempos
 
 # --- 1. Configuración de la Página ---
 st.set_page_config(
@@ -12,6 +13,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_medicion(__file__)
 
 # --- 2. Barra Lateral con Controles (Formato Consistente) ---
 with st.sidebar:
@@ -61,35 +63,39 @@ st.markdown("---")
 st.header("Visualización de la Distribución")
 
 # Generar datos aleatorios basados en los sliders
-np.random.seed(42)
-datos_generados = np.random.normal(
-    loc=media_seleccionada,
-    scale=de_seleccionada,
-    size=1000
-)
+with etapa("cálculo"):
+    np.random.seed(42)
+    datos_generados = np.random.normal(
+        loc=media_seleccionada,
+        scale=de_seleccionada,
+        size=1000
+    )
 
 # Crear el gráfico
-fig, ax = plt.subplots(figsize=(10, 5))
-sns.histplot(datos_generados, bins=30, kde=True, color='dodgerblue', edgecolor='black', ax=ax)
+with figura(figsize=(10, 5)) as (fig, ax):
+    sns.histplot(datos_generados, bins=30, kde=True, color='dodgerblue', edgecolor='black', ax=ax)
 
-# Añadir las líneas verticales
-ax.axvline(media_seleccionada, color='red', linestyle='dashed', linewidth=2.5, label=f'Media = {media_seleccionada:.2f}')
-ax.axvline(media_seleccionada + de_seleccionada, color='green', linestyle='dotted', linewidth=2, label=f'±1 DE ({de_seleccionada:.2f})')
-ax.axvline(media_seleccionada - de_seleccionada, color='green', linestyle='dotted', linewidth=2)
+    # Añadir las líneas verticales
+    ax.axvline(media_seleccionada, color='red', linestyle='dashed', linewidth=2.5, label=f'Media = {media_seleccionada:.2f}')
+    ax.axvline(media_seleccionada + de_seleccionada, color='green', linestyle='dotted', linewidth=2, label=f'±1 DE ({de_seleccionada:.2f})')
+    ax.axvline(media_seleccionada - de_seleccionada, color='green', linestyle='dotted', linewidth=2)
 
-# Personalización del Gráfico
-ax.set_title("Histograma de Datos Generados", fontsize=16)
-ax.set_xlabel("Valores", fontsize=12)
-ax.set_ylabel("Frecuencia", fontsize=12)
-ax.set_xlim(0, 100) # Mantener el eje X fijo
-ax.legend()
-ax.grid(axis='y', linestyle='--', alpha=0.7)
+    # Personalización del Gráfico
+    ax.set_title("Histograma de Datos Generados", fontsize=16)
+    ax.set_xlabel("Valores", fontsize=12)
+    ax.set_ylabel("Frecuencia", fontsize=12)
+    ax.set_xlim(0, 100) # Mantener el eje X fijo
+    ax.legend()
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
 
-# Mostrar el gráfico en Streamlit
-st.pyplot(fig)
+    # Mostrar el gráfico en Streamlit
+    st.pyplot(fig)
 
 # Mostrar un resumen
 st.subheader("Parámetros Actuales")
 col1, col2 = st.columns(2)
 col1.metric("Media Seleccionada (μ)", f"{media_seleccionada:.2f}")
 col2.metric("DE Seleccionada (σ)", f"{de_seleccionada:.2f}")
+
+# --- Tiempos por Etapa (solo con MEDIR_ETAPAS=1) ---
+mostrar_tiempos()
@@ -3,8 +3,58 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from figuras import enlace_descarga, figura
 import io
+from carga_datos import archivo_compartido, cargar_csv
+from estadisticas import catalogo_columna, mostrar_precalculo, precalcular
+from graficos_interactivos import elegir_motor_graficos, histograma
+from instrumentacion import etapa, iniciar_medicion, mostrar_tiempos
+
+
+# Etapas: ingestión (cargar_csv, en caché por archivo) -> cálculo (catálogo de estadísticos por columna, estadisticas.py) -> presentación (fragmento).
+# Cambiar el color solo vuelve a ejecutar el fragmento del histograma. El fragmento se llama en la
+# barra lateral, donde quedan sus controles, y dibuja el gráfico y su descarga en `espacio` (un st.empty del panel principal).
+@st.fragment
+def mostrar_histograma(espacio, datos, columna, media, desviacion_estandar, usar_plotly=False):
+    color = st.color_picker(
+        "Elige un color para el histograma:",
+        value='#0288d1' # Un color azul diferente para esta app
+    )
+
+    if usar_plotly:
+        # Al navegador solo viajan los conteos por bin y las posiciones de las líneas
+        frecuencias, bins = np.histogram(datos, bins='auto')
+        espacio.plotly_chart(histograma(frecuencias, bins, color, f'Distribución de {columna}', columna, lineas=[
+            dict(x=media, color='red', estilo='dashed', nombre=f'Media = {media:.2f}'),
+            dict(x=media + desviacion_estandar, color='green', estilo='dotted', nombre=f'+1 DE ({media + desviacion_estandar:.2f})'),
+            dict(x=media - desviacion_estandar, color='green', estilo='dotted', nombre=f'-1 DE ({media - desviacion_estandar:.2f})'),
+        ]), use_container_width=True)
+        return
+
+    with figura(figsize=(10, 5)) as (fig, ax):
+        ax.hist(datos, bins='auto', edgecolor='black', alpha=0.7, color=color)
+
+        # --- Añadir las líneas verticales ---
+        ax.axvline(media, color='red', linestyle='dashed', linewidth=2.5, label=f'Media = {media:.2f}')
+        ax.axvline(media + desviacion_estandar, color='green', linestyle='dotted', linewidth=2, label=f'+1 DE ({media + desviacion_estandar:.2f})')
+        ax.axvline(media - desviacion_estandar, color='green', linestyle='dotted', linewidth=2, label=f'-1 DE ({media - desviacion_estandar:.2f})')
+
+        # Personalizar
+        ax.set_title(f'Distribución de {columna}')
+        ax.set_xlabel(columna)
+        ax.set_ylabel('Frecuencia')
+        ax.legend()
+        ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+        # --- Botón de descarga ---
+        buf = io.BytesIO()
+        with etapa("exportación"):
+            fig.savefig(buf, format="png")
+        # La descarga va con el gráfico, en el panel principal (el fragmento corre en la barra lateral)
+        with espacio.container():
+            enlace_descarga(buf.getvalue(), f"histograma_dispersion_{columna}.png")
+            st.pyplot(fig)
+
 
 # --- 1. Configuración de la Página ---
 st.set_page_config(
@@ -13,6 +63,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_medicion(__file__)
 
 # --- 2. Barra Lateral con Controles ---
 with st.sidebar:
@@ -25,14 +76,14 @@ with st.sidebar:
     st.markdown("---")
     
     st.header("1. Cargar Datos")
-    uploaded_file = st.file_uploader("Sube un archivo CSV", type="csv", label_visibility="collapsed")
+    uploaded_file = archivo_compartido("Sube un archivo CSV", "csv", label_visibility="collapsed")
     
     df = None
     columna = None
-    color = '#0288d1' # Un color azul diferente para esta app
+    usar_plotly = False
 
     if uploaded_file:
-        df = pd.read_csv(uploaded_file)
+        df = cargar_csv(uploaded_file)
         
         st.header("2. Seleccionar Variable y Opciones")
         numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
@@ -45,11 +96,11 @@ with st.sidebar:
             "Elige la columna para analizar:",
             options=numeric_cols
         )
-        
-        color = st.color_picker(
-            "Elige un color para el histograma:",
-            value='#0288d1'
-        )
+        controles_grafico = st.container()  # Aquí se dibujan los controles del fragmento del histograma
+        usar_plotly = elegir_motor_graficos()
+
+        # Los estadísticos de todas las columnas se calculan en segundo plano, en el orden del selector
+        mostrar_precalculo(precalcular(df.attrs["huella"], tuple(numeric_cols), df))
 
 # --- 3. Panel Principal ---
 st.title("📏 Análisis de Media y Desviación Estándar")
@@ -76,8 +127,9 @@ if datos.empty or not pd.api.types.is_numeric_dtype(datos):
     st.warning("La columna seleccionada no contiene datos numéricos válidos.")
 else:
     # --- Cálculo de Media y Desviación Estándar ---
-    media = datos.mean()
-    desviacion_estandar = datos.std()
+    with etapa("cálculo"):
+        catalogo = catalogo_columna(df.attrs["huella"], columna, datos)
+        media, desviacion_estandar, resumen = catalogo["media"], catalogo["desviacion"], catalogo.resumen(columna)
     
     # --- Mostrar las métricas ---
     col1, col2 = st.columns(2)
@@ -91,42 +143,21 @@ else:
 
     with tab_grafico:
         st.subheader(f"Histograma con Media y +/- 1 Desviación Estándar")
-        
-        fig, ax = plt.subplots(figsize=(10, 5))
-        ax.hist(datos, bins='auto', edgecolor='black', alpha=0.7, color=color)
-        
-        # --- Añadir las líneas verticales ---
-        ax.axvline(media, color='red', linestyle='dashed', linewidth=2.5, label=f'Media = {media:.2f}')
-        ax.axvline(media + desviacion_estandar, color='green', linestyle='dotted', linewidth=2, label=f'+1 DE ({media + desviacion_estandar:.2f})')
-        ax.axvline(media - desviacion_estandar, color='green', linestyle='dotted', linewidth=2, label=f'-1 DE ({media - desviacion_estandar:.2f})')
-        
-        # Personalizar
-        ax.set_title(f'Distribución de {columna}')
-        ax.set_xlabel(columna)
-        ax.set_ylabel('Frecuencia')
-        ax.legend()
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        # --- Botón de descarga ---
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png")
-        st.download_button(
-            label="📥 Descargar Gráfico",
-            data=buf,
-            file_name=f"histograma_dispersion_{columna}.png",
-            mime="image/png"
-        )
-        
-        st.pyplot(fig)
+        espacio_grafico = st.empty()
+    with controles_grafico:
+        mostrar_histograma(espacio_grafico, datos, columna, media, desviacion_estandar, usar_plotly)
 
     with tab_datos:
         st.subheader("Resumen Estadístico Completo")
         
-        stats_csv = datos.describe().to_csv().encode('utf-8')
+        stats_csv = resumen.to_csv().encode('utf-8')
         st.download_button(
             label="📥 Descargar Estadísticas (CSV)",
             data=stats_csv,
             file_name=f"estadisticas_{columna}.csv",
             mime="text/csv"
         )
-        st.dataframe(datos.describe())
\ No newline at end of file
+        st.dataframe(resumen)
+
+# --- Tiempos por Etapa (solo con MEDIR_ETAPAS=1) ---
+mostrar_tiempos()
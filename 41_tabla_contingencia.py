@@ -1,10 +1,92 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import io
-from scipy.stats import chi2_contingency
+from carga_datos import archivo_compartido, cargar_csv, describir_ahorro, exigir_bytes, leer_muestra_csv
+from figuras import figura, liberar
+from graficos_interactivos import elegir_motor_graficos, mapa_calor
+from contingencia import (chi2_disperso, conteos_contingencia, contingencia_por_bloques, factorizar, frecuencias_esperadas,
+                          matriz_asociacion, matriz_cuadrada, normalizar, prueba_permutacion, tabla_desde_conteos,
+                          tabla_top_k)
+from trabajos import gestor, enviar_trabajo, resultado_o_esperar
+from instrumentacion import etapa, iniciar_medicion, mostrar_tiempos
+
+# Archivos a partir de este tamaño se leen por bloques por defecto
+UMBRAL_BLOQUES = 500 * 1024 * 1024  # 500 MB
+FILAS_MUESTRA = 1000
+# Con más celdas que esto la tabla se trata como dispersa y solo se muestran las categorías más frecuentes
+LIMITE_CELDAS_TABLA = 250_000
+TOP_K_TABLA = 50
+TOP_K_HEATMAP = 20
+MAX_CELDAS_ANOTADAS = 400
+
+
+# Etapas: ingestión (cargar_csv, en caché por archivo) -> cálculo (en caché por archivo y variables;
+# permutación y matriz de asociación como trabajos en segundo plano) -> presentación (fragmentos).
+# Mover α solo vuelve a ejecutar el fragmento que lo usa. El fragmento se llama en la barra lateral,
+# donde queda el control de α, y escribe sus resultados en `espacio` (un st.empty del panel principal).
+@etapa("cálculo", "conteos")
+@st.cache_data(max_entries=16, show_spinner="Contando combinaciones...")
+def conteos_cacheados(id_archivo, columna_filas, columna_columnas, por_bloques, _fuente):
+    if por_bloques:
+        _fuente.seek(0)
+        return contingencia_por_bloques(_fuente, columna_filas, columna_columnas, limite_denso=LIMITE_CELDAS_TABLA)
+    return conteos_contingencia(_fuente[columna_filas], _fuente[columna_columnas], limite_denso=LIMITE_CELDAS_TABLA)
+
+
+@etapa("cálculo", "chi-cuadrado")
+@st.cache_data(max_entries=16, show_spinner=False)
+def prueba_chi2_cacheada(id_archivo, columna_filas, columna_columnas, por_bloques, _conteos, _tabla, tabla_grande):
+    if tabla_grande:
+        # Se calcula desde las celdas no vacías y los totales, sin la matriz de esperadas completa
+        chi2, p_value, dof = chi2_disperso(_conteos)
+        return chi2, p_value, dof, frecuencias_esperadas(_tabla)
+    from scipy.stats import chi2_contingency
+
+    return chi2_contingency(_tabla)
+
+
+# La permutación y la matriz de asociación corren como trabajos en segundo plano (trabajos.py):
+# muestran su avance, se pueden cancelar y se cancelan solas si cambian las variables elegidas.
+def calcular_permutacion(df, columna_filas, columna_columnas, max_permutaciones, semilla, al_progresar):
+    codigos_f, _ = factorizar(df[columna_filas])
+    codigos_c, _ = factorizar(df[columna_columnas])
+    return prueba_permutacion(codigos_f, codigos_c, max_permutaciones=max_permutaciones, semilla=semilla,
+                              al_progresar=al_progresar)
+
+
+def elegir_alpha():
+    # Misma clave en ambos modos: el valor elegido se conserva al cambiar de modo
+    return st.slider("Nivel de Significancia (α):", min_value=0.01, max_value=0.20, value=0.05, step=0.01, key="alpha")
+
+
+@st.fragment
+def mostrar_asociaciones(espacio, asociaciones):
+    alpha = elegir_alpha()
+    asociaciones = asociaciones.assign(**{"¿Significativa?": asociaciones["Valor p"] < alpha})
+    
+    with espacio.container():
+        st.subheader("Tabla de Asociaciones (ordenable)")
+        st.write(f"Una fila por par de variables. La V de Cramér va de 0 (independencia) a 1 (asociación perfecta); α = {alpha}.")
+        st.dataframe(
+            asociaciones.sort_values("V de Cramér", ascending=False).style.format(
+                {"Chi-Cuadrado": "{:.4f}", "Valor p": "{:.4f}", "V de Cramér": "{:.3f}"}),
+            hide_index=True
+        )
+
+
+@st.fragment
+def mostrar_decision(espacio, p_value, columna_filas, columna_columnas):
+    alpha = elegir_alpha()
+    with espacio.container():
+        st.markdown(f"##### Decisión Estadística (con α = {alpha}):")
+        if p_value < alpha:
+            st.success(f"**Conclusión: Se rechaza la hipótesis nula (H₀).**")
+            st.markdown(f"El valor p obtenido **({p_value:.4f})** es menor que el nivel de significancia **({alpha})**. Esto indica que existe evidencia estadística suficiente para afirmar que hay una **asociación significativa** entre **'{columna_filas}'** y **'{columna_columnas}'**.")
+        else:
+            st.warning(f"**Conclusión: No se puede rechazar la hipótesis nula (H₀).**")
+            st.markdown(f"El valor p obtenido **({p_value:.4f})** es mayor o igual que el nivel de significancia **({alpha})**. Esto indica que no hay evidencia estadística suficiente para afirmar que exista una asociación entre **'{columna_filas}'** y **'{columna_columnas}'**.")
+
 
 # --- 1. Configuración de la Página ---
 st.set_page_config(
@@ -13,6 +95,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_medicion(__file__)
 
 # --- 2. Barra Lateral con Controles ---
 with st.sidebar:
@@ -25,15 +108,31 @@ with st.sidebar:
     st.markdown("---")
     
     st.header("1. Cargar Datos")
-    uploaded_file = st.file_uploader("Sube un archivo CSV", type="csv", label_visibility="collapsed")
+    uploaded_file = archivo_compartido("Sube un archivo CSV", "csv", label_visibility="collapsed")
     
     df = None
     columna_filas = None
     columna_columnas = None
-    alpha = 0.05
+
+    por_bloques = False
+    modo_matriz = False
+    columnas_matriz = []
+    metodo_permutacion = False
+    usar_plotly = False
 
     if uploaded_file:
-        df = pd.read_csv(uploaded_file)
+        por_bloques = st.toggle(
+            "Leer por bloques (archivos muy grandes)",
+            value=uploaded_file.size >= UMBRAL_BLOQUES,
+            help="Lee solo las dos columnas elegidas, por bloques de filas. La memoria depende del número de categorías, no del número de filas."
+        )
+        if por_bloques:
+            exigir_bytes(uploaded_file, "; la lectura por bloques necesita el archivo original")
+            # Basta una muestra para conocer las columnas; los conteos se acumulan después por bloques
+            df = leer_muestra_csv(uploaded_file, FILAS_MUESTRA)
+        else:
+            df = cargar_csv(uploaded_file)
+            st.caption(describir_ahorro(df.attrs["ahorro_memoria"]))
         st.header("2. Seleccionar Variables")
         
         categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
@@ -41,13 +140,32 @@ with st.sidebar:
         if len(categorical_cols) < 2:
             st.error("El archivo CSV debe contener al menos dos columnas de tipo texto/categórico."); st.stop()
         
-        columna_filas = st.selectbox("Elige la variable para las FILAS:", options=categorical_cols, index=0)
+        modo_matriz = st.radio(
+            "Modo de análisis:",
+            ("Un par de variables", "Matriz de asociación (todos los pares)"),
+            help="La matriz de asociación calcula la prueba Chi-Cuadrado y la V de Cramér para cada par de variables."
+        ) != "Un par de variables"
         
-        opciones_columnas = [col for col in categorical_cols if col != columna_filas]
-        columna_columnas = st.selectbox("Elige la variable para las COLUMNAS:", options=opciones_columnas, index=1 if len(opciones_columnas) > 1 else 0)
+        if modo_matriz:
+            columnas_matriz = st.multiselect("Variables a incluir en la matriz:", options=categorical_cols, default=categorical_cols)
+        else:
+            columna_filas = st.selectbox("Elige la variable para las FILAS:", options=categorical_cols, index=0)
+            
+            opciones_columnas = [col for col in categorical_cols if col != columna_filas]
+            columna_columnas = st.selectbox("Elige la variable para las COLUMNAS:", options=opciones_columnas, index=1 if len(opciones_columnas) > 1 else 0)
+            usar_plotly = elegir_motor_graficos()
 
         st.header("3. Opciones de la Prueba")
-        alpha = st.slider("Nivel de Significancia (α):", min_value=0.01, max_value=0.20, value=0.05, step=0.01)
+        controles_alpha = st.container()  # Aquí se dibuja el control de α de los fragmentos de resultados
+        if not modo_matriz:
+            metodo_permutacion = st.radio(
+                "Cálculo del valor p:",
+                ("Aproximación Chi-Cuadrado", "Permutación (Monte Carlo)"),
+                help="La prueba de permutación no depende de que las frecuencias esperadas sean grandes; conviene cuando hay celdas con esperadas menores que 5."
+            ) != "Aproximación Chi-Cuadrado"
+            if metodo_permutacion:
+                max_permutaciones = st.select_slider("Máximo de permutaciones:", options=[1_000, 5_000, 10_000, 50_000, 100_000], value=10_000)
+                semilla = st.number_input("Semilla (reproducibilidad):", min_value=0, value=42, step=1)
 
 # --- 3. Panel Principal ---
 st.title("Tablas de Contingencia")
@@ -59,17 +177,83 @@ st.write(
 if uploaded_file is None:
     st.warning("Por favor, sube un archivo CSV para comenzar."); st.stop()
 
+# --- Modo Matriz de Asociación ---
+if modo_matriz:
+    st.markdown("---")
+    st.header("Matriz de Asociación entre Variables Categóricas")
+    
+    if por_bloques:
+        st.error("La matriz de asociación necesita el archivo completo en memoria. Desactiva la lectura por bloques."); st.stop()
+    if len(columnas_matriz) < 2:
+        st.info("Selecciona al menos dos variables en el panel de la izquierda."); st.stop()
+    
+    gestor().cancelar("permutacion")
+    trabajo = enviar_trabajo(
+        "asociacion", (uploaded_file.file_id, tuple(columnas_matriz)), matriz_asociacion, df, list(columnas_matriz),
+        formato=lambda hechos, total: (hechos / total, f"{hechos:,} de {total:,} pares de variables")
+    )
+    try:
+        asociaciones = resultado_o_esperar(trabajo, "Calculando la matriz de asociación:")
+        espacio_asociaciones = st.empty()
+        with controles_alpha:
+            mostrar_asociaciones(espacio_asociaciones, asociaciones)
+        
+        st.subheader("Mapa de Calor Agrupado (V de Cramér)")
+        matriz_v = matriz_cuadrada(asociaciones, columnas_matriz).fillna(0)
+        import seaborn as sns
+
+        # clustermap crea su propia figura con pyplot: se cierra con liberar() aunque falle el dibujo
+        with etapa("dibujo", "clustermap"):
+            grafico = sns.clustermap(matriz_v, cmap='Blues', vmin=0, vmax=1, annot=len(columnas_matriz) <= 15, fmt='.2f',
+                                     linewidths=.5, figsize=(10, 10))
+        try:
+            grafico.figure.suptitle("Asociación entre Variables (V de Cramér)", fontsize=16, fontweight='bold', y=1.02)
+            with etapa("dibujo", "st.pyplot"):
+                st.pyplot(grafico.figure)
+            
+            buf = io.BytesIO()
+            with etapa("exportación"):
+                grafico.figure.savefig(buf, format="png", bbox_inches='tight')
+            st.download_button(
+                label="📥 Descargar Gráfico",
+                data=buf,
+                file_name="matriz_asociacion_cramer_v.png",
+                mime="image/png"
+            )
+        finally:
+            liberar(grafico.figure)
+    except Exception as e:
+        st.error(f"Ocurrió un error al calcular la matriz de asociación: {e}")
+    mostrar_tiempos()
+    st.stop()
+
 if df is None or columna_filas is None or columna_columnas is None:
     st.info("Asegúrate de haber seleccionado dos variables categóricas en el panel de la izquierda."); st.stop()
 
+gestor().cancelar("asociacion")
+
 # --- 4. Lógica de Cálculo y Visualización ---
 st.markdown("---")
 st.header(f"Análisis de Asociación: '{columna_filas}' vs. '{columna_columnas}'")
 
 try:
-    contingency_table = pd.crosstab(df[columna_filas], df[columna_columnas])
+    # Las columnas se factorizan una sola vez; las tablas porcentuales se derivan de estos conteos
+    conteos, categorias_f, categorias_c = conteos_cacheados(
+        uploaded_file.file_id, columna_filas, columna_columnas, por_bloques, uploaded_file if por_bloques else df)
+
+    # Con miles de categorías por variable no se construye la tabla densa: solo el recorte más frecuente
+    tabla_grande = len(categorias_f) * len(categorias_c) > LIMITE_CELDAS_TABLA
+    if tabla_grande:
+        contingency_table = tabla_top_k(conteos, categorias_f, categorias_c, TOP_K_TABLA, columna_filas, columna_columnas)
+    else:
+        contingency_table = tabla_desde_conteos(conteos, categorias_f, categorias_c, columna_filas, columna_columnas)
     
     st.subheader("Tabla de Contingencia (Frecuencias Observadas)")
+    if tabla_grande:
+        st.info(
+            f"La tabla completa tiene {len(categorias_f):,} × {len(categorias_c):,} categorías. "
+            f"Se muestran las {TOP_K_TABLA} filas y columnas más frecuentes; la prueba Chi-Cuadrado usa la tabla completa."
+        )
     st.dataframe(contingency_table)
 
     # --- NUEVA SECCIÓN: Tablas Porcentuales ---
@@ -78,27 +262,52 @@ try:
         
         # Porcentaje por Fila
         st.markdown("**Porcentajes por Fila** (cada fila suma 100%)")
-        contingency_pct_row = pd.crosstab(df[columna_filas], df[columna_columnas], normalize='index')
+        contingency_pct_row = normalizar(contingency_table, 'index')
         st.dataframe(contingency_pct_row.style.format("{:.2%}"))
 
         # Porcentaje por Columna
         st.markdown("**Porcentajes por Columna** (cada columna suma 100%)")
-        contingency_pct_col = pd.crosstab(df[columna_filas], df[columna_columnas], normalize='columns')
+        contingency_pct_col = normalizar(contingency_table, 'columns')
         st.dataframe(contingency_pct_col.style.format("{:.2%}"))
         
         # Porcentaje sobre el Total
         st.markdown("**Porcentajes sobre el Total General** (la tabla entera suma 100%)")
-        contingency_pct_total = pd.crosstab(df[columna_filas], df[columna_columnas], normalize='all')
+        contingency_pct_total = normalizar(contingency_table, 'all')
         st.dataframe(contingency_pct_total.style.format("{:.2%}"))
     
     # --- Aplicar la Prueba Chi-Cuadrado ---
-    chi2, p_value, dof, expected_freq = chi2_contingency(contingency_table)
+    chi2, p_value, dof, expected_freq = prueba_chi2_cacheada(
+        uploaded_file.file_id, columna_filas, columna_columnas, por_bloques, conteos, contingency_table, tabla_grande)
+
+    if not metodo_permutacion or por_bloques:
+        gestor().cancelar("permutacion")
+    if metodo_permutacion and por_bloques:
+        st.warning("La prueba de permutación necesita todas las filas en memoria; con la lectura por bloques se usa la aproximación Chi-Cuadrado.")
+    elif metodo_permutacion:
+        trabajo = enviar_trabajo(
+            "permutacion", (uploaded_file.file_id, columna_filas, columna_columnas, max_permutaciones, int(semilla)),
+            calcular_permutacion, df, columna_filas, columna_columnas, max_permutaciones, int(semilla),
+            formato=lambda hechas, p: (hechas / max_permutaciones, f"{hechas:,} permutaciones (p ≈ {p:.4f})")
+        )
+        permutacion = resultado_o_esperar(trabajo, "Ejecutando permutaciones:")
+        # La prueba de permutación no usa la corrección de Yates, así que se muestra su propio estadístico
+        chi2, p_value = permutacion["estadistico"], permutacion["p_valor"]
 
     st.subheader("Resultados de la Prueba Chi-Cuadrado")
     col1, col2, col3 = st.columns(3)
     col1.metric("Estadístico Chi-Cuadrado (χ²)", f"{chi2:.4f}")
     col2.metric("Valor p (p-value)", f"{p_value:.4f}")
     col3.metric("Grados de Libertad (dof)", f"{dof}")
+    
+    if metodo_permutacion and not por_bloques:
+        inferior, superior = permutacion["intervalo"]
+        st.caption(
+            f"Valor p por permutación con {permutacion['permutaciones']:,} permutaciones"
+            f"{' (detenida al alcanzar la precisión pedida)' if permutacion['detenida_antes'] else ''}; "
+            f"intervalo de confianza al 99%: [{inferior:.4f}, {superior:.4f}]."
+        )
+    elif (np.asarray(expected_freq) < 5).mean() > 0.2:
+        st.warning("Más del 20% de las celdas tienen frecuencias esperadas menores que 5: la aproximación Chi-Cuadrado puede no ser confiable. Considera la prueba de permutación.")
 
     with st.expander("Ver tabla de Frecuencias Esperadas"):
         st.write("Estas son las frecuencias que se esperarían si no hubiera asociación entre las variables (bajo la hipótesis nula).")
@@ -111,36 +320,48 @@ try:
     st.markdown(f"- **Hipótesis Alternativa (H₁):** Existe una asociación entre '{columna_filas}' y '{columna_columnas}'. Las variables son dependientes.")
     st.markdown("---")
 
-    st.markdown(f"##### Decisión Estadística (con α = {alpha}):")
-    if p_value < alpha:
-        st.success(f"**Conclusión: Se rechaza la hipótesis nula (H₀).**")
-        st.markdown(f"El valor p obtenido **({p_value:.4f})** es menor que el nivel de significancia **({alpha})**. Esto indica que existe evidencia estadística suficiente para afirmar que hay una **asociación significativa** entre **'{columna_filas}'** y **'{columna_columnas}'**.")
-    else:
-        st.warning(f"**Conclusión: No se puede rechazar la hipótesis nula (H₀).**")
-        st.markdown(f"El valor p obtenido **({p_value:.4f})** es mayor o igual que el nivel de significancia **({alpha})**. Esto indica que no hay evidencia estadística suficiente para afirmar que exista una asociación entre **'{columna_filas}'** y **'{columna_columnas}'**.")
+    espacio_decision = st.empty()
+    with controles_alpha:
+        mostrar_decision(espacio_decision, p_value, columna_filas, columna_columnas)
     
     st.subheader("Visualización: Mapa de Calor (Heatmap)")
     
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.heatmap(contingency_table, annot=True, fmt='d', cmap='Blues', linewidths=.5, ax=ax)
+    tabla_heatmap = tabla_top_k(conteos, categorias_f, categorias_c, TOP_K_HEATMAP, columna_filas, columna_columnas)
+    if tabla_heatmap.shape != contingency_table.shape:
+        st.caption(f"El mapa de calor muestra las {TOP_K_HEATMAP} filas y columnas más frecuentes.")
     
-    ax.set_title(f"Mapa de Calor de Frecuencias: {columna_filas} vs. {columna_columnas}", fontsize=16, fontweight='bold')
-    ax.set_xlabel(columna_columnas, fontsize=12)
-    ax.set_ylabel(columna_filas, fontsize=12)
-    plt.xticks(rotation=45, ha='right')
-    plt.yticks(rotation=0)
+    if usar_plotly:
+        # Solo viaja la tabla agregada; el navegador colorea y anota las celdas
+        st.plotly_chart(mapa_calor(tabla_heatmap, f"Mapa de Calor de Frecuencias: {columna_filas} vs. {columna_columnas}",
+                                   columna_columnas, columna_filas, anotar=tabla_heatmap.size <= MAX_CELDAS_ANOTADAS),
+                        use_container_width=True)
+    else:
+        import seaborn as sns
+
+        with figura(figsize=(10, 6)) as (fig, ax):
+            sns.heatmap(tabla_heatmap, annot=tabla_heatmap.size <= MAX_CELDAS_ANOTADAS, fmt='d', cmap='Blues', linewidths=.5, ax=ax)
     
-    st.pyplot(fig)
-
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", bbox_inches='tight')
-    st.download_button(
-        label="📥 Descargar Gráfico",
-        data=buf,
-        file_name=f"heatmap_chi2_{columna_filas}_vs_{columna_columnas}.png",
-        mime="image/png"
-    )
+            ax.set_title(f"Mapa de Calor de Frecuencias: {columna_filas} vs. {columna_columnas}", fontsize=16, fontweight='bold')
+            ax.set_xlabel(columna_columnas, fontsize=12)
+            ax.set_ylabel(columna_filas, fontsize=12)
+            ax.set_xticks(ax.get_xticks(), ax.get_xticklabels(), rotation=45, ha='right')
+            ax.tick_params(axis='y', labelrotation=0)
+    
+            st.pyplot(fig)
+
+            buf = io.BytesIO()
+            with etapa("exportación"):
+                fig.savefig(buf, format="png", bbox_inches='tight')
+            st.download_button(
+                label="📥 Descargar Gráfico",
+                data=buf,
+                file_name=f"heatmap_chi2_{columna_filas}_vs_{columna_columnas}.png",
+                mime="image/png"
+            )
 
 except Exception as e:
     st.error(f"Ocurrió un error al procesar los datos: {e}")
     st.warning("Verifica que el archivo CSV esté bien formado y que las columnas seleccionadas sean categóricas.")
+
+# --- Tiempos por Etapa (solo con MEDIR_ETAPAS=1) ---
+mostrar_tiempos()
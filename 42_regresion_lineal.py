@@ -1,10 +1,146 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import io
-from scipy.stats import linregress
+from carga_datos import archivo_compartido, cargar_csv, exigir_bytes, leer_muestra_csv
+from figuras import liberar, nueva_figura
+from graficos_interactivos import dispersion, elegir_motor_graficos, mover_punto
+from regresion import (ESTIMADORES_ROBUSTOS, ajustar, ajustar_multiple, ajustar_robusto, bootstrap_regresion,
+                       gram_por_bloques, intervalos_prediccion, matriz_gram, momentos, momentos_por_bloques)
+from trabajos import gestor, enviar_trabajo, resultado_o_esperar
+from instrumentacion import etapa, iniciar_medicion, mostrar_tiempos
+
+# Archivos a partir de este tamaño se leen por bloques por defecto
+UMBRAL_BLOQUES = 500 * 1024 * 1024  # 500 MB
+FILAS_MUESTRA = 5000
+
+
+@etapa("cálculo", "matriz de Gram")
+@st.cache_data(max_entries=4, show_spinner="Calculando la matriz de Gram (una sola vez por archivo)...")
+def gram_cacheada(id_archivo, columnas, por_bloques, _fuente):
+    # La clave del caché es el archivo y sus columnas numéricas; `_fuente` (archivo o DataFrame) no se hashea
+    if por_bloques:
+        _fuente.seek(0)
+        return gram_por_bloques(_fuente, columnas)
+    return matriz_gram(_fuente, columnas)
+
+
+# Cachés por (archivo, X, Y): mover el slider de predicción no vuelve a ajustar nada
+@etapa("cálculo", "momentos")
+@st.cache_data(max_entries=16, show_spinner=False)
+def momentos_cacheados(id_archivo, columna_x, columna_y, por_bloques, _fuente):
+    if por_bloques:
+        _fuente.seek(0)
+        return momentos_por_bloques(_fuente, columna_x, columna_y)
+    return momentos(_fuente[columna_x].to_numpy(), _fuente[columna_y].to_numpy())
+
+
+@st.fragment
+def mostrar_prediccion(momentos_xy, ajuste, x_data, y_data, columna_x, columna_y, ajustes_robustos, clave_base,
+                       usar_plotly=False):
+    st.subheader("Realizar una Predicción")
+    slope, intercept, r_squared = ajuste.pendiente, ajuste.intercepto, ajuste.r2
+    min_val, max_val = float(momentos_xy.min_x), float(momentos_xy.max_x)
+
+    valor_prediccion_x = st.slider(f"Selecciona un valor para '{columna_x}' para predecir '{columna_y}':", 
+                                   min_value=min_val, max_value=max_val, value=(min_val + max_val) / 2)
+
+    prediccion_y = intercept + slope * valor_prediccion_x
+    st.success(f"Para un valor de **{columna_x} = {valor_prediccion_x:.2f}**, el valor predicho de **{columna_y}** es **{prediccion_y:.2f}**")
+
+    valores_lote = st.text_input(
+        f"Predicción por lotes: escribe varios valores de '{columna_x}' separados por comas",
+        placeholder="Ej: 10, 12.5, 20",
+        help="Se calculan el intervalo de confianza de la media (IC) y el intervalo de predicción de una observación nueva (IP), ambos al 95%."
+    )
+    if valores_lote.strip():
+        try:
+            x_lote = [float(v) for v in valores_lote.replace(';', ',').split(',') if v.strip()]
+            predicciones = intervalos_prediccion(momentos_xy, x_lote)
+            st.dataframe(predicciones.style.format("{:.4f}"), hide_index=True)
+            st.download_button(
+                label="📥 Descargar Predicciones (CSV)",
+                data=predicciones.to_csv(index=False).encode('utf-8'),
+                file_name=f"predicciones_{columna_y}_vs_{columna_x}.csv",
+                mime="text/csv"
+            )
+        except ValueError:
+            st.error("No se pudieron interpretar los valores. Usa números separados por comas, por ejemplo: 10, 12.5, 20")
+
+    st.subheader("Gráfico de Dispersión y Línea de Regresión")
+
+    if usar_plotly:
+        # El navegador dibuja la nube (WebGL). La figura (muestra de puntos y rectas) se arma una sola
+        # vez por (archivo, X, Y, estimadores); al mover el slider solo cambia la traza de la predicción
+        base = st.session_state.get("grafico_plotly_regresion")
+        if base is None or base["clave"] != clave_base:
+            rectas = [{"pendiente": slope, "intercepto": intercept, "nombre": f'Línea de Regresión (R² = {r_squared:.3f})', "color": 'red'}]
+            for (nombre, (b1, b0)), color_linea in zip(ajustes_robustos.items(), ['darkorange', 'purple', 'brown']):
+                rectas.append({"pendiente": b1, "intercepto": b0, "nombre": nombre, "color": color_linea, "estilo": '--'})
+            base = {"clave": clave_base, "fig": dispersion(x_data, y_data, rectas, f"Relación entre {columna_x} y {columna_y}",
+                                                           columna_x, columna_y, punto=(valor_prediccion_x, prediccion_y))}
+            st.session_state["grafico_plotly_regresion"] = base
+        st.plotly_chart(mover_punto(base["fig"], (valor_prediccion_x, prediccion_y)), use_container_width=True)
+        return
+
+    from matplotlib.image import imsave
+
+    # La capa base (dispersión y rectas) se dibuja una sola vez por (archivo, X, Y, estimadores);
+    # al mover el slider solo se restaura su imagen y se dibuja encima el punto de predicción
+    base = st.session_state.get("grafico_base_regresion")
+    if base is None or base["clave"] != clave_base:
+        import seaborn as sns
+
+        if base is not None:
+            liberar(base["fig"])
+        # Figura de larga vida (una por sesión): se libera al cambiar de archivo, variables o estimadores
+        with etapa("dibujo", "capa base"):
+            fig = nueva_figura(figsize=(10, 6))
+            ax = fig.subplots()
+            sns.scatterplot(x=x_data, y=y_data, s=80, label='Datos Observados', ax=ax)
+            extremos_x = np.array([min_val, max_val])
+            ax.plot(extremos_x, intercept + slope * extremos_x, color='red', linewidth=2, label=f'Línea de Regresión (R² = {r_squared:.3f})')
+            for (nombre, (b1, b0)), color_linea in zip(ajustes_robustos.items(), ['darkorange', 'purple', 'brown']):
+                ax.plot(extremos_x, b0 + b1 * extremos_x, color=color_linea, linewidth=2, linestyle='--', label=f'{nombre}')
+            ax.scatter([], [], color='green', marker='o', s=150, label='Predicción')
+
+            ax.set_title(f"Relación entre {columna_x} y {columna_y}", fontsize=16, fontweight='bold')
+            ax.set_xlabel(columna_x, fontsize=12)
+            ax.set_ylabel(columna_y, fontsize=12)
+            ax.legend()
+            ax.grid(True, linestyle='--', alpha=0.6)
+
+            # Artistas animados: no forman parte del fondo guardado
+            punto = ax.scatter([], [], color='green', marker='o', s=150, zorder=5, animated=True)
+            etiqueta = ax.annotate("", xy=(0, 0), xytext=(10, 10), textcoords='offset points', color='green',
+                                   fontweight='bold', animated=True)
+            fig.canvas.draw()
+            base = {"clave": clave_base, "fig": fig, "ax": ax, "fondo": fig.canvas.copy_from_bbox(fig.bbox),
+                    "punto": punto, "etiqueta": etiqueta}
+        st.session_state["grafico_base_regresion"] = base
+
+    fig, ax = base["fig"], base["ax"]
+    with etapa("dibujo", "punto de predicción"):
+        fig.canvas.restore_region(base["fondo"])
+        base["punto"].set_offsets([[valor_prediccion_x, prediccion_y]])
+        base["etiqueta"].xy = (valor_prediccion_x, prediccion_y)
+        base["etiqueta"].set_text(f"X={valor_prediccion_x:.2f}, Ŷ={prediccion_y:.2f}")
+        ax.draw_artist(base["punto"])
+        ax.draw_artist(base["etiqueta"])
+
+    buf = io.BytesIO()
+    with etapa("exportación"):
+        imsave(buf, np.asarray(fig.canvas.buffer_rgba()), format="png")
+    st.image(buf.getvalue(), use_container_width=True)
+
+    # --- NUEVA SECCIÓN: Botón de descarga ---
+    st.download_button(
+        label="📥 Descargar Gráfico",
+        data=buf.getvalue(),
+        file_name=f"regresion_{columna_y}_vs_{columna_x}.png",
+        mime="image/png"
+    )
+
 
 # --- 1. Configuración de la Página ---
 st.set_page_config(
@@ -13,6 +149,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_medicion(__file__)
 
 # --- 2. Barra Lateral con Controles ---
 with st.sidebar:
@@ -25,14 +162,31 @@ with st.sidebar:
     st.markdown("---")
     
     st.header("1. Cargar Datos")
-    uploaded_file = st.file_uploader("Sube un archivo CSV", type="csv", label_visibility="collapsed")
+    uploaded_file = archivo_compartido("Sube un archivo CSV", "csv", label_visibility="collapsed")
     
     df = None
     columna_x = None
     columna_y = None
+    por_bloques = False
+    modo_multiple = False
+    predictores = []
+    usar_bootstrap = False
+    estimadores_robustos = []
+    usar_plotly = False
 
     if uploaded_file:
-        df = pd.read_csv(uploaded_file)
+        por_bloques = st.toggle(
+            "Leer por bloques (archivos muy grandes)",
+            value=uploaded_file.size >= UMBRAL_BLOQUES,
+            help="Calcula la regresión en una sola pasada por bloques, leyendo solo las dos columnas elegidas. El gráfico muestra una muestra de las primeras filas."
+        )
+        if por_bloques:
+            exigir_bytes(uploaded_file, "; la lectura por bloques necesita el archivo original")
+            # La muestra sirve para elegir columnas y para el gráfico; el ajuste usa el archivo completo
+            df = leer_muestra_csv(uploaded_file, FILAS_MUESTRA)
+        else:
+            # Sin compactar los float64: el ajuste y la matriz de Gram usan los valores tal como están en el archivo
+            df = cargar_csv(uploaded_file, flotantes=False)
         st.header("2. Seleccionar Variables")
         
         numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
@@ -40,10 +194,33 @@ with st.sidebar:
         if len(numeric_cols) < 2:
             st.error("El archivo CSV debe contener al menos dos columnas numéricas."); st.stop()
         
-        columna_x = st.selectbox("Elige la Variable Independiente (Eje X):", options=numeric_cols, index=0)
+        modo_multiple = st.radio("Tipo de regresión:", ("Simple (una X)", "Múltiple (varias X)"), horizontal=True) != "Simple (una X)"
         
-        opciones_y = [col for col in numeric_cols if col != columna_x]
-        columna_y = st.selectbox("Elige la Variable Dependiente (Eje Y):", options=opciones_y, index=0)
+        if modo_multiple:
+            columna_y = st.selectbox("Elige la Variable Dependiente (Y):", options=numeric_cols, index=0)
+            opciones_x = [col for col in numeric_cols if col != columna_y]
+            predictores = st.multiselect("Elige las Variables Independientes (X):", options=opciones_x, default=opciones_x)
+        else:
+            columna_x = st.selectbox("Elige la Variable Independiente (Eje X):", options=numeric_cols, index=0)
+            
+            opciones_y = [col for col in numeric_cols if col != columna_x]
+            columna_y = st.selectbox("Elige la Variable Dependiente (Eje Y):", options=opciones_y, index=0)
+            usar_plotly = elegir_motor_graficos()
+            
+            st.header("3. Intervalos de Confianza")
+            usar_bootstrap = st.checkbox(
+                "Calcular intervalos bootstrap",
+                help="Remuestrea los datos para obtener intervalos de la pendiente y el intercepto sin suponer errores normales. Útil con datos de colas pesadas."
+            )
+            if usar_bootstrap:
+                n_remuestras = st.select_slider("Número de remuestras:", options=[500, 1_000, 2_000, 5_000, 10_000], value=2_000)
+            
+            st.header("4. Regresión Robusta")
+            estimadores_robustos = st.multiselect(
+                "Comparar con estimadores robustos:",
+                options=list(ESTIMADORES_ROBUSTOS),
+                help="Estos estimadores reducen la influencia de los valores atípicos sobre la recta."
+            )
 
 # --- 3. Panel Principal ---
 st.title("📈 Regresión Lineal Simple")
@@ -55,6 +232,47 @@ st.write(
 if uploaded_file is None:
     st.warning("Por favor, sube un archivo CSV para comenzar."); st.stop()
 
+# --- Modo Regresión Múltiple ---
+if modo_multiple:
+    st.markdown("---")
+    st.header(f"Regresión Lineal Múltiple: '{columna_y}' (Y)")
+    
+    if not predictores:
+        st.info("Selecciona al menos una variable independiente en el panel de la izquierda."); st.stop()
+    
+    try:
+        # La Gram de todas las columnas numéricas se calcula una vez por archivo; cambiar Y o las X solo
+        # resuelve el sistema pequeño correspondiente
+        gram = gram_cacheada(uploaded_file.file_id, tuple(numeric_cols), por_bloques, uploaded_file if por_bloques else df)
+        coeficientes, resumen = ajustar_multiple(gram, columna_y, predictores)
+        
+        st.subheader("Resultados del Modelo de Regresión")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Coeficiente de Determinación (R²)", f"{resumen['r2']:.4f}")
+        col2.metric("R² Ajustado", f"{resumen['r2_ajustado']:.4f}")
+        col3.metric("Error Estándar de la Regresión", f"{resumen['error_estandar']:.4f}")
+        col4.metric("Observaciones (n)", f"{resumen['n']:,}")
+        st.caption("Se usan las filas sin valores faltantes en ninguna columna numérica del archivo.")
+        
+        if len(predictores) <= 8:
+            st.markdown("##### Ecuación del Modelo:")
+            nombres_latex = [x.replace('_', '\\_') for x in predictores]
+            terminos = " ".join(f"+ ({b:.4f}) \\times \\text{{{x}}}" for x, b in zip(nombres_latex, coeficientes["Coeficiente"].iloc[1:]))
+            st.latex(f"Y = {coeficientes['Coeficiente'].iloc[0]:.4f} {terminos}")
+        
+        st.subheader("Coeficientes")
+        st.dataframe(coeficientes.style.format({"Coeficiente": "{:.4f}", "Error Estándar": "{:.4f}", "t": "{:.3f}", "Valor p": "{:.4f}"}))
+        st.download_button(
+            label="📥 Descargar Coeficientes (CSV)",
+            data=coeficientes.to_csv().encode('utf-8'),
+            file_name=f"regresion_multiple_{columna_y}.csv",
+            mime="text/csv"
+        )
+    except Exception as e:
+        st.error(f"Ocurrió un error al ajustar el modelo: {e}")
+    mostrar_tiempos()
+    st.stop()
+
 if df is None or columna_x is None or columna_y is None:
     st.info("Asegúrate de haber seleccionado dos variables numéricas en el panel de la izquierda."); st.stop()
 
@@ -63,14 +281,23 @@ st.markdown("---")
 st.header(f"Análisis de Regresión: '{columna_y}' (Y) vs. '{columna_x}' (X)")
 
 try:
-    datos_limpios = df[[columna_x, columna_y]].dropna()
+    # Las columnas enteras compactadas (int8/int16...) pasan a float64 para el ajuste
+    datos_limpios = df[[columna_x, columna_y]].dropna().astype(np.float64)
     x_data = datos_limpios[columna_x]
     y_data = datos_limpios[columna_y]
 
     if x_data.empty or y_data.empty:
         st.error("No hay suficientes datos válidos en las columnas seleccionadas después de eliminar valores faltantes."); st.stop()
 
-    slope, intercept, r_value, p_value, std_err = linregress(x_data, y_data)
+    # El ajuste sale de los estadísticos suficientes (n, medias y co-momentos), no de las columnas completas
+    with st.spinner("Ajustando el modelo..."):
+        momentos_xy = momentos_cacheados(uploaded_file.file_id, columna_x, columna_y, por_bloques,
+                                         uploaded_file if por_bloques else datos_limpios)
+    if por_bloques:
+        st.caption(f"Ajuste calculado con {momentos_xy.n:,} filas; el gráfico muestra las primeras {len(x_data):,}.")
+
+    ajuste = ajustar(momentos_xy)
+    slope, intercept, r_value, p_value, std_err = ajuste.pendiente, ajuste.intercepto, ajuste.r, ajuste.p_valor, ajuste.error_estandar
     r_squared = r_value**2
 
     st.subheader("Resultados del Modelo de Regresión")
@@ -82,40 +309,59 @@ try:
     st.markdown("##### Ecuación de la Recta de Regresión:")
     st.latex(f"Y = {intercept:.4f} + ({slope:.4f}) \\times X")
     
-    st.subheader("Realizar una Predicción")
-    min_val, max_val = float(x_data.min()), float(x_data.max())
-    
-    valor_prediccion_x = st.slider(f"Selecciona un valor para '{columna_x}' para predecir '{columna_y}':", 
-                                   min_value=min_val, max_value=max_val, value=(min_val + max_val) / 2)
-    
-    prediccion_y = intercept + slope * valor_prediccion_x
-    st.success(f"Para un valor de **{columna_x} = {valor_prediccion_x:.2f}**, el valor predicho de **{columna_y}** es **{prediccion_y:.2f}**")
-
-    st.subheader("Gráfico de Dispersión y Línea de Regresión")
+    # El bootstrap y los estimadores robustos corren como trabajos en segundo plano (trabajos.py): muestran
+    # su avance, se pueden cancelar y se cancelan solos si cambian las variables o las opciones.
+    clave_datos = (uploaded_file.file_id, columna_x, columna_y)
+    if not usar_bootstrap or por_bloques:
+        gestor().cancelar("bootstrap")
+    if usar_bootstrap and por_bloques:
+        st.warning("Los intervalos bootstrap necesitan todas las filas en memoria; desactiva la lectura por bloques para calcularlos.")
+    elif usar_bootstrap:
+        st.subheader("Intervalos de Confianza Bootstrap (95%)")
+        trabajo = enviar_trabajo(
+            "bootstrap", clave_datos + (n_remuestras,), bootstrap_regresion, x_data.to_numpy(), y_data.to_numpy(),
+            n_remuestras=n_remuestras, semilla=42,
+            formato=lambda hechas: (hechas / n_remuestras, f"{hechas:,} de {n_remuestras:,} remuestras")
+        )
+        bootstrap = resultado_o_esperar(trabajo, "Remuestreando:")
+        
+        inf_b1, sup_b1 = bootstrap["intervalo_pendiente"]
+        inf_b0, sup_b0 = bootstrap["intervalo_intercepto"]
+        col1, col2 = st.columns(2)
+        col1.metric("IC 95% de la Pendiente (b₁)", f"[{inf_b1:.4f}, {sup_b1:.4f}]")
+        col2.metric("IC 95% del Intercepto (b₀)", f"[{inf_b0:.4f}, {sup_b0:.4f}]")
+        st.caption(
+            f"Percentiles 2.5 y 97.5 de {bootstrap['remuestras']:,} remuestras. Error estándar de la pendiente: "
+            f"bootstrap {np.std(bootstrap['pendientes'], ddof=1):.4f} frente a {std_err:.4f} del modelo analítico."
+        )
     
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.scatterplot(x=x_data, y=y_data, s=80, label='Datos Observados', ax=ax)
-    ax.plot(x_data, intercept + slope * x_data, color='red', linewidth=2, label=f'Línea de Regresión (R² = {r_squared:.3f})')
-    ax.scatter(valor_prediccion_x, prediccion_y, color='green', marker='o', s=150, zorder=5, 
-               label=f'Predicción para X={valor_prediccion_x:.2f}')
+    ajustes_robustos = {}
+    gestor().cancelar(*(f"robusto_{nombre}" for nombre in ESTIMADORES_ROBUSTOS
+                        if nombre not in estimadores_robustos or por_bloques))
+    if estimadores_robustos and por_bloques:
+        st.warning("Los estimadores robustos necesitan todas las filas en memoria; desactiva la lectura por bloques para calcularlos.")
+    elif estimadores_robustos:
+        st.subheader("Comparación con Estimadores Robustos")
+        filas_comparacion = [("Mínimos Cuadrados (OLS)", slope, intercept, None)]
+        # Se envían todos antes de esperar al primero, para que corran a la vez en el pool de procesos
+        trabajos_robustos = {
+            nombre: enviar_trabajo(f"robusto_{nombre}", clave_datos, ajustar_robusto, nombre, x_data.to_numpy(),
+                                   y_data.to_numpy(), en_proceso=True)
+            for nombre in estimadores_robustos
+        }
+        for nombre, trabajo in trabajos_robustos.items():
+            b1, b0, segundos = resultado_o_esperar(trabajo, f"Ajustando {nombre}:")
+            ajustes_robustos[nombre] = (b1, b0)
+            filas_comparacion.append((nombre, b1, b0, segundos))
+        comparacion = pd.DataFrame(filas_comparacion, columns=["Estimador", "Pendiente (b₁)", "Intercepto (b₀)", "Tiempo (s)"])
+        st.dataframe(
+            comparacion.style.format({"Pendiente (b₁)": "{:.4f}", "Intercepto (b₀)": "{:.4f}", "Tiempo (s)": "{:.3f}"}, na_rep="—"),
+            hide_index=True
+        )
     
-    ax.set_title(f"Relación entre {columna_x} y {columna_y}", fontsize=16, fontweight='bold')
-    ax.set_xlabel(columna_x, fontsize=12)
-    ax.set_ylabel(columna_y, fontsize=12)
-    ax.legend()
-    ax.grid(True, linestyle='--', alpha=0.6)
-    
-    st.pyplot(fig)
-
-    # --- NUEVA SECCIÓN: Botón de descarga ---
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", bbox_inches='tight')
-    st.download_button(
-        label="📥 Descargar Gráfico",
-        data=buf,
-        file_name=f"regresion_{columna_y}_vs_{columna_x}.png",
-        mime="image/png"
-    )
+    # El slider y la predicción por lotes viven en un fragmento: moverlos no vuelve a leer ni a ajustar nada
+    clave_base = (uploaded_file.file_id, columna_x, columna_y, por_bloques, tuple(ajustes_robustos))
+    mostrar_prediccion(momentos_xy, ajuste, x_data, y_data, columna_x, columna_y, ajustes_robustos, clave_base, usar_plotly)
     
     with st.expander("Ver Interpretación Detallada de los Resultados"):
         st.markdown(f"**Pendiente ({slope:.4f}):** Por cada unidad que aumenta **{columna_x}**, se estima que **{columna_y}** {'aumenta' if slope > 0 else 'disminuye'} en un promedio de **{abs(slope):.4f}** unidades.")
@@ -126,3 +372,6 @@ try:
 except Exception as e:
     st.error(f"Ocurrió un error al procesar los datos: {e}")
     st.warning("Verifica que el archivo CSV esté bien formado y que las columnas seleccionadas sean numéricas y no tengan errores.")
+
+# --- Tiempos por Etapa (solo con MEDIR_ETAPAS=1) ---
+mostrar_tiempos()
@@ -1,8 +1,9 @@
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
+from figuras import GraficoBarras, boton_descarga, reutilizar_grafico
+from graficos_interactivos import barras_distribucion, elegir_motor_graficos
 from scipy.stats import binom
-import io # Necesario para el buffer de descarga
+from instrumentacion import etapa, iniciar_medicion, mostrar_tiempos
 
 # --- 1. Configuración de la Página ---
 st.set_page_config(
@@ -11,6 +12,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_medicion(__file__)
 
 # --- 2. Barra Lateral con Controles ---
 with st.sidebar:
@@ -42,6 +44,9 @@ with st.sidebar:
         help="La probabilidad de que ocurra un 'éxito' en un solo ensayo."
     )
 
+    st.markdown("---")
+    usar_plotly = elegir_motor_graficos()
+
 # --- 3. Panel Principal ---
 st.title("📊 Distribución Binomial")
 st.write(
@@ -78,54 +83,48 @@ st.subheader(f"Gráfico de la Distribución Binomial: n={n_ensayos}, p={prob_exi
 
 try:
     # Preparar datos para el gráfico
-    k_values = range(n_ensayos + 1)
-    probabilities = [binom.pmf(k, n_ensayos, prob_exito) for k in k_values]
-
-    fig, ax = plt.subplots(figsize=(12, 7)) # Aumentamos un poco el tamaño para más claridad
-
-    # Gráfico de barras principal
-    bars = ax.bar(k_values, probabilities, color='teal', edgecolor='black', alpha=0.6, label='Probabilidad P(X=k)')
-    
-    # Destacar la barra para el k seleccionado
-    ax.bar(k_seleccionado, prob_k_seleccionado, color='#1C545E', edgecolor='black', 
-           label=f'P(X={k_seleccionado}) = {prob_k_seleccionado:.4f}')
-
-    # --- AÑADIR ETIQUETAS DE PROBABILIDAD ENCIMA DE LAS BARRAS ---
-    for bar in bars:
-        yval = bar.get_height()
-        # El formato del texto puede cambiar dinámicamente para no ser tan grande
-        text_format = f'{yval:.3f}' if yval > 0.001 else f'{yval:.4f}'
-        ax.text(bar.get_x() + bar.get_width()/2.0, yval, text_format, 
-                va='bottom', ha='center', fontsize=8) # va='bottom' lo pone justo encima
-    # -----------------------------------------------------------------
-
-    ax.set_xlabel('Número de Éxitos (k)', fontsize=12)
-    ax.set_ylabel('Probabilidad', fontsize=12)
-    ax.set_title(f'Distribución Binomial (n={n_ensayos}, p={prob_exito})', fontsize=16, fontweight='bold')
-    
-    ax.legend()
-    ax.grid(True, linestyle='--', alpha=0.6, axis='y')
-    ax.set_xticks(k_values) 
-    # Ajuste dinámico del eje Y para dejar espacio a las etiquetas
-    if probabilities:
-        ax.set_ylim(0, max(probabilities) * 1.25) 
+    k_values = np.arange(n_ensayos + 1)
+
+    with etapa("cálculo"):
+        probabilities = binom.pmf(k_values, n_ensayos, prob_exito)
+
+    def construir_grafico():
+        grafico = GraficoBarras(k_values, probabilities, 'teal', '#1C545E', alpha=0.6, edgecolor='black')
+        ax = grafico.ax
+
+        # Etiquetas de probabilidad encima de las barras, todas en un solo artista
+        # (el formato cambia para que los valores muy pequeños no se vean como cero)
+        grafico.etiquetar_barras([f'{p:.3f}' if p > 0.001 else f'{p:.4f}' for p in probabilities])
+
+        ax.set_xlabel('Número de Éxitos (k)', fontsize=12)
+        ax.set_ylabel('Probabilidad', fontsize=12)
+        ax.set_title(f'Distribución Binomial (n={n_ensayos}, p={prob_exito})', fontsize=16, fontweight='bold')
+
+        grafico.leyenda('Probabilidad P(X=k)', 'P(X=k)')
+        ax.grid(True, linestyle='--', alpha=0.6, axis='y')
+        ax.set_xticks(k_values)
+        # Ajuste dinámico del eje Y para dejar espacio a las etiquetas
+        ax.set_ylim(0, probabilities.max() * 1.25)
+        return grafico
+
+    if usar_plotly:
+        # Solo se envían el vector de probabilidades y la máscara; el navegador dibuja las barras
+        st.plotly_chart(barras_distribucion(k_values, probabilities, k_values == k_seleccionado, ('teal', '#1C545E'),
+                                            ('Probabilidad P(X=k)', f'P(X={k_seleccionado}) = {prob_k_seleccionado:.4f}'),
+                                            f'Distribución Binomial (n={n_ensayos}, p={prob_exito})', 'Número de Éxitos (k)',
+                                            etiquetas=[f'{p:.3f}' if p > 0.001 else f'{p:.4f}' for p in probabilities]),
+                        use_container_width=True)
     else:
-        ax.set_ylim(0, 0.1)
+        # El gráfico se construye una vez por (n, p); mover k solo cambia el color de las barras afectadas
+        grafico = reutilizar_grafico(st.session_state, "grafico_binomial", (n_ensayos, prob_exito), construir_grafico)
+        png = grafico.resaltar(k_values == k_seleccionado, f'P(X={k_seleccionado}) = {prob_k_seleccionado:.4f}')
 
-    # Mostrar el gráfico en Streamlit
-    st.pyplot(fig)
+        # Mostrar el gráfico en Streamlit
+        st.image(png, use_container_width=True)
 
-    # --- BOTÓN DE DESCARGA ---
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", dpi=300, bbox_inches='tight') # bbox_inches asegura que todo se guarde
-    
-    st.download_button(
-        label="📥 Descargar Gráfico",
-        data=buf.getvalue(),
-        file_name=f"binomial_n{n_ensayos}_p{prob_exito:.2f}.png",
-        mime="image/png"
-    )
-    # -------------------------
+        # --- BOTÓN DE DESCARGA ---
+        # A 300 dpi y recortada, como antes, pero solo cuando se pide; la pantalla usa el blit
+        boton_descarga(grafico, f"binomial_n{n_ensayos}_p{prob_exito:.2f}.png", "preparar_descarga_binomial")
 
     # --- Interpretación ---
     with st.expander("Ver Interpretación de los Parámetros"):
@@ -136,3 +135,6 @@ try:
 
 except Exception as e:
     st.error(f"Ocurrió un error al generar el gráfico: {e}")
+
+# --- Tiempos por Etapa (solo con MEDIR_ETAPAS=1) ---
+mostrar_tiempos()
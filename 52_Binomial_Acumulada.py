@@ -1,8 +1,9 @@
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
+from figuras import figura
 from scipy.stats import binom
 import io
+from instrumentacion import etapa, iniciar_medicion, mostrar_tiempos
 
 # --- 1. Configuración de la Página ---
 st.set_page_config(
@@ -11,6 +12,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_medicion(__file__)
 
 # --- 2. Barra Lateral con Controles ---
 with st.sidebar:
@@ -81,47 +83,49 @@ try:
     # Preparar datos para el gráfico
     # Necesitamos k hasta n+1 para dibujar el último escalón
     k_values = np.arange(0, n_ensayos + 2)
-    cdf_values = np.array([binom.cdf(k, n_ensayos, prob_exito) for k in k_values])
+    with etapa("cálculo"):
+        cdf_values = np.array([binom.cdf(k, n_ensayos, prob_exito) for k in k_values])
 
-    fig, ax = plt.subplots(figsize=(12, 7))
+    with figura(figsize=(12, 7)) as (fig, ax):
 
-    # DIBUJAR LA CDF COMO FUNCIÓN ESCALONADA (Líneas horizontales)
-    ax.hlines(y=cdf_values[:-1], xmin=k_values[:-1], xmax=k_values[1:],
-              colors='blue', linestyles='solid', linewidth=2, label='CDF Binomial P(X ≤ k)')
+        # DIBUJAR LA CDF COMO FUNCIÓN ESCALONADA (Líneas horizontales)
+        ax.hlines(y=cdf_values[:-1], xmin=k_values[:-1], xmax=k_values[1:],
+                  colors='blue', linestyles='solid', linewidth=2, label='CDF Binomial P(X ≤ k)')
 
-    # DIBUJAR PUNTOS SÓLIDOS en los saltos para mayor claridad
-    ax.scatter(k_values[:-1], cdf_values[:-1], color='blue', zorder=5)
+        # DIBUJAR PUNTOS SÓLIDOS en los saltos para mayor claridad
+        ax.scatter(k_values[:-1], cdf_values[:-1], color='blue', zorder=5)
 
-    # DESTACAR LA PROBABILIDAD ACUMULADA para el k seleccionado
-    if k_seleccionado <= n_ensayos:
-        ax.hlines(y=prob_acumulada_k, xmin=-0.5, xmax=k_seleccionado, colors='purple', linestyles='--',
-                  label=f'$P(X \leq {k_seleccionado}) = {prob_acumulada_k:.4f}$')
-        ax.plot([k_seleccionado, k_seleccionado], [0, prob_acumulada_k], 'purple', linestyle='--') # Línea vertical
+        # DESTACAR LA PROBABILIDAD ACUMULADA para el k seleccionado
+        if k_seleccionado <= n_ensayos:
+            ax.hlines(y=prob_acumulada_k, xmin=-0.5, xmax=k_seleccionado, colors='purple', linestyles='--',
+                      label=f'$P(X \leq {k_seleccionado}) = {prob_acumulada_k:.4f}$')
+            ax.plot([k_seleccionado, k_seleccionado], [0, prob_acumulada_k], 'purple', linestyle='--') # Línea vertical
 
-    # Estilo y etiquetas del gráfico
-    ax.set_xlabel('Número de Éxitos (k)', fontsize=12)
-    ax.set_ylabel('Probabilidad Acumulada P(X ≤ k)', fontsize=12)
-    ax.set_title(f'Función de Distribución Acumulada (CDF)', fontsize=16, fontweight='bold')
+        # Estilo y etiquetas del gráfico
+        ax.set_xlabel('Número de Éxitos (k)', fontsize=12)
+        ax.set_ylabel('Probabilidad Acumulada P(X ≤ k)', fontsize=12)
+        ax.set_title(f'Función de Distribución Acumulada (CDF)', fontsize=16, fontweight='bold')
     
-    ax.legend(loc='lower right')
-    ax.grid(True, linestyle='--', alpha=0.6, axis='y')
-    ax.set_xticks(range(n_ensayos + 1)) 
-    ax.set_xlim(-0.5, n_ensayos + 0.5) 
-    ax.set_ylim(0, 1.05) 
-
-    # Mostrar el gráfico en Streamlit
-    st.pyplot(fig)
-
-    # --- BOTÓN DE DESCARGA ---
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", dpi=300, bbox_inches='tight')
+        ax.legend(loc='lower right')
+        ax.grid(True, linestyle='--', alpha=0.6, axis='y')
+        ax.set_xticks(range(n_ensayos + 1)) 
+        ax.set_xlim(-0.5, n_ensayos + 0.5) 
+        ax.set_ylim(0, 1.05) 
+
+        # Mostrar el gráfico en Streamlit
+        st.pyplot(fig)
+
+        # --- BOTÓN DE DESCARGA ---
+        buf = io.BytesIO()
+        with etapa("exportación"):
+            fig.savefig(buf, format="png", dpi=300, bbox_inches='tight')
     
-    st.download_button(
-        label="📥 Descargar Gráfico de la CDF",
-        data=buf.getvalue(),
-        file_name=f"CDF_binomial_n{n_ensayos}_p{prob_exito:.2f}.png",
-        mime="image/png"
-    )
+        st.download_button(
+            label="📥 Descargar Gráfico de la CDF",
+            data=buf.getvalue(),
+            file_name=f"CDF_binomial_n{n_ensayos}_p{prob_exito:.2f}.png",
+            mime="image/png"
+        )
 
     # --- Interpretación ---
     with st.expander("Ver Interpretación de la CDF"):
@@ -142,4 +146,7 @@ try:
         )
 
 except Exception as e:
-    st.error(f"Ocurrió un error al generar el gráfico: {e}")
\ No newline at end of file
+    st.error(f"Ocurrió un error al generar el gráfico: {e}")
+
+# --- Tiempos por Etapa (solo con MEDIR_ETAPAS=1) ---
+mostrar_tiempos()
@@ -1,8 +1,9 @@
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
+from figuras import GraficoBarras, boton_descarga, reutilizar_grafico
+from graficos_interactivos import barras_distribucion, elegir_motor_graficos
 from scipy.stats import poisson
-import io
+from instrumentacion import etapa, iniciar_medicion, mostrar_tiempos
 
 # --- 1. Configuración de la Página ---
 st.set_page_config(
@@ -11,6 +12,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_medicion(__file__)
 
 # --- 2. Barra Lateral con Controles ---
 with st.sidebar:
@@ -33,6 +35,9 @@ with st.sidebar:
         help="El número promedio de veces que ocurre un evento en un intervalo."
     )
 
+    st.markdown("---")
+    usar_plotly = elegir_motor_graficos()
+
 # --- 3. Panel Principal ---
 st.title("🔔 Distribución de Poisson")
 st.write(
@@ -132,9 +137,23 @@ st.subheader(f"Gráfico de la Distribución de Poisson: λ = {lambda_avg}")
 try:
     max_k_grafico = max(20, int(lambda_avg * 2.5))
     k_values = np.arange(0, max_k_grafico + 1)
-    probabilities = poisson.pmf(k=k_values, mu=lambda_avg)
 
-    fig, ax = plt.subplots(figsize=(12, 7))
+    with etapa("cálculo"):
+        probabilities = poisson.pmf(k=k_values, mu=lambda_avg)
+
+    def construir_grafico():
+        grafico = GraficoBarras(k_values, probabilities, 'skyblue', 'navy', alpha=0.7)
+        ax = grafico.ax
+        ax.set_xlabel('Número de Ocurrencias (k)', fontsize=12)
+        ax.set_ylabel('Probabilidad', fontsize=12)
+        ax.set_title(f'Distribución de Poisson (λ={lambda_avg})', fontsize=16, fontweight='bold')
+        
+        grafico.leyenda('Probabilidad P(X=k)', 'Probabilidad Calculada')
+        ax.grid(True, linestyle='--', alpha=0.6, axis='y')
+        ax.set_xticks(k_values)
+        ax.tick_params(axis='x', labelrotation=90)
+        ax.set_xlim(-0.5, max_k_grafico + 0.5)
+        return grafico
 
     # Identificar las barras a resaltar
     resaltar_mask = np.zeros_like(k_values, dtype=bool)
@@ -151,31 +170,21 @@ try:
     elif "En un rango" in tipo_calculo: # MÁSCARA PARA LA NUEVA VISUALIZACIÓN
         resaltar_mask = (k_values >= k_min_range) & (k_values <= k_max_range)
     
-    # Gráfico de barras
-    ax.bar(k_values, probabilities, color='skyblue', alpha=0.7, label='Probabilidad P(X=k)')
-    ax.bar(k_values[resaltar_mask], probabilities[resaltar_mask], color='navy', label=f'Probabilidad Calculada ({prob_calculada:.4f})')
-
-    ax.set_xlabel('Número de Ocurrencias (k)', fontsize=12)
-    ax.set_ylabel('Probabilidad', fontsize=12)
-    ax.set_title(f'Distribución de Poisson (λ={lambda_avg})', fontsize=16, fontweight='bold')
-    
-    ax.legend()
-    ax.grid(True, linestyle='--', alpha=0.6, axis='y')
-    ax.set_xticks(k_values)
-    plt.xticks(rotation=90)
-    ax.set_xlim(-0.5, max_k_grafico + 0.5)
+    if usar_plotly:
+        # Solo se envían el vector de probabilidades y la máscara; el navegador dibuja las barras
+        st.plotly_chart(barras_distribucion(k_values, probabilities, resaltar_mask, ('skyblue', 'navy'),
+                                            ('Probabilidad P(X=k)', f'Probabilidad Calculada ({prob_calculada:.4f})'),
+                                            f'Distribución de Poisson (λ={lambda_avg})', 'Número de Ocurrencias (k)'),
+                        use_container_width=True)
+    else:
+        # El gráfico se construye una vez por λ; cambiar k o el tipo de cálculo solo recolorea las barras que cambian
+        grafico = reutilizar_grafico(st.session_state, "grafico_poisson", lambda_avg, construir_grafico)
+        png = grafico.resaltar(resaltar_mask, f'Probabilidad Calculada ({prob_calculada:.4f})')
 
-    st.pyplot(fig)
+        st.image(png, use_container_width=True)
 
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", dpi=300, bbox_inches='tight')
-    
-    st.download_button(
-        label="📥 Descargar Gráfico",
-        data=buf.getvalue(),
-        file_name=f"poisson_lambda{lambda_avg:.2f}.png",
-        mime="image/png"
-    )
+        # A 300 dpi y recortada, como antes, pero solo cuando se pide; la pantalla usa el blit
+        boton_descarga(grafico, f"poisson_lambda{lambda_avg:.2f}.png", "preparar_descarga_poisson")
 
     with st.expander("Ver Interpretación de los Parámetros"):
         st.markdown(f"**Tasa Promedio (λ = {lambda_avg}):** Representa el número promedio de eventos que se espera que ocurran en un intervalo.")
@@ -184,3 +193,6 @@ try:
 
 except Exception as e:
     st.error(f"Ocurrió un error al generar el gráfico: {e}")
+
+# --- Tiempos por Etapa (solo con MEDIR_ETAPAS=1) ---
+mostrar_tiempos()
@@ -1,8 +1,9 @@
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
+from figuras import GraficoBarras, boton_descarga, reutilizar_grafico
+from graficos_interactivos import barras_distribucion, elegir_motor_graficos
 from scipy.stats import hypergeom
-import io
+from instrumentacion import etapa, iniciar_medicion, mostrar_tiempos
 
 # --- 1. Configuración de la Página ---
 st.set_page_config(
@@ -11,6 +12,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_medicion(__file__)
 
 # --- 2. Barra Lateral con Controles ---
 with st.sidebar:
@@ -49,6 +51,9 @@ with st.sidebar:
         help="El número de elementos extraídos de la población sin reemplazo. Ej: 15 bombillas inspeccionadas."
     )
 
+    st.markdown("---")
+    usar_plotly = elegir_motor_graficos()
+
 # --- 3. Panel Principal ---
 st.title("🏭 Distribución Hipergeométrica")
 st.write(
@@ -131,9 +136,21 @@ st.subheader(f"Gráfico de la Distribución Hipergeométrica")
 
 try:
     k_values = np.arange(0, max_k_slider + 1)
-    probabilities = hypergeom.pmf(k_values, M=M, n=n_scipy, N=N_scipy)
 
-    fig, ax = plt.subplots(figsize=(12, 7))
+    with etapa("cálculo"):
+        probabilities = hypergeom.pmf(k_values, M=M, n=n_scipy, N=N_scipy)
+
+    def construir_grafico():
+        grafico = GraficoBarras(k_values, probabilities, 'c', 'darkcyan', alpha=0.7)
+        ax = grafico.ax
+        ax.set_xlabel('Número de Éxitos en la Muestra (k)', fontsize=12)
+        ax.set_ylabel('Probabilidad', fontsize=12)
+        ax.set_title(f'Distribución Hipergeométrica', fontsize=16, fontweight='bold')
+        grafico.leyenda('Probabilidad P(X=k)', 'Probabilidad Calculada')
+        ax.grid(True, linestyle='--', alpha=0.6, axis='y')
+        ax.set_xticks(k_values)
+        ax.set_xlim(-0.5, max_k_slider + 0.5)
+        return grafico
 
     # Máscara para resaltar las barras
     resaltar_mask = np.zeros_like(k_values, dtype=bool)
@@ -147,22 +164,19 @@ try:
     elif "Al menos" in tipo_calculo: resaltar_mask = (k_values >= k_seleccionado)
     elif "Más de" in tipo_calculo: resaltar_mask = (k_values > k_seleccionado)
 
-    ax.bar(k_values, probabilities, color='c', alpha=0.7, label='Probabilidad P(X=k)')
-    ax.bar(k_values[resaltar_mask], probabilities[resaltar_mask], color='darkcyan', label=f'Probabilidad Calculada ({prob_calculada:.4f})')
-    
-    ax.set_xlabel('Número de Éxitos en la Muestra (k)', fontsize=12)
-    ax.set_ylabel('Probabilidad', fontsize=12)
-    ax.set_title(f'Distribución Hipergeométrica', fontsize=16, fontweight='bold')
-    ax.legend()
-    ax.grid(True, linestyle='--', alpha=0.6, axis='y')
-    ax.set_xticks(k_values)
-    ax.set_xlim(-0.5, max_k_slider + 0.5)
-
-    st.pyplot(fig)
+    if usar_plotly:
+        # Solo se envían el vector de probabilidades y la máscara; el navegador dibuja las barras
+        st.plotly_chart(barras_distribucion(k_values, probabilities, resaltar_mask, ('c', 'darkcyan'),
+                                            ('Probabilidad P(X=k)', f'Probabilidad Calculada ({prob_calculada:.4f})'),
+                                            'Distribución Hipergeométrica', 'Número de Éxitos en la Muestra (k)'),
+                        use_container_width=True)
+    else:
+        # El gráfico se construye una vez por (N, K, n); cambiar k solo recolorea las barras que cambian
+        grafico = reutilizar_grafico(st.session_state, "grafico_hipergeometrica", (M, n_scipy, N_scipy), construir_grafico)
+        png = grafico.resaltar(resaltar_mask, f'Probabilidad Calculada ({prob_calculada:.4f})')
 
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", dpi=300, bbox_inches='tight')
-    st.download_button(label="📥 Descargar Gráfico", data=buf.getvalue(), file_name="hypergeometric_dist.png", mime="image/png")
+        st.image(png, use_container_width=True)
+        boton_descarga(grafico, "hypergeometric_dist.png", "preparar_descarga_hipergeometrica")
 
     with st.expander("Ver Interpretación de los Parámetros (Ej: Bombillas)"):
         st.markdown(f"**Población Total (N = {poblacion_N}):** El lote completo consta de {poblacion_N} bombillas.")
@@ -172,3 +186,6 @@ try:
 
 except Exception as e:
     st.error(f"Ocurrió un error al generar el gráfico: {e}")
+
+# --- Tiempos por Etapa (solo con MEDIR_ETAPAS=1) ---
+mostrar_tiempos()
@@ -0,0 +1,45 @@
+# app.py (punto de entrada único: todas las herramientas como páginas de una sola aplicación)
+#
+# Uso:  streamlit run app.py
+# Las catorce herramientas corren en un solo proceso en lugar de un servidor por script. Eso
+# permite compartir lo siguiente:
+#   - las librerías importadas (numpy, pandas, scipy, matplotlib se cargan una vez por proceso);
+#   - el caché de ingestión de carga_datos (st.cache_data, por file_id) y el depósito de figuras
+#     de figuras.py, que son globales del proceso;
+#   - el archivo subido: carga_datos.archivo_compartido recuerda en la sesión su nombre y file_id
+#     (no sus bytes), así que un CSV subido en la página de la media aparece ya cargado, desde el
+#     caché de cargar_csv, en la desviación estándar o el IQR.
+# Cada script sigue funcionando por separado con `streamlit run <script>.py`. Este archivo no
+# dibuja nada antes de pagina.run(), para que cada página pueda llamar a st.set_page_config.
+
+import streamlit as st
+
+PAGINAS = {
+    "Herramientas de Visualización": [
+        st.Page("22_GBarras.py", title="Gráfico de Barras", icon="📊", url_path="barras"),
+    ],
+    "Capítulo 3: Medidas de Tendencia Central": [
+        st.Page("cap3_1_media.py", title="3.1 Media", icon="⚖️", url_path="media", default=True),
+        st.Page("cap3_1_mediana.py", title="3.1 Media y Mediana", icon="⚖️", url_path="mediana"),
+        st.Page("cap31_moda.py", title="3.1 Media, Mediana y Moda", icon="⚖️", url_path="moda"),
+    ],
+    "Capítulo 3: Medidas de Dispersión": [
+        st.Page("32_std.py", title="3.2 Desviación Estándar", icon="📏", url_path="desviacion-estandar"),
+        st.Page("32_media_std.py", title="3.2 Explorador de Distribución", icon="🔔", url_path="explorador"),
+        st.Page("32_Regla_Empirica.py", title="3.3 Regla Empírica", icon="🔔", url_path="regla-empirica"),
+        st.Page("32_IQR.py", title="3.4 Rango Intercuartílico", icon="📦", url_path="iqr"),
+    ],
+    "Capítulo 4: Datos Categóricos y Regresión": [
+        st.Page("41_tabla_contingencia.py", title="4.1 Tablas de Contingencia", icon="🧮", url_path="contingencia"),
+        st.Page("42_regresion_lineal.py", title="4.2 Regresión Lineal Simple", icon="📈", url_path="regresion"),
+    ],
+    "Capítulo 5: Distribuciones Discretas": [
+        st.Page("52_Binomial.py", title="5.2 Distribución Binomial", icon="📊", url_path="binomial"),
+        st.Page("52_Binomial_Acumulada.py", title="5.2.1 CDF Binomial", icon="📈", url_path="binomial-acumulada"),
+        st.Page("53_Poisson.py", title="5.3 Distribución de Poisson", icon="🔔", url_path="poisson"),
+        st.Page("54_hipergeometrica.py", title="5.4 Distribución Hipergeométrica", icon="🏭", url_path="hipergeometrica"),
+    ],
+}
+
+pagina = st.navigation(PAGINAS)
+pagina.run()
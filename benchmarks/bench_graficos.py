@@ -0,0 +1,117 @@
+# bench_graficos.py (tiempo de servidor por interacción: matplotlib a PNG frente a Plotly a JSON)
+#
+# Uso:  python benchmarks/bench_graficos.py [filas]
+# Con matplotlib el servidor rasteriza el gráfico en cada interacción; con graficos_interactivos
+# solo serializa a JSON los datos ya agregados y el navegador dibuja. El script cronometra ambos
+# caminos para cada tipo de gráfico con datos sintéticos e informa también el tamaño enviado.
+
+import os
+import sys
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import seaborn as sns  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from figuras import a_png, figura  # noqa: E402
+from graficos_interactivos import (barras_distribucion, diagrama_caja, dispersion, histograma,  # noqa: E402
+                                   mapa_calor)
+
+FILAS = 200_000
+REPETICIONES = 3
+
+
+def cronometrar(funcion):
+    """Mejor tiempo de REPETICIONES ejecuciones, y el resultado de la última."""
+    mejor = float("inf")
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+# --- Camino matplotlib (igual que en las aplicaciones) ---
+def png_histograma(datos):
+    with figura(figsize=(10, 5)) as (fig, ax):
+        ax.hist(datos, bins="auto", edgecolor="black", alpha=0.7)
+        ax.axvline(datos.mean(), color="red", linestyle="dashed")
+        return a_png(fig)
+
+
+def png_caja(datos):
+    with figura(figsize=(10, 5)) as (fig, ax):
+        ax.boxplot(datos, vert=False, patch_artist=True)
+        return a_png(fig)
+
+
+def png_dispersion(x, y, pendiente, intercepto):
+    with figura(figsize=(10, 6)) as (fig, ax):
+        ax.scatter(x, y, s=20)
+        extremos = np.array([x.min(), x.max()])
+        ax.plot(extremos, intercepto + pendiente * extremos, color="red")
+        return a_png(fig)
+
+
+def png_mapa_calor(tabla):
+    with figura(figsize=(10, 6)) as (fig, ax):
+        sns.heatmap(tabla, annot=True, fmt="d", cmap="Blues", ax=ax)
+        return a_png(fig)
+
+
+def png_barras(k, probabilidades, mascara):
+    with figura(figsize=(12, 7)) as (fig, ax):
+        barras = ax.bar(k, probabilidades, color="skyblue")
+        for barra in np.asarray(barras)[mascara]:
+            barra.set_facecolor("navy")
+        return a_png(fig)
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else FILAS
+    rng = np.random.default_rng(42)
+    datos = pd.Series(rng.normal(50, 10, filas))
+    x = datos.to_numpy()
+    y = 3 * x + rng.normal(0, 5, filas)
+    pendiente, intercepto = np.polyfit(x, y, 1)
+    tabla = pd.crosstab(rng.choice(list("ABCDEFGHIJ"), filas), rng.choice(list("abcdefghij"), filas))
+    k = np.arange(41)
+    probabilidades = np.exp(-6.0) * 6.0 ** k / np.cumprod(np.r_[1, np.arange(1, 41)]).astype(float)
+    mascara = k <= 6
+
+    # Las agregaciones (conteos, cuartiles) ya están en caché en las aplicaciones; no cuentan por interacción
+    frecuencias, bins = np.histogram(x, bins="auto")
+    q1, mediana, q3 = np.percentile(x, [25, 50, 75])
+    iqr = q3 - q1
+    dentro = datos[datos.between(q1 - 1.5 * iqr, q3 + 1.5 * iqr)]
+    outliers = datos[(datos < q1 - 1.5 * iqr) | (datos > q3 + 1.5 * iqr)]
+
+    casos = [
+        ("Histograma", lambda: png_histograma(datos),
+         lambda: histograma(frecuencias, bins, "#0288d1", "Histograma", "x").to_json()),
+        ("Caja", lambda: png_caja(x),
+         lambda: diagrama_caja(q1, mediana, q3, dentro.min(), dentro.max(), outliers, "#A9CCE3", "Caja", "x").to_json()),
+        ("Dispersión", lambda: png_dispersion(x, y, pendiente, intercepto),
+         lambda: dispersion(x, y, [{"pendiente": pendiente, "intercepto": intercepto, "nombre": "MCO"}],
+                            "Dispersión", "x", "y").to_json()),
+        ("Mapa de calor", lambda: png_mapa_calor(tabla),
+         lambda: mapa_calor(tabla, "Mapa de calor", "c", "f").to_json()),
+        ("Barras PMF", lambda: png_barras(k, probabilidades, mascara),
+         lambda: barras_distribucion(k, probabilidades, mascara, ("skyblue", "navy"), ("P(X=k)", "P(X≤6)"),
+                                     "Poisson", "k").to_json()),
+    ]
+
+    print(f"Filas: {filas:,}\n")
+    print(f"{'Gráfico':<16} {'PNG (s)':>9} {'JSON (s)':>9} {'Aceleración':>12} {'PNG (KB)':>10} {'JSON (KB)':>10}")
+    for nombre, con_png, con_json in casos:
+        t_png, png = cronometrar(con_png)
+        t_json, carga = cronometrar(con_json)
+        print(f"{nombre:<16} {t_png:>9.3f} {t_json:>9.4f} {t_png / max(t_json, 1e-9):>11.1f}x "
+              f"{len(png) / 1024:>10.1f} {len(carga.encode('utf-8')) / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
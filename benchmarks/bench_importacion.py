@@ -0,0 +1,89 @@
+# bench_importacion.py (coste de importación de cada aplicación en un arranque en frío)
+#
+# Uso:  python benchmarks/bench_importacion.py [aplicacion.py ...]
+# Para cada aplicación toma solo sus importaciones de nivel superior (lo que se ejecuta antes de
+# que la página llegue a st.stop() sin archivo) y las ejecuta en un intérprete nuevo con
+# `python -X importtime`, después de importar streamlit, que se carga de todos modos. Informa el
+# tiempo acumulado de esas importaciones y qué módulos pesados arrastran. Las aplicaciones que
+# esperan un archivo no deben cargar ninguno de MODULOS_PESADOS antes de tenerlo: si alguna lo
+# hace, el script termina con código 1 para detectar la regresión.
+
+import ast
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+MODULOS_PESADOS = ("matplotlib", "seaborn", "scipy", "plotly", "statsmodels")
+REPETICIONES = 3
+
+
+def importaciones_de_nivel_superior(ruta):
+    """Código con las sentencias import del nivel superior del archivo, en su orden original."""
+    arbol = ast.parse(ruta.read_text(encoding="utf-8"))
+    return "\n".join(ast.unparse(nodo) for nodo in arbol.body if isinstance(nodo, (ast.Import, ast.ImportFrom)))
+
+
+def espera_archivo(ruta):
+    """Si la página pide un archivo (archivo_compartido o st.file_uploader) antes de dibujar nada."""
+    codigo = ruta.read_text(encoding="utf-8")
+    return any(llamada in codigo for llamada in ("archivo_compartido(", "file_uploader("))
+
+
+def medir(codigo):
+    """
+    Ejecuta `codigo` tras `import streamlit` con -X importtime. Devuelve los milisegundos
+    acumulados de las importaciones posteriores a streamlit y los módulos que cargaron.
+    """
+    entorno = dict(os.environ, PYTHONPATH=str(RAIZ))
+    salida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import streamlit\n" + codigo],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True, check=True
+    ).stderr
+
+    microsegundos = 0
+    modulos = []
+    despues_de_streamlit = False
+    for linea in salida.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, nombre = linea.split("|")
+        nivel = (len(nombre) - len(nombre.lstrip()) - 1) // 2
+        nombre = nombre.strip()
+        if not despues_de_streamlit:
+            # -X importtime escribe cada módulo al terminar de cargarse: todo lo anterior a la
+            # línea de streamlit (nivel 0) son dependencias de streamlit
+            despues_de_streamlit = nivel == 0 and nombre == "streamlit"
+            continue
+        modulos.append(nombre)
+        if nivel == 0:
+            microsegundos += int(acumulado)
+    return microsegundos / 1000, modulos
+
+
+def main():
+    rutas = [RAIZ / nombre for nombre in sys.argv[1:]] or sorted(
+        ruta for ruta in RAIZ.glob("*.py") if ruta.name[0].isdigit() or ruta.name.startswith("cap")
+    )
+
+    regresiones = []
+    print(f"{'Aplicación':<28} {'Importación (ms)':>17}  Módulos pesados")
+    for ruta in rutas:
+        codigo = importaciones_de_nivel_superior(ruta)
+        mediciones = [medir(codigo) for _ in range(REPETICIONES)]
+        milisegundos = min(ms for ms, _ in mediciones)
+        pesados = sorted({m.split(".")[0] for m in mediciones[0][1]} & set(MODULOS_PESADOS))
+        print(f"{ruta.name:<28} {milisegundos:>17.1f}  {', '.join(pesados) or '-'}")
+        if pesados and espera_archivo(ruta):
+            regresiones.append((ruta.name, pesados))
+
+    if regresiones:
+        print("\nEstas aplicaciones cargan módulos pesados antes de recibir un archivo:")
+        for nombre, pesados in regresiones:
+            print(f"  {nombre}: {', '.join(pesados)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
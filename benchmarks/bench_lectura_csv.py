@@ -0,0 +1,69 @@
+# bench_lectura_csv.py (compara los motores de lectura de carga_datos.py)
+#
+# Uso:  python benchmarks/bench_lectura_csv.py [tamaños en MB...]
+# Por defecto genera archivos sintéticos de 10 MB, 100 MB y 1 GB. Cada motor se mide dos veces:
+# desde bytes en memoria (leer_csv_bytes, subidas pequeñas) y desde el archivo en disco
+# (leer_csv_ruta, subidas que carga_datos vuelca a disco). 'auto' muestra qué motor elige.
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from carga_datos import elegir_motor, leer_csv_bytes, leer_csv_ruta, pyarrow_disponible  # noqa: E402
+
+TAMANOS_MB = [10, 100, 1000]
+FILAS_POR_LOTE = 200_000
+
+
+def generar_csv(ruta, tamano_mb, semilla=42):
+    """Escribe un CSV sintético (numéricas + categóricas) de aproximadamente `tamano_mb` MB."""
+    rng = np.random.default_rng(semilla)
+    objetivo = tamano_mb * 1024 * 1024
+    categorias = np.array(["norte", "sur", "este", "oeste", "centro"])
+    primera = True
+    with open(ruta, "w", encoding="utf-8") as f:
+        while f.tell() < objetivo:
+            lote = pd.DataFrame({
+                "id": rng.integers(0, 1_000_000, FILAS_POR_LOTE),
+                "valor": rng.normal(50, 10, FILAS_POR_LOTE).round(4),
+                "precio": rng.exponential(100, FILAS_POR_LOTE).round(2),
+                "region": categorias[rng.integers(0, len(categorias), FILAS_POR_LOTE)],
+            })
+            lote.to_csv(f, index=False, header=primera)
+            primera = False
+
+
+def medir(leer, fuente, motor):
+    inicio = time.perf_counter()
+    df = leer(fuente, motor=motor)
+    return time.perf_counter() - inicio, len(df)
+
+
+def main():
+    tamanos = [int(t) for t in sys.argv[1:]] or TAMANOS_MB
+    motores = ["pandas", "procesos"] + (["pyarrow"] if pyarrow_disponible() else []) + ["auto"]
+
+    print(f"{'Tamaño':>8} {'Origen':>7} {'Motor':>18} {'Filas':>12} {'Segundos':>10} {'MB/s':>8}")
+    with tempfile.TemporaryDirectory() as carpeta:
+        for tamano_mb in tamanos:
+            ruta = os.path.join(carpeta, f"sintetico_{tamano_mb}mb.csv")
+            generar_csv(ruta, tamano_mb)
+            with open(ruta, "rb") as f:
+                datos = f.read()
+            mb = len(datos) / (1024 * 1024)
+            for origen, leer, fuente in (("bytes", leer_csv_bytes, datos), ("ruta", leer_csv_ruta, ruta)):
+                for motor in motores:
+                    segundos, filas = medir(leer, fuente, motor)
+                    nombre = f"auto→{elegir_motor(len(datos))}" if motor == "auto" else motor
+                    print(f"{tamano_mb:>6}MB {origen:>7} {nombre:>18} {filas:>12,} {segundos:>10.2f} {mb / segundos:>8.1f}")
+            del datos
+            os.remove(ruta)
+
+
+if __name__ == "__main__":
+    main()
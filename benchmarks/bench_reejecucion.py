@@ -0,0 +1,142 @@
+# bench_reejecucion.py (mide cuánto ahorra cada widget al re-ejecutar solo su fragmento)
+#
+# Uso:  python benchmarks/bench_reejecucion.py [filas]
+# Cada aplicación corre de verdad con streamlit.testing (AppTest), con un CSV sintético ya
+# "subido" en la sesión. Para cada widget de presentación se cambia su valor y se vuelve a
+# ejecutar la página completa, como haría Streamlit si el widget no estuviera en un fragmento
+# (los cachés de ingestión y cálculo ya están calientes, igual que en un rerun real).
+# AppTest siempre ejecuta el script completo, así que el rerun del fragmento se mide dentro de
+# esa misma ejecución: st.fragment se envuelve con un cronómetro y se toma el tiempo del cuerpo
+# del fragmento, que es exactamente el código que Streamlit vuelve a ejecutar en un rerun del
+# fragmento (sin la sobrecarga fija del propio rerun, que es la misma en ambos casos).
+
+import functools
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.uploaded_file_manager import UploadedFile, UploadedFileRec
+from streamlit.testing.v1 import AppTest
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+from carga_datos import CLAVE_ARCHIVO_SESION  # noqa: E402
+
+FILAS = 500_000
+REPETICIONES = 3
+TIEMPO_MAXIMO = 300  # segundos por ejecución de AppTest
+
+
+def _color(at, i):
+    at.color_picker[0].pick(("#ff0000", "#00aa00")[i % 2])
+
+
+def _top_n(at, i):
+    next(w for w in at.number_input if "Top N" in w.label).set_value((10, 30)[i % 2])
+
+
+def _alpha(at, i):
+    at.slider(key="alpha").set_value((0.01, 0.10)[i % 2])
+
+
+def _prediccion(at, i):
+    slider = at.slider[0]
+    slider.set_value(slider.min + (0.25, 0.75)[i % 2] * (slider.max - slider.min))
+
+
+# (aplicación, fragmento que contiene el widget, widget, cómo cambiarlo): cada cambio alterna entre dos valores
+WIDGETS = [
+    ("32_std.py", "mostrar_histograma", "color", _color),
+    ("32_IQR.py", "mostrar_diagrama", "color", _color),
+    ("32_Regla_Empirica.py", "mostrar_histograma", "color", _color),
+    ("cap3_1_media.py", "mostrar_histograma", "color", _color),
+    ("cap3_1_mediana.py", "mostrar_histograma", "color", _color),
+    ("cap31_moda.py", "mostrar_histograma", "color", _color),
+    ("22_GBarras.py", "mostrar_grafico", "top_n", _top_n),
+    ("41_tabla_contingencia.py", "mostrar_decision", "alpha", _alpha),
+    ("42_regresion_lineal.py", "mostrar_prediccion", "prediccion_x", _prediccion),
+]
+
+_tiempos_fragmento = {}
+
+
+def _cronometrar_fragmentos():
+    """Sustituye st.fragment por una versión que suma el tiempo de cada cuerpo de fragmento por nombre."""
+    original = st.fragment
+
+    def fragmento(func=None, **opciones):
+        if func is None:
+            return lambda f: fragmento(f, **opciones)
+
+        @functools.wraps(func)
+        def cronometrado(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _tiempos_fragmento[func.__name__] = _tiempos_fragmento.get(func.__name__, 0.0) + time.perf_counter() - inicio
+        return original(cronometrado, **opciones)
+
+    st.fragment = fragmento
+
+
+def generar_csv(filas, semilla=42):
+    """CSV sintético con columnas categóricas y numéricas, como bytes (igual que una subida)."""
+    rng = np.random.default_rng(semilla)
+    x = rng.normal(50, 10, filas)
+    df = pd.DataFrame({
+        "region": rng.choice(["norte", "sur", "este", "oeste", "centro"], filas),
+        "x": x.round(4),
+        "y": (3 * x + rng.normal(0, 5, filas)).round(4),
+        "producto": rng.choice([f"p{i}" for i in range(40)], filas),
+    })
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def ejecutar(at, aplicacion):
+    """Ejecuta la página completa y devuelve su duración; falla si la página mostró un error."""
+    _tiempos_fragmento.clear()
+    inicio = time.perf_counter()
+    at.run(timeout=TIEMPO_MAXIMO)
+    segundos = time.perf_counter() - inicio
+    if at.exception or at.error:
+        mensajes = [e.value for e in at.exception] + [e.value for e in at.error]
+        raise RuntimeError(f"{aplicacion}: {mensajes}")
+    return segundos
+
+
+def medir(aplicacion, nombre_fragmento, cambiar, datos_csv):
+    at = AppTest.from_file(str(RAIZ / aplicacion), default_timeout=TIEMPO_MAXIMO)
+    at.session_state[CLAVE_ARCHIVO_SESION] = UploadedFile(
+        UploadedFileRec(file_id=f"bench-{len(datos_csv)}", name="datos.csv", type="text/csv", data=datos_csv), None)
+    ejecutar(at, aplicacion)  # Primera ejecución: llena los cachés de ingestión y cálculo
+
+    completa, fragmento = float("inf"), float("inf")
+    for i in range(REPETICIONES):
+        cambiar(at, i)
+        completa = min(completa, ejecutar(at, aplicacion))
+        if nombre_fragmento not in _tiempos_fragmento:
+            raise RuntimeError(f"{aplicacion}: el fragmento {nombre_fragmento} no se ejecutó")
+        fragmento = min(fragmento, _tiempos_fragmento[nombre_fragmento])
+    return completa, fragmento
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else FILAS
+    datos_csv = generar_csv(filas)
+    _cronometrar_fragmentos()
+    os.chdir(RAIZ)
+
+    print(f"Filas: {filas:,}   (mejor de {REPETICIONES} cambios por widget)\n")
+    print(f"{'Aplicación':<26} {'Widget':<14} {'Página (s)':>11} {'Fragmento (s)':>14} {'Aceleración':>12}")
+    for aplicacion, nombre_fragmento, widget, cambiar in WIDGETS:
+        completa, fragmento = medir(aplicacion, nombre_fragmento, cambiar, datos_csv)
+        print(f"{aplicacion:<26} {widget:<14} {completa:>11.3f} {fragmento:>14.3f} {completa / max(fragmento, 1e-9):>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# soak_figuras.py (prueba de carga sostenida del gestor de figuras de figuras.py)
+#
+# Uso:  python benchmarks/soak_figuras.py [reruns]
+# Simula `reruns` ejecuciones (por defecto 10,000; p. ej. 500 para una prueba rápida) repartidas
+# entre las aplicaciones que dibujan con matplotlib, cada una en su propia sesión de
+# streamlit.testing (AppTest) que se conserva entre reruns, como la pestaña abierta de un usuario.
+# En cada rerun se cambia un control de la página, así que se recorren los caminos de dibujo
+# reales: figura() con savefig, histplot y heatmap de seaborn, el tight_layout de 22_GBarras, la
+# capa base de larga vida de la regresión y los GraficoBarras de las distribuciones (que se
+# reconstruyen y liberan al cambiar sus parámetros).
+# Cada CADA reruns imprime la memoria residente (RSS) del proceso y comprueba que las figuras del
+# depósito salen limpias (márgenes de rcParams y sin motor de layout). Termina con código 1 si
+# alguna figura reutilizada arrastra el estado de otra página o si la RSS crece más de
+# MAX_CRECIMIENTO_MB entre el primer control y el final.
+
+import gc
+import os
+import sys
+import time
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from streamlit.runtime.uploaded_file_manager import UploadedFile, UploadedFileRec  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+import figuras  # noqa: E402
+from carga_datos import CLAVE_ARCHIVO_SESION  # noqa: E402
+
+RERUNS = 10_000
+CADA = 1_000
+MAX_CRECIMIENTO_MB = 20
+FILAS = 5_000
+TIEMPO_MAXIMO = 120  # segundos por ejecución de AppTest
+
+
+def _por_etiqueta(widgets, texto):
+    return next(w for w in widgets if texto in w.label)
+
+
+def _color(at, i):
+    at.color_picker[0].pick(("#ff0000", "#00aa00")[i % 2])
+
+
+# Cada función cambia un control de su página; los parámetros de los gráficos persistentes
+# cambian cada dos reruns para alternar entre reconstruir (liberar + nueva_figura) y solo resaltar
+CAMBIOS = {
+    "32_std.py": _color,
+    "32_IQR.py": _color,
+    "32_Regla_Empirica.py": _color,
+    "cap3_1_media.py": _color,
+    "cap3_1_mediana.py": _color,
+    "cap31_moda.py": _color,
+    "22_GBarras.py": lambda at, i: _por_etiqueta(at.number_input, "Top N").set_value((10, 30)[i % 2]),
+    "41_tabla_contingencia.py": lambda at, i: at.slider(key="alpha").set_value((0.01, 0.10)[i % 2]),
+    "42_regresion_lineal.py": lambda at, i: at.slider[0].set_value(
+        at.slider[0].min + (0.25, 0.75)[i % 2] * (at.slider[0].max - at.slider[0].min)),
+    "52_Binomial.py": lambda at, i: (_por_etiqueta(at.slider, "Número de ensayos").set_value((10, 20)[i // 2 % 2]),
+                                     _por_etiqueta(at.slider, "Selecciona un número de éxitos").set_value(i % 5)),
+    "53_Poisson.py": lambda at, i: (_por_etiqueta(at.slider, "Tasa promedio").set_value((6.0, 8.0)[i // 2 % 2]),
+                                    _por_etiqueta(at.slider, "Número de ocurrencias").set_value(i % 5)),
+    "54_hipergeometrica.py": lambda at, i: (_por_etiqueta(at.number_input, "Tamaño de la muestra").set_value((15, 20)[i // 2 % 2]),
+                                            _por_etiqueta(at.slider, "Número de éxitos en la muestra").set_value(i % 3)),
+}
+
+
+def rss_mb():
+    """Memoria residente actual del proceso, en MB (Linux: /proc; si no, el máximo de getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except (OSError, ValueError):
+        import resource
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo / 1024**2 if sys.platform == "darwin" else maximo / 1024
+
+
+def generar_csv(filas, semilla=42):
+    """CSV sintético con columnas categóricas y numéricas, como bytes (igual que una subida)."""
+    rng = np.random.default_rng(semilla)
+    x = rng.normal(50, 10, filas)
+    df = pd.DataFrame({
+        "region": rng.choice(["norte", "sur", "este", "oeste", "centro"], filas),
+        "x": x.round(4),
+        "y": (3 * x + rng.normal(0, 5, filas)).round(4),
+        "producto": rng.choice([f"p{i}" for i in range(40)], filas),
+    })
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def abrir_sesiones(datos_csv):
+    """Una sesión de AppTest por aplicación, con el CSV ya subido."""
+    sesiones = {}
+    for aplicacion in CAMBIOS:
+        at = AppTest.from_file(str(RAIZ / aplicacion), default_timeout=TIEMPO_MAXIMO)
+        at.session_state[CLAVE_ARCHIVO_SESION] = UploadedFile(
+            UploadedFileRec(file_id="soak", name="datos.csv", type="text/csv", data=datos_csv), None)
+        sesiones[aplicacion] = at
+        ejecutar(at, aplicacion)
+    return sesiones
+
+
+def ejecutar(at, aplicacion):
+    at.run(timeout=TIEMPO_MAXIMO)
+    if at.exception or at.error:
+        mensajes = [e.value for e in at.exception] + [e.value for e in at.error]
+        raise RuntimeError(f"{aplicacion}: {mensajes}")
+
+
+def figuras_sucias():
+    """Vacía el depósito con nueva_figura() y cuenta las figuras que no salen con el estado por defecto."""
+    from matplotlib import rcParams
+
+    with figuras._candado:
+        n_libres = len(figuras._libres)
+    prestadas = [figuras.nueva_figura() for _ in range(n_libres)]
+    sucias = sum(
+        fig.get_layout_engine() is not None
+        or any(getattr(fig.subplotpars, nombre) != rcParams[f"figure.subplot.{nombre}"] for nombre in figuras.MARGENES)
+        for fig in prestadas
+    )
+    for fig in prestadas:
+        figuras.liberar(fig)
+    return sucias
+
+
+def main():
+    reruns = int(sys.argv[1]) if len(sys.argv) > 1 else RERUNS
+    os.chdir(RAIZ)
+    sesiones = abrir_sesiones(generar_csv(FILAS))
+    aplicaciones = list(sesiones)
+
+    print(f"{'Rerun':>8} {'RSS (MB)':>10} {'Segundos':>10} {'Figuras sucias':>15}")
+    inicio = time.perf_counter()
+    controles = []
+    sucias = 0
+    for i in range(1, reruns + 1):
+        aplicacion = aplicaciones[i % len(aplicaciones)]
+        at = sesiones[aplicacion]
+        CAMBIOS[aplicacion](at, i // len(aplicaciones))
+        ejecutar(at, aplicacion)
+        if i % CADA == 0 or i == reruns:
+            gc.collect()
+            controles.append(rss_mb())
+            sucias_control = figuras_sucias()
+            sucias += sucias_control
+            print(f"{i:>8,} {controles[-1]:>10.1f} {time.perf_counter() - inicio:>10.1f} {sucias_control:>15}")
+
+    crecimiento = controles[-1] - controles[0]
+    print(f"\nCrecimiento de RSS desde el primer control: {crecimiento:+.1f} MB")
+    if sucias:
+        print(f"{sucias} figura(s) reutilizada(s) conservaban márgenes o motor de layout de otra página.")
+    if crecimiento > MAX_CRECIMIENTO_MB:
+        print(f"La memoria crece más de {MAX_CRECIMIENTO_MB} MB: las figuras no se están liberando.")
+    if sucias or crecimiento > MAX_CRECIMIENTO_MB:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
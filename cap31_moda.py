@@ -3,8 +3,79 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from figuras import enlace_descarga, figura
 import io
+from carga_datos import archivo_compartido, cargar_csv
+from estadisticas import catalogo_columna, mostrar_precalculo, precalcular
+from graficos_interactivos import elegir_motor_graficos, histograma
+from instrumentacion import etapa, iniciar_medicion, mostrar_tiempos
+
+
+# Etapas: ingestión (cargar_csv, en caché por archivo) -> cálculo (catálogo de estadísticos por columna; frecuencias en caché por columna y bins) -> presentación (fragmento).
+# Cambiar el color solo vuelve a ejecutar el fragmento del histograma. El fragmento se llama en la
+# barra lateral, donde quedan sus controles, y dibuja el gráfico y su descarga en `espacio` (un st.empty del panel principal).
+@etapa("cálculo", "frecuencias")
+@st.cache_data(max_entries=32, show_spinner=False)
+def calcular_frecuencias(id_archivo, columna, num_bins, _datos):
+    frecuencias, bins = np.histogram(_datos, bins=num_bins)
+    marcas_clase = (bins[:-1] + bins[1:]) / 2
+
+    tabla_frecuencias = pd.DataFrame({
+        'Intervalo': [f"[{bins[i]:.2f} - {bins[i+1]:.2f})" for i in range(len(frecuencias))],
+        'Marca de Clase': marcas_clase.round(2),
+        'Frecuencia Absoluta': frecuencias,
+        'Frecuencia Relativa (%)': (frecuencias / frecuencias.sum() * 100).round(2)
+    })
+    tabla_frecuencias.iloc[-1, 0] = f"[{bins[-2]:.2f} - {bins[-1]:.2f}]"
+    tabla_frecuencias.index = np.arange(1, len(tabla_frecuencias) + 1)
+    tabla_frecuencias.index.name = "N"
+    return frecuencias, bins, tabla_frecuencias
+
+
+@st.fragment
+def mostrar_histograma(espacio, frecuencias, bins, columna, media, mediana, modas, moda_texto, usar_plotly=False):
+    color = st.color_picker(
+        "Elige un color para el histograma:",
+        value='#3498db'
+    )
+
+    if usar_plotly:
+        # Las frecuencias ya están calculadas: al navegador solo viajan los conteos y las líneas
+        lineas = [
+            dict(x=media, color='red', estilo='dashed', nombre=f'Media = {media:.2f}'),
+            dict(x=mediana, color='green', estilo='solid', nombre=f'Mediana = {mediana:.2f}'),
+        ]
+        if moda_texto != "No hay moda":
+            lineas += [dict(x=m, color='purple', estilo='dotted', nombre=f'Moda = {m:.2f}') for m in modas]
+        espacio.plotly_chart(histograma(frecuencias, bins, color, f'Distribución de {columna}', columna, lineas=lineas),
+                             use_container_width=True)
+        return
+
+    with figura(figsize=(10, 5)) as (fig, ax):
+        # Las frecuencias ya están calculadas: se dibujan como pesos sin volver a recorrer los datos
+        ax.hist(bins[:-1], bins=bins, weights=frecuencias, edgecolor='black', alpha=0.7, color=color)
+
+        ax.axvline(media, color='red', linestyle='dashed', linewidth=2.5, label=f'Media = {media:.2f}')
+        ax.axvline(mediana, color='green', linestyle='solid', linewidth=2.5, label=f'Mediana = {mediana:.2f}')
+
+        if moda_texto != "No hay moda":
+            for i, m in enumerate(modas):
+                ax.axvline(m, color='purple', linestyle='dotted', linewidth=2.5, label=f'Moda = {m:.2f}')
+
+        ax.set_title(f'Distribución de {columna}')
+        ax.set_xlabel(columna)
+        ax.set_ylabel('Frecuencia')
+        ax.legend()
+        ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+        buf = io.BytesIO()
+        with etapa("exportación"):
+            fig.savefig(buf, format="png")
+        # La descarga va con el gráfico, en el panel principal (el fragmento corre en la barra lateral)
+        with espacio.container():
+            enlace_descarga(buf.getvalue(), f"histograma_tendencia_central_{columna}.png")
+            st.pyplot(fig)
+
 
 # --- 1. Configuración de la Página ---
 st.set_page_config(
@@ -13,6 +84,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_medicion(__file__)
 
 # --- 2. Barra Lateral con Controles ---
 with st.sidebar:
@@ -25,15 +97,15 @@ with st.sidebar:
     st.markdown("---")
     
     st.header("1. Cargar Datos")
-    uploaded_file = st.file_uploader("Sube un archivo CSV", type="csv", label_visibility="collapsed")
+    uploaded_file = archivo_compartido("Sube un archivo CSV", "csv", label_visibility="collapsed")
     
     df = None
     columna = None
-    color = '#3498db'
+    usar_plotly = False
     num_bins = 15 # Valor por defecto para los bins
 
     if uploaded_file:
-        df = pd.read_csv(uploaded_file)
+        df = cargar_csv(uploaded_file)
         
         st.header("2. Seleccionar Variable y Opciones")
         numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
@@ -46,14 +118,14 @@ with st.sidebar:
             "Elige la columna para analizar:",
             options=numeric_cols
         )
+        usar_plotly = elegir_motor_graficos()
+
+        # Los estadísticos de todas las columnas se calculan en segundo plano, en el orden del selector
+        mostrar_precalculo(precalcular(df.attrs["huella"], tuple(numeric_cols), df))
         
         # Añadir control para el número de bins en la barra lateral
         num_bins = st.number_input("Número de Bins para el Histograma:", min_value=1, max_value=100, value=15, step=1)
-        
-        color = st.color_picker(
-            "Elige un color para el histograma:",
-            value='#3498db'
-        )
+        controles_grafico = st.container()  # Aquí se dibujan los controles del fragmento del histograma
 
 # --- 3. Panel Principal ---
 st.title("⚖️ Análisis de Media, Mediana y Moda")
@@ -79,9 +151,9 @@ if datos.empty or not pd.api.types.is_numeric_dtype(datos):
     st.warning("La columna seleccionada no tiene datos numéricos válidos.")
 else:
     # --- Cálculo de Medidas de Tendencia Central ---
-    media = datos.mean()
-    mediana = datos.median()
-    modas = datos.mode().tolist()
+    with etapa("cálculo"):
+        catalogo = catalogo_columna(df.attrs["huella"], columna, datos)
+        media, mediana, modas, resumen = catalogo["media"], catalogo["mediana"], catalogo["modas"], catalogo.resumen(columna)
     
     # --- Mostrar las métricas ---
     col1, col2, col3 = st.columns(3)
@@ -97,50 +169,16 @@ else:
         st.metric(label="Moda(s)", value=moda_texto)
 
     # --- Cálculo de la Tabla de Frecuencias ---
-    frecuencias, bins = np.histogram(datos, bins=num_bins)
-    marcas_clase = (bins[:-1] + bins[1:]) / 2
-    
-    tabla_frecuencias = pd.DataFrame({
-        'Intervalo': [f"[{bins[i]:.2f} - {bins[i+1]:.2f})" for i in range(len(frecuencias))],
-        'Marca de Clase': marcas_clase.round(2),
-        'Frecuencia Absoluta': frecuencias,
-        'Frecuencia Relativa (%)': (frecuencias / frecuencias.sum() * 100).round(2)
-    })
-    tabla_frecuencias.iloc[-1, 0] = f"[{bins[-2]:.2f} - {bins[-1]:.2f}]"
-    tabla_frecuencias.index = np.arange(1, len(tabla_frecuencias) + 1)
-    tabla_frecuencias.index.name = "N"
+    frecuencias, bins, tabla_frecuencias = calcular_frecuencias(uploaded_file.file_id, columna, num_bins, datos)
 
     # --- Visualización en Pestañas ---
     tab_grafico, tab_datos = st.tabs(["📈 Histograma", "📄 Tabla y Estadísticas"])
 
     with tab_grafico:
         st.subheader(f"Histograma con Medidas de Tendencia Central")
-        
-        fig, ax = plt.subplots(figsize=(10, 5))
-        ax.hist(datos, bins=num_bins, edgecolor='black', alpha=0.7, color=color)
-        
-        ax.axvline(media, color='red', linestyle='dashed', linewidth=2.5, label=f'Media = {media:.2f}')
-        ax.axvline(mediana, color='green', linestyle='solid', linewidth=2.5, label=f'Mediana = {mediana:.2f}')
-        
-        if moda_texto != "No hay moda":
-            for i, m in enumerate(modas):
-                ax.axvline(m, color='purple', linestyle='dotted', linewidth=2.5, label=f'Moda = {m:.2f}')
-        
-        ax.set_title(f'Distribución de {columna}')
-        ax.set_xlabel(columna)
-        ax.set_ylabel('Frecuencia')
-        ax.legend()
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png")
-        st.download_button(
-            label="📥 Descargar Gráfico",
-            data=buf,
-            file_name=f"histograma_tendencia_central_{columna}.png",
-            mime="image/png"
-        )
-        st.pyplot(fig)
+        espacio_grafico = st.empty()
+    with controles_grafico:
+        mostrar_histograma(espacio_grafico, frecuencias, bins, columna, media, mediana, modas, moda_texto, usar_plotly)
 
     with tab_datos:
         # --- AÑADIDO: Mostrar la Tabla de Frecuencias ---
@@ -158,7 +196,7 @@ else:
 
         # Expander para las estadísticas descriptivas
         with st.expander("Ver Resumen Estadístico Completo"):
-            stats_csv = datos.describe().to_csv().encode('utf-8')
+            stats_csv = resumen.to_csv().encode('utf-8')
             st.download_button(
                 label="📥 Descargar Estadísticas (CSV)",
                 data=stats_csv,
@@ -166,4 +204,7 @@ else:
                 mime="text/csv",
                 key=f"download-stats-{columna}" # Clave única para el botón
             )
-            st.dataframe(datos.describe())
\ No newline at end of file
+            st.dataframe(resumen)
+
+# --- Tiempos por Etapa (solo con MEDIR_ETAPAS=1) ---
+mostrar_tiempos()
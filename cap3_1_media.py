@@ -3,8 +3,56 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from figuras import enlace_descarga, figura
 import io
+from carga_datos import archivo_compartido, cargar_csv
+from estadisticas import catalogo_columna, mostrar_precalculo, precalcular
+from graficos_interactivos import elegir_motor_graficos, histograma
+from instrumentacion import etapa, iniciar_medicion, mostrar_tiempos
+
+
+# Etapas: ingestión (cargar_csv, en caché por archivo) -> cálculo (catálogo de estadísticos por columna, estadisticas.py) -> presentación (fragmento).
+# Cambiar el color solo vuelve a ejecutar el fragmento del histograma. El fragmento se llama en la
+# barra lateral, donde quedan sus controles, y dibuja el gráfico y su descarga en `espacio` (un st.empty del panel principal).
+@st.fragment
+def mostrar_histograma(espacio, datos, columna, media, usar_plotly=False):
+    color = st.color_picker(
+        "Elige un color para el histograma:",
+        value='#3498db' # Valor inicial del color
+    )
+
+    if usar_plotly:
+        # Al navegador solo viajan los conteos por bin y la posición de la media
+        frecuencias, bins = np.histogram(datos, bins=15)
+        espacio.plotly_chart(histograma(frecuencias, bins, color, f'Distribución de {columna}', columna, lineas=[
+            dict(x=media, color='red', estilo='dashed', nombre=f'Media = {media:.2f}'),
+        ]), use_container_width=True)
+        return
+
+    # --- Crear la figura del gráfico ---
+    with figura(figsize=(10, 5)) as (fig, ax):
+        # --- CAMBIO 3: Usar el color seleccionado ---
+        ax.hist(datos, bins=15, edgecolor='black', alpha=0.7, color=color)
+
+        # Añadir la línea de la media
+        ax.axvline(media, color='red', linestyle='dashed', linewidth=2, label=f'Media = {media:.2f}')
+
+        # Personalizar
+        ax.set_title(f'Distribución de {columna}')
+        ax.set_xlabel(columna)
+        ax.set_ylabel('Frecuencia')
+        ax.legend()
+        ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+        # --- Botón de descarga del gráfico ---
+        buf = io.BytesIO()
+        with etapa("exportación"):
+            fig.savefig(buf, format="png")
+        # La descarga va con el gráfico, en el panel principal (el fragmento corre en la barra lateral)
+        with espacio.container():
+            enlace_descarga(buf.getvalue(), f"histograma_media_{columna}.png")
+            st.pyplot(fig)
+
 
 # --- 1. Configuración de la Página ---
 st.set_page_config(
@@ -13,6 +61,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_medicion(__file__)
 
 # --- 2. Barra Lateral con Controles ---
 with st.sidebar:
@@ -25,17 +74,17 @@ with st.sidebar:
     st.markdown("---")
     
     st.header("1. Cargar Datos")
-    uploaded_file = st.file_uploader("Sube un archivo CSV", type="csv", label_visibility="collapsed")
+    uploaded_file = archivo_compartido("Sube un archivo CSV", "csv", label_visibility="collapsed")
     
     # Inicializar df fuera del if para que exista en el scope
     df = None
     columna = None
-    color = '#3498db' # Color por defecto
+    usar_plotly = False
 
     if uploaded_file:
-        df = pd.read_csv(uploaded_file)
+        df = cargar_csv(uploaded_file)
         
-        st.header("2. Seleccionar Variable y Color")
+        st.header("2. Seleccionar Variable")
         numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
         
         if not numeric_cols:
@@ -47,12 +96,11 @@ with st.sidebar:
             "Elige la columna para analizar:",
             options=numeric_cols
         )
-        
-        # --- CAMBIO 2: Añadir el selector de color ---
-        color = st.color_picker(
-            "Elige un color para el histograma:",
-            value='#3498db' # Valor inicial del color
-        )
+        controles_grafico = st.container()  # Aquí se dibujan los controles del fragmento del histograma
+        usar_plotly = elegir_motor_graficos()
+
+        # Los estadísticos de todas las columnas se calculan en segundo plano, en el orden del selector
+        mostrar_precalculo(precalcular(df.attrs["huella"], tuple(numeric_cols), df))
 
 # --- 3. Panel Principal ---
 st.title("⚖️ Calculadora de Media y Visualizador de Distribución")
@@ -77,7 +125,9 @@ if datos.empty or not pd.api.types.is_numeric_dtype(datos):
     st.warning("La columna seleccionada no contiene datos numéricos válidos.")
 else:
     # --- Cálculo de la Media ---
-    media = datos.mean()
+    with etapa("cálculo"):
+        catalogo = catalogo_columna(df.attrs["huella"], columna, datos)
+        media, resumen = catalogo["media"], catalogo.resumen(columna)
     st.metric(label=f"Media de '{columna}'", value=f"{media:.2f}")
 
     # --- Visualización en Pestañas ---
@@ -85,43 +135,22 @@ else:
 
     with tab_grafico:
         st.subheader(f"Histograma de la Distribución")
-        
-        # --- Crear la figura del gráfico ---
-        fig, ax = plt.subplots(figsize=(10, 5))
-        # --- CAMBIO 3: Usar el color seleccionado ---
-        ax.hist(datos, bins=15, edgecolor='black', alpha=0.7, color=color)
-        
-        # Añadir la línea de la media
-        ax.axvline(media, color='red', linestyle='dashed', linewidth=2, label=f'Media = {media:.2f}')
-        
-        # Personalizar
-        ax.set_title(f'Distribución de {columna}')
-        ax.set_xlabel(columna)
-        ax.set_ylabel('Frecuencia')
-        ax.legend()
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        # --- Botón de descarga del gráfico ---
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png")
-        st.download_button(
-            label="📥 Descargar Gráfico",
-            data=buf,
-            file_name=f"histograma_media_{columna}.png",
-            mime="image/png"
-        )
-        
-        st.pyplot(fig)
+        espacio_grafico = st.empty()
+    with controles_grafico:
+        mostrar_histograma(espacio_grafico, datos, columna, media, usar_plotly)
 
     with tab_datos:
         st.subheader("Resumen Estadístico Completo")
         
         # Botón de descarga para las estadísticas
-        stats_csv = datos.describe().to_csv().encode('utf-8')
+        stats_csv = resumen.to_csv().encode('utf-8')
         st.download_button(
             label="📥 Descargar Estadísticas (CSV)",
             data=stats_csv,
             file_name=f"estadisticas_{columna}.csv",
             mime="text/csv"
         )
-        st.dataframe(datos.describe())
\ No newline at end of file
+        st.dataframe(resumen)
+
+# --- Tiempos por Etapa (solo con MEDIR_ETAPAS=1) ---
+mostrar_tiempos()
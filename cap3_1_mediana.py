@@ -3,8 +3,57 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from figuras import enlace_descarga, figura
 import io
+from carga_datos import archivo_compartido, cargar_csv
+from estadisticas import catalogo_columna, mostrar_precalculo, precalcular
+from graficos_interactivos import elegir_motor_graficos, histograma
+from instrumentacion import etapa, iniciar_medicion, mostrar_tiempos
+
+
+# Etapas: ingestión (cargar_csv, en caché por archivo) -> cálculo (catálogo de estadísticos por columna, estadisticas.py) -> presentación (fragmento).
+# Cambiar el color solo vuelve a ejecutar el fragmento del histograma. El fragmento se llama en la
+# barra lateral, donde quedan sus controles, y dibuja el gráfico y su descarga en `espacio` (un st.empty del panel principal).
+@st.fragment
+def mostrar_histograma(espacio, datos, columna, media, mediana, usar_plotly=False):
+    color = st.color_picker(
+        "Elige un color para el histograma:",
+        value='#3498db'
+    )
+
+    if usar_plotly:
+        # Al navegador solo viajan los conteos por bin y las posiciones de las líneas
+        frecuencias, bins = np.histogram(datos, bins=15)
+        espacio.plotly_chart(histograma(frecuencias, bins, color, f'Distribución de {columna}', columna, lineas=[
+            dict(x=media, color='red', estilo='dashed', nombre=f'Media = {media:.2f}'),
+            dict(x=mediana, color='green', estilo='solid', nombre=f'Mediana = {mediana:.2f}'),
+        ]), use_container_width=True)
+        return
+
+    # --- Crear la figura del gráfico ---
+    with figura(figsize=(10, 5)) as (fig, ax):
+        ax.hist(datos, bins=15, edgecolor='black', alpha=0.7, color=color)
+
+        # --- Añadir ambas líneas verticales ---
+        ax.axvline(media, color='red', linestyle='dashed', linewidth=2.5, label=f'Media = {media:.2f}')
+        ax.axvline(mediana, color='green', linestyle='solid', linewidth=2.5, label=f'Mediana = {mediana:.2f}')
+
+        # Personalizar
+        ax.set_title(f'Distribución de {columna}')
+        ax.set_xlabel(columna)
+        ax.set_ylabel('Frecuencia')
+        ax.legend()
+        ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+        # --- Botón de descarga ---
+        buf = io.BytesIO()
+        with etapa("exportación"):
+            fig.savefig(buf, format="png")
+        # La descarga va con el gráfico, en el panel principal (el fragmento corre en la barra lateral)
+        with espacio.container():
+            enlace_descarga(buf.getvalue(), f"histograma_media_mediana_{columna}.png")
+            st.pyplot(fig)
+
 
 # --- 1. Configuración de la Página ---
 st.set_page_config(
@@ -13,6 +62,7 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_medicion(__file__)
 
 # --- 2. Barra Lateral con Controles ---
 with st.sidebar:
@@ -25,16 +75,16 @@ with st.sidebar:
     st.markdown("---")
     
     st.header("1. Cargar Datos")
-    uploaded_file = st.file_uploader("Sube un archivo CSV", type="csv", label_visibility="collapsed")
+    uploaded_file = archivo_compartido("Sube un archivo CSV", "csv", label_visibility="collapsed")
     
     df = None
     columna = None
-    color = '#3498db'
+    usar_plotly = False
 
     if uploaded_file:
-        df = pd.read_csv(uploaded_file)
+        df = cargar_csv(uploaded_file)
         
-        st.header("2. Seleccionar Variable y Color")
+        st.header("2. Seleccionar Variable")
         numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
         
         if not numeric_cols:
@@ -45,11 +95,11 @@ with st.sidebar:
             "Elige la columna para analizar:",
             options=numeric_cols
         )
-        
-        color = st.color_picker(
-            "Elige un color para el histograma:",
-            value='#3498db'
-        )
+        controles_grafico = st.container()  # Aquí se dibujan los controles del fragmento del histograma
+        usar_plotly = elegir_motor_graficos()
+
+        # Los estadísticos de todas las columnas se calculan en segundo plano, en el orden del selector
+        mostrar_precalculo(precalcular(df.attrs["huella"], tuple(numeric_cols), df))
 
 # --- 3. Panel Principal ---
 st.title("⚖️ Análisis de Media y Mediana")
@@ -76,8 +126,9 @@ if datos.empty or not pd.api.types.is_numeric_dtype(datos):
     st.warning("La columna seleccionada no contiene datos numéricos válidos.")
 else:
     # --- Cálculo de Media y Mediana ---
-    media = datos.mean()
-    mediana = datos.median()
+    with etapa("cálculo"):
+        catalogo = catalogo_columna(df.attrs["huella"], columna, datos)
+        media, mediana, resumen = catalogo["media"], catalogo["mediana"], catalogo.resumen(columna)
     
     # Mostrar ambas métricas usando columnas para un layout limpio
     col1, col2 = st.columns(2)
@@ -91,42 +142,21 @@ else:
 
     with tab_grafico:
         st.subheader(f"Histograma con Media y Mediana")
-        
-        # --- Crear la figura del gráfico ---
-        fig, ax = plt.subplots(figsize=(10, 5))
-        ax.hist(datos, bins=15, edgecolor='black', alpha=0.7, color=color)
-        
-        # --- Añadir ambas líneas verticales ---
-        ax.axvline(media, color='red', linestyle='dashed', linewidth=2.5, label=f'Media = {media:.2f}')
-        ax.axvline(mediana, color='green', linestyle='solid', linewidth=2.5, label=f'Mediana = {mediana:.2f}')
-        
-        # Personalizar
-        ax.set_title(f'Distribución de {columna}')
-        ax.set_xlabel(columna)
-        ax.set_ylabel('Frecuencia')
-        ax.legend()
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
-        
-        # --- Botón de descarga ---
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png")
-        st.download_button(
-            label="📥 Descargar Gráfico",
-            data=buf,
-            file_name=f"histograma_media_mediana_{columna}.png",
-            mime="image/png"
-        )
-        
-        st.pyplot(fig)
+        espacio_grafico = st.empty()
+    with controles_grafico:
+        mostrar_histograma(espacio_grafico, datos, columna, media, mediana, usar_plotly)
 
     with tab_datos:
         st.subheader("Resumen Estadístico Completo")
         
-        stats_csv = datos.describe().to_csv().encode('utf-8')
+        stats_csv = resumen.to_csv().encode('utf-8')
         st.download_button(
             label="📥 Descargar Estadísticas (CSV)",
             data=stats_csv,
             file_name=f"estadisticas_{columna}.csv",
             mime="text/csv"
         )
-        st.dataframe(datos.describe())
\ No newline at end of file
+        st.dataframe(resumen)
+
+# --- Tiempos por Etapa (solo con MEDIR_ETAPAS=1) ---
+mostrar_tiempos()
@@ -0,0 +1,446 @@
+# carga_datos.py (cargador compartido de archivos para todas las aplicaciones)
+
+import hashlib
+import io
+import mmap
+import os
+import shutil
+import tempfile
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from instrumentacion import etapa
+from procesos import N_PROCESOS, repartir
+
+# --- 1. Parámetros del Cargador ---
+# Por debajo de este tamaño, repartir el archivo entre procesos cuesta más de lo que ahorra.
+UMBRAL_PARALELO = 64 * 1024 * 1024  # 64 MB
+# Las subidas mayores a este tamaño se vuelcan a un archivo temporal y se leen con memory map.
+UMBRAL_DISCO = 32 * 1024 * 1024  # 32 MB
+TAMANO_COPIA = 16 * 1024 * 1024  # Tamaño del búfer al volcar la subida a disco
+# Una columna de texto pasa a 'category' si tiene como máximo esta proporción de valores distintos.
+UMBRAL_CATEGORIA = 0.5
+
+MOTORES = ("auto", "pandas", "pyarrow", "procesos")
+# Opciones de pd.read_csv que el motor 'procesos' respeta al parsear cada bloque por separado.
+# Las demás (header, nrows, skiprows, encoding, ...) se refieren al archivo completo.
+OPCIONES_PROCESOS = frozenset({"sep", "delimiter", "usecols", "dtype", "na_values", "keep_default_na",
+                               "true_values", "false_values", "decimal", "thousands"})
+
+
+def pyarrow_disponible():
+    """Indica si el lector CSV multihilo de pyarrow está instalado."""
+    try:
+        import pyarrow.csv  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def calamine_disponible():
+    """Indica si está instalado python-calamine (lector de Excel en Rust, pandas >= 2.2)."""
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def elegir_motor(tamano, motor="auto", opciones=()):
+    """
+    Resuelve el motor 'auto' según el tamaño del archivo, las librerías instaladas y las
+    opciones de lectura: desde UMBRAL_PARALELO, pyarrow si está instalado y, si no, 'procesos'
+    cuando todas las opciones están en OPCIONES_PROCESOS. Por debajo, o si no, pandas.
+    """
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido: '{motor}'. Opciones: {', '.join(MOTORES)}")
+    if motor != "auto":
+        return motor
+    if tamano < UMBRAL_PARALELO:
+        return "pandas"
+    if pyarrow_disponible():
+        return "pyarrow"
+    # Los archivos que 'procesos' no puede cortar (comillas, tipos que no encajan) vuelven solos a pandas
+    return "procesos" if set(opciones) <= OPCIONES_PROCESOS else "pandas"
+
+
+# --- 2. División del Archivo en Bloques ---
+def dividir_en_bloques(datos, inicio, n_bloques):
+    """
+    Devuelve una lista de (inicio, fin) que reparte `datos[inicio:]` en unos `n_bloques`
+    trozos de tamaño similar, cortando siempre justo después de un salto de línea.
+    Supone que no hay saltos de línea dentro de campos entrecomillados.
+    """
+    total = len(datos)
+    tamano = max(1, (total - inicio) // max(1, n_bloques))
+    limites = []
+    pos = inicio
+    while pos < total:
+        objetivo = pos + tamano
+        if objetivo >= total:
+            fin = total
+        else:
+            salto = datos.find(b"\n", objetivo)
+            fin = total if salto == -1 else salto + 1
+        limites.append((pos, fin))
+        pos = fin
+    return limites
+
+
+def _parsear_bloque(encabezado, bloque, opciones):
+    # Cada bloque se parsea como un CSV independiente con el encabezado original delante
+    return pd.read_csv(io.BytesIO(encabezado + bloque), **opciones)
+
+
+class _LectorVista(io.RawIOBase):
+    """Archivo de solo lectura sobre un memoryview: io.BytesIO(vista) copiaría el búfer completo."""
+
+    def __init__(self, vista):
+        self._vista = memoryview(vista).cast("B")
+        self._posicion = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, destino):
+        n = min(len(destino), len(self._vista) - self._posicion)
+        destino[:n] = self._vista[self._posicion:self._posicion + n]
+        self._posicion += n
+        return n
+
+
+def _como_archivo(datos):
+    # io.BytesIO comparte un objeto bytes sin copiarlo; cualquier otro búfer se lee a través de la vista
+    return io.BytesIO(datos) if isinstance(datos, bytes) else io.BufferedReader(_LectorVista(datos))
+
+
+def _validar_opciones_procesos(opciones):
+    no_soportadas = sorted(set(opciones) - OPCIONES_PROCESOS)
+    if no_soportadas:
+        raise ValueError(f"El motor 'procesos' no admite: {', '.join(no_soportadas)}. Usa motor='pandas'.")
+
+
+def _con_tipos_de(primera, opciones):
+    """Opciones para los demás bloques: los tipos que pandas infirió en el primero, para todas las columnas."""
+    return dict(opciones, dtype=primera.dtypes.to_dict())
+
+
+def _leer_con_procesos(datos, n_procesos, **opciones):
+    """
+    Parsea los bloques en paralelo. Los tipos se infieren en el primer bloque y se imponen a
+    los demás, para que una columna no salga con tipos mezclados; si un bloque posterior no
+    encaja (p. ej. faltantes en una columna entera), se vuelve a leer todo con pandas. Como los
+    bloques se cortan en cualquier salto de línea, un archivo con comillas (que pueden encerrar
+    saltos de línea) también se lee con pandas.
+    """
+    _validar_opciones_procesos(opciones)
+    fin_encabezado = datos.find(b"\n") + 1
+    if fin_encabezado == 0 or fin_encabezado == len(datos) or datos.find(b'"') != -1:
+        return pd.read_csv(io.BytesIO(datos), **opciones)
+
+    encabezado = bytes(datos[:fin_encabezado])
+    (inicio, fin), *bloques = dividir_en_bloques(datos, fin_encabezado, n_procesos)
+    primera = _parsear_bloque(encabezado, bytes(datos[inicio:fin]), opciones)
+    opciones_bloques = _con_tipos_de(primera, opciones)
+    try:
+        # Los bloques se copian a medida que entran al pool compartido, no todos de una vez
+        partes = repartir(_parsear_bloque, ((encabezado, bytes(datos[i:f]), opciones_bloques) for i, f in bloques),
+                          en_vuelo=n_procesos)
+    except (ValueError, TypeError, OverflowError):
+        return pd.read_csv(io.BytesIO(datos), **opciones)
+    return pd.concat([primera, *partes], ignore_index=True)
+
+
+def particionar_archivo(ruta, n_bloques):
+    """
+    Devuelve el encabezado del CSV en disco y los rangos de bytes (inicio, fin) de unos
+    `n_bloques` trozos que terminan en salto de línea. Sin filas de datos, devuelve (None, []).
+    """
+    with open(ruta, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+        fin_encabezado = mapa.find(b"\n") + 1
+        if fin_encabezado == 0 or fin_encabezado == len(mapa):
+            return None, []
+        return mapa[:fin_encabezado], dividir_en_bloques(mapa, fin_encabezado, n_bloques)
+
+
+def leer_rango_csv(ruta, encabezado, inicio, fin, opciones):
+    """Parsea un rango de bytes de un CSV en disco con el encabezado original delante."""
+    # Cada proceso mapea el archivo por su cuenta y solo copia su propio rango
+    with open(ruta, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+        bloque = mapa[inicio:fin]
+    return pd.read_csv(io.BytesIO(encabezado + bloque), **opciones)
+
+
+def _tiene_comillas(ruta):
+    with open(ruta, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+        return mapa.find(b'"') != -1
+
+
+def _leer_ruta_con_procesos(ruta, n_procesos, **opciones):
+    # Mismas reglas que _leer_con_procesos
+    _validar_opciones_procesos(opciones)
+    encabezado, bloques = particionar_archivo(ruta, n_procesos)
+    if not bloques or _tiene_comillas(ruta):
+        return pd.read_csv(ruta, memory_map=True, **opciones)
+
+    (inicio, fin), *bloques = bloques
+    primera = leer_rango_csv(ruta, encabezado, inicio, fin, opciones)
+    opciones_bloques = _con_tipos_de(primera, opciones)
+    try:
+        partes = repartir(leer_rango_csv, [(ruta, encabezado, i, f, opciones_bloques) for i, f in bloques],
+                          en_vuelo=n_procesos)
+    except (ValueError, TypeError, OverflowError):
+        return pd.read_csv(ruta, memory_map=True, **opciones)
+    return pd.concat([primera, *partes], ignore_index=True)
+
+
+def _leer_ruta_con_pyarrow(ruta, **opciones):
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    usecols = opciones.pop("usecols", None)
+    if opciones:
+        # Opciones de pandas sin equivalente directo en pyarrow: se delega en pandas
+        return pd.read_csv(ruta, engine="pyarrow", usecols=usecols, **opciones)
+
+    convert_options = pacsv.ConvertOptions(include_columns=list(usecols)) if usecols else None
+    with pa.memory_map(ruta, "r") as fuente:
+        tabla = pacsv.read_csv(fuente, convert_options=convert_options)
+    # self_destruct libera cada columna de Arrow en cuanto pasa a pandas
+    return tabla.to_pandas(self_destruct=True, split_blocks=True)
+
+
+# --- 3. Compactación de Tipos ---
+def _cabe_en_float32(columna):
+    # Solo si todos los valores vuelven idénticos de float32 a float64: cualquier pérdida de
+    # dígitos cambiaría sumas, medias y ajustes calculados sobre la columna
+    valores = columna.to_numpy()
+    with np.errstate(over="ignore"):
+        reducidos = valores.astype(np.float32).astype(np.float64)
+    return bool(np.array_equal(reducidos, valores, equal_nan=True))
+
+
+def compactar_tipos(df, umbral_categoria=UMBRAL_CATEGORIA, flotantes=True):
+    """
+    Reduce los tipos por defecto de pandas (int64/float64/object) al tipo más pequeño que
+    conserva los datos: el entero más chico, float32 (con flotantes=True) cuando todos los
+    valores se representan exactamente y 'category' para columnas de texto con pocos valores
+    distintos.
+    Devuelve el DataFrame compactado y un dict con la memoria antes y después (en bytes).
+    """
+    antes = int(df.memory_usage(deep=True).sum())
+    compacto = {}
+    for nombre, columna in df.items():
+        if pd.api.types.is_integer_dtype(columna) and not pd.api.types.is_extension_array_dtype(columna):
+            columna = pd.to_numeric(columna, downcast="integer")
+        elif flotantes and columna.dtype == np.float64 and _cabe_en_float32(columna):
+            columna = columna.astype(np.float32)
+        elif (pd.api.types.is_object_dtype(columna) or pd.api.types.is_string_dtype(columna)) and len(columna) > 0:
+            if columna.nunique(dropna=True) <= umbral_categoria * len(columna):
+                columna = columna.astype("category")
+        compacto[nombre] = columna
+    df = pd.DataFrame(compacto, index=df.index)
+    despues = int(df.memory_usage(deep=True).sum())
+    return df, {"antes": antes, "despues": despues}
+
+
+def describir_ahorro(reporte):
+    """Texto corto para mostrar el ahorro de memoria de compactar_tipos."""
+    antes, despues = reporte["antes"], reporte["despues"]
+    ahorro = 1 - despues / antes if antes else 0.0
+    return f"Memoria del DataFrame: {antes / 1024**2:,.1f} MB → {despues / 1024**2:,.1f} MB ({ahorro:.0%} menos)"
+
+
+# --- 4. Lectura de CSV ---
+def leer_csv_bytes(datos, motor="auto", n_procesos=None, **opciones):
+    """
+    Parsea el contenido de un CSV en memoria (bytes o un memoryview, p. ej. el getbuffer() de
+    la subida, que se lee sin copiarlo).
+
+    motor='pandas'   -> pd.read_csv de un solo hilo (comportamiento original).
+    motor='pyarrow'  -> lector multihilo de pyarrow.
+    motor='procesos' -> divide los bytes en bloques por salto de línea y los parsea en paralelo
+                        en el pool compartido de procesos.py (solo con las opciones de
+                        OPCIONES_PROCESOS; ver _leer_con_procesos).
+    motor='auto'     -> desde UMBRAL_PARALELO, pyarrow si está instalado y si no 'procesos';
+                        por debajo, pandas (ver elegir_motor).
+    """
+    motor = elegir_motor(len(datos), motor, opciones)
+    if motor == "pyarrow":
+        return pd.read_csv(_como_archivo(datos), engine="pyarrow", **opciones)
+    if motor == "procesos":
+        # Busca saltos de línea y corta bloques, así que necesita bytes (de todos modos copia cada bloque)
+        return _leer_con_procesos(bytes(datos), n_procesos or N_PROCESOS, **opciones)
+    return pd.read_csv(_como_archivo(datos), **opciones)
+
+
+def leer_csv_ruta(ruta, motor="auto", n_procesos=None, **opciones):
+    """Igual que leer_csv_bytes, pero parseando un archivo en disco a través de un memory map."""
+    motor = elegir_motor(os.path.getsize(ruta), motor, opciones)
+    if motor == "pyarrow":
+        return _leer_ruta_con_pyarrow(ruta, **opciones)
+    if motor == "procesos":
+        return _leer_ruta_con_procesos(ruta, n_procesos or N_PROCESOS, **opciones)
+    return pd.read_csv(ruta, memory_map=True, **opciones)
+
+
+def volcar_a_disco(uploaded_file, sufijo=".csv"):
+    """Copia la subida a un archivo temporal por bloques (sin duplicarla en memoria) y devuelve su ruta."""
+    uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=sufijo, delete=False) as destino:
+        shutil.copyfileobj(uploaded_file, destino, TAMANO_COPIA)
+    uploaded_file.seek(0)
+    return destino.name
+
+
+@st.cache_data(max_entries=4, show_spinner="Leyendo el archivo...")
+def _cargar_csv_cacheado(id_archivo, _uploaded_file, motor, compactar, flotantes, opciones):
+    # `_uploaded_file` no entra en la clave: cada subida tiene su propio file_id
+    if isinstance(_uploaded_file, ArchivoGuardado):
+        # Subida de otra página cuyo DataFrame ya no está en caché (otras opciones o entrada descartada)
+        raise ArchivoNoDisponible(_uploaded_file.name)
+    # Una sola vista del búfer de la subida, que el parseo y el hash leen sin copiar los bytes
+    datos = _uploaded_file.getbuffer()
+    if _uploaded_file.size < UMBRAL_DISCO:
+        df = leer_csv_bytes(datos, motor=motor, **opciones)
+    else:
+        ruta = volcar_a_disco(_uploaded_file)
+        try:
+            df = leer_csv_ruta(ruta, motor=motor, **opciones)
+        finally:
+            os.remove(ruta)
+
+    if compactar:
+        df, reporte = compactar_tipos(df, flotantes=flotantes)
+        df.attrs["ahorro_memoria"] = reporte
+    # Identifica el contenido (no la subida): dos sesiones que suben el mismo archivo comparten
+    # el catálogo de estadísticos de estadisticas.py
+    df.attrs["huella"] = hashlib.sha256(datos).hexdigest()
+    return df
+
+
+@etapa("ingestión")
+def cargar_csv(uploaded_file, motor="auto", compactar=True, flotantes=True, **opciones):
+    """
+    Lee un archivo subido con st.file_uploader usando el motor indicado.
+    Las subidas grandes se vuelcan a disco y se parsean desde un memory map; el archivo
+    temporal se borra en cuanto existe el DataFrame, para no mantener los bytes crudos vivos.
+    Con compactar=True los tipos se reducen con compactar_tipos y el ahorro queda en
+    df.attrs["ahorro_memoria"]; con flotantes=False las columnas float64 se dejan como están.
+    El SHA-256 del contenido queda en df.attrs["huella"].
+    El resultado queda en caché por el file_id de la subida, así que los reruns provocados
+    por widgets no vuelven a parsear el archivo. Con un ArchivoGuardado (subido en otra
+    página) solo puede venir del caché; si ya no está, la página pide volver a subirlo.
+    """
+    try:
+        return _cargar_csv_cacheado(uploaded_file.file_id, uploaded_file, motor, compactar, flotantes, opciones)
+    except ArchivoNoDisponible:
+        pedir_subida(uploaded_file)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _leer_muestra_cacheada(id_archivo, _uploaded_file, filas):
+    _uploaded_file.seek(0)
+    try:
+        return pd.read_csv(_uploaded_file, nrows=filas)
+    finally:
+        _uploaded_file.seek(0)  # La lectura por bloques que viene después empieza desde el inicio
+
+
+@etapa("ingestión", "muestra")
+def leer_muestra_csv(uploaded_file, filas):
+    """
+    Primeras `filas` filas de la subida, para elegir columnas cuando el archivo completo se
+    lee después por bloques. Queda en caché por el file_id de la subida.
+    """
+    return _leer_muestra_cacheada(uploaded_file.file_id, uploaded_file, filas)
+
+
+# --- 5. Lectura de Excel ---
+def motor_excel():
+    """Usa calamine cuando está disponible; si no, el motor por defecto de pandas (openpyxl)."""
+    return "calamine" if calamine_disponible() else None
+
+
+def hojas_excel(datos):
+    """Nombres de las hojas del libro, sin parsear el contenido de ninguna."""
+    with pd.ExcelFile(io.BytesIO(datos), engine=motor_excel()) as libro:
+        return libro.sheet_names
+
+
+@st.cache_data(max_entries=8, show_spinner="Leyendo hoja de Excel...")
+def _leer_excel_cacheado(huella, _datos, hoja, usecols, nrows):
+    # `_datos` no entra en la clave del caché: la clave es la huella del contenido
+    return pd.read_excel(io.BytesIO(_datos), sheet_name=hoja, usecols=list(usecols) if usecols else None, nrows=nrows, engine=motor_excel())
+
+
+@etapa("ingestión")
+def leer_excel(datos, hoja=0, usecols=None, nrows=None):
+    """
+    Lee una sola hoja de un libro de Excel en memoria, opcionalmente solo algunas columnas
+    o filas. El resultado queda en caché por el hash SHA-256 del contenido del archivo.
+    """
+    huella = hashlib.sha256(datos).hexdigest()
+    return _leer_excel_cacheado(huella, datos, hoja, tuple(usecols) if usecols else None, nrows)
+
+
+# --- 6. Archivo Compartido entre Páginas ---
+# Clave de st.session_state con la última subida de la sesión, visible desde todas las páginas.
+CLAVE_ARCHIVO_SESION = "archivo_compartido"
+
+
+class ArchivoGuardado(NamedTuple):
+    """
+    Lo que la sesión recuerda de la última subida: lo justo para encontrar su DataFrame en el
+    caché de cargar_csv (con los mismos nombres de atributo que UploadedFile), sin los bytes.
+    """
+    name: str
+    file_id: str
+    size: int
+
+
+class ArchivoNoDisponible(Exception):
+    """El DataFrame de un ArchivoGuardado ya no está en caché y sus bytes no se conservaron."""
+
+
+def pedir_subida(archivo, motivo=""):
+    """Detiene la página pidiendo volver a subir `archivo`, del que solo queda su ArchivoGuardado."""
+    st.info(f"**{archivo.name}** se subió en otra página y sus datos ya no están en memoria{motivo}. "
+            "Vuelve a subirlo aquí.")
+    st.stop()
+
+
+def exigir_bytes(archivo, motivo=""):
+    """Para lo que lee el archivo original (lectura por bloques, Excel): pide subirlo si solo queda su ArchivoGuardado."""
+    if isinstance(archivo, ArchivoGuardado):
+        pedir_subida(archivo, motivo)
+
+
+def archivo_compartido(etiqueta="Sube un archivo CSV", tipos="csv", **opciones):
+    """
+    st.file_uploader que comparte la última subida entre las páginas de la sesión (app.py).
+    Cada página tiene su propio uploader, que se vacía al cambiar de página; si está vacío se
+    devuelve un ArchivoGuardado de la subida hecha antes en otra página. La sesión no conserva
+    los bytes de la subida: cargar_csv encuentra el DataFrame en su caché por file_id, así que
+    la otra página lo recibe sin volver a parsearlo.
+    """
+    subido = st.file_uploader(etiqueta, type=tipos, **opciones)
+    if subido is not None:
+        st.session_state[CLAVE_ARCHIVO_SESION] = ArchivoGuardado(subido.name, subido.file_id, subido.size)
+        return subido
+
+    guardado = st.session_state.get(CLAVE_ARCHIVO_SESION)
+    extensiones = tuple(f".{tipo}" for tipo in ([tipos] if isinstance(tipos, str) else tipos))
+    if guardado is None or not guardado.name.lower().endswith(extensiones):
+        return None
+    st.caption(f"Usando **{guardado.name}**, subido antes en esta sesión.")
+    if st.button("Usar otro archivo", key="olvidar_archivo_compartido"):
+        del st.session_state[CLAVE_ARCHIVO_SESION]
+        st.rerun()
+    if not isinstance(guardado, ArchivoGuardado):
+        # Los benchmarks (AppTest no sube archivos) guardan aquí un UploadedFile completo
+        guardado.seek(0)
+    return guardado
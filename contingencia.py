@@ -0,0 +1,446 @@
+# contingencia.py (motor de tablas de contingencia con códigos enteros)
+#
+# scipy se importa dentro de las funciones que lo usan, para que las aplicaciones puedan importar
+# este módulo al inicio sin pagar la carga de scipy antes de que haya datos.
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from procesos import N_PROCESOS, repartir
+
+NORMALIZACIONES = ("index", "columns", "all")
+# Mientras la tabla tenga como máximo estas celdas se acumula en una matriz densa (32 MB en int64).
+LIMITE_DENSO = 4_000_000
+FILAS_POR_BLOQUE = 1_000_000
+# Con pocos pares no compensa enviarlos a los procesos
+MIN_PARES_PARALELO = 50
+# Máximo de códigos permutados (permutaciones x filas) o de conteos (permutaciones x celdas) que
+# se materializan a la vez, sumando todos los procesos del pool compartido: cada lote usa
+# MAX_ELEMENTOS_LOTE // N_PROCESOS por operación
+MAX_ELEMENTOS_LOTE = 20_000_000
+
+
+# --- 1. Factorización ---
+def factorizar(serie):
+    """
+    Convierte una columna categórica en códigos enteros (0..k-1) y sus categorías ordenadas.
+    Los valores faltantes quedan con código -1, igual que en pd.factorize.
+    """
+    codigos, categorias = pd.factorize(serie, sort=True)
+    return codigos, categorias
+
+
+# --- 2. Conteos ---
+def contar_pares(codigos_filas, n_filas, codigos_columnas, n_columnas):
+    """
+    Matriz de conteos (n_filas x n_columnas) con un solo np.bincount sobre
+    fila * n_columnas + columna. Los pares con algún código -1 se descartan.
+    """
+    validos = (codigos_filas >= 0) & (codigos_columnas >= 0)
+    celdas = codigos_filas[validos].astype(np.int64) * n_columnas + codigos_columnas[validos]
+    return np.bincount(celdas, minlength=n_filas * n_columnas).reshape(n_filas, n_columnas)
+
+
+def conteos_desde_codigos(codigos_f, n_filas, codigos_c, n_columnas, limite_denso=LIMITE_DENSO):
+    """
+    Matriz de conteos de dos columnas ya factorizadas: un ndarray si la tabla tiene como
+    máximo `limite_denso` celdas y una matriz CSR si tiene más, para no reservar memoria
+    para millones de celdas vacías.
+    """
+    from scipy import sparse
+
+    if n_filas * n_columnas <= limite_denso:
+        return contar_pares(codigos_f, n_filas, codigos_c, n_columnas)
+
+    validos = (codigos_f >= 0) & (codigos_c >= 0)
+    unos = np.ones(int(validos.sum()), dtype=np.int64)
+    # Al convertir de COO a CSR se suman los pares repetidos
+    return sparse.coo_matrix((unos, (codigos_f[validos], codigos_c[validos])), shape=(n_filas, n_columnas)).tocsr()
+
+
+def conteos_contingencia(filas, columnas, limite_denso=LIMITE_DENSO):
+    """
+    Factoriza ambas columnas y devuelve (conteos, categorías de filas, categorías de columnas).
+    Los conteos son densos o CSR según `limite_denso` (ver conteos_desde_codigos).
+    """
+    codigos_f, categorias_f = factorizar(filas)
+    codigos_c, categorias_c = factorizar(columnas)
+    conteos = conteos_desde_codigos(codigos_f, len(categorias_f), codigos_c, len(categorias_c), limite_denso)
+    return conteos, categorias_f, categorias_c
+
+
+# --- 3. Normalizaciones ---
+def normalizar(tabla, modo):
+    """
+    Deriva las tablas porcentuales de la tabla de conteos, sin volver a contar:
+    'index' (cada fila suma 1), 'columns' (cada columna suma 1) o 'all' (la tabla suma 1).
+    Si la tabla es un recorte de tabla_top_k, se divide entre los totales de la tabla completa.
+    """
+    if modo not in NORMALIZACIONES:
+        raise ValueError(f"Normalización desconocida: '{modo}'. Opciones: {', '.join(NORMALIZACIONES)}")
+    valores = tabla.to_numpy(dtype=np.float64)
+    if modo == "index":
+        totales = np.asarray(tabla.attrs.get("totales_filas", valores.sum(axis=1)), dtype=np.float64)[:, None]
+    elif modo == "columns":
+        totales = np.asarray(tabla.attrs.get("totales_columnas", valores.sum(axis=0)), dtype=np.float64)[None, :]
+    else:
+        totales = tabla.attrs.get("total", valores.sum())
+    return pd.DataFrame(valores / totales, index=tabla.index, columns=tabla.columns)
+
+
+# --- 4. Tablas por Bloques (archivos que no caben en memoria) ---
+def _codigos_globales(valores, diccionario):
+    # Traduce los códigos locales del bloque a los del diccionario global, que crece con cada categoría nueva
+    codigos, unicos = pd.factorize(valores)
+    globales = np.full(len(codigos), -1, dtype=np.int64)
+    if len(unicos):
+        mapa = np.fromiter((diccionario.setdefault(u, len(diccionario)) for u in unicos), dtype=np.int64, count=len(unicos))
+        validos = codigos >= 0
+        globales[validos] = mapa[codigos[validos]]
+    return globales
+
+
+class ConteoHibrido:
+    """
+    Matriz de conteos que crece junto con las categorías. Es densa mientras el número de
+    celdas no supera `limite_denso` y pasa a CSR cuando lo supera, así que la memoria
+    depende de las categorías (y pares) distintos, no del número de filas leídas.
+    """
+
+    def __init__(self, limite_denso=LIMITE_DENSO):
+        self.limite_denso = limite_denso
+        self.densa = np.zeros((0, 0), dtype=np.int64)
+        self.dispersa = None
+        self.forma = (0, 0)
+
+    def _crecer_densa(self, n_filas, n_columnas):
+        capacidad_f, capacidad_c = self.densa.shape
+        if n_filas <= capacidad_f and n_columnas <= capacidad_c:
+            return
+        # Crecimiento geométrico para no copiar la matriz en cada bloque
+        nueva = np.zeros((max(n_filas, 2 * capacidad_f), max(n_columnas, 2 * capacidad_c)), dtype=np.int64)
+        nueva[:capacidad_f, :capacidad_c] = self.densa
+        self.densa = nueva
+
+    def agregar(self, filas, columnas, n_filas, n_columnas):
+        """Suma los pares (filas[i], columnas[i]) ya codificados; n_* es el total de categorías vistas."""
+        from scipy import sparse
+
+        self.forma = (n_filas, n_columnas)
+        if self.dispersa is None and n_filas * n_columnas > self.limite_denso:
+            f, c = self.densa.shape
+            self.dispersa = sparse.csr_matrix(self.densa[:min(f, n_filas), :min(c, n_columnas)])
+            self.densa = None
+
+        if self.dispersa is None:
+            self._crecer_densa(n_filas, n_columnas)
+            ancho = self.densa.shape[1]
+            celdas, conteos = np.unique(filas * ancho + columnas, return_counts=True)
+            self.densa.ravel()[celdas] += conteos
+        else:
+            celdas, conteos = np.unique(filas * n_columnas + columnas, return_counts=True)
+            bloque = sparse.csr_matrix((conteos, (celdas // n_columnas, celdas % n_columnas)), shape=self.forma)
+            self.dispersa.resize(self.forma)
+            self.dispersa = self.dispersa + bloque
+
+    def resultado(self):
+        """Matriz final de tamaño (categorías de filas x categorías de columnas): ndarray o CSR."""
+        n_filas, n_columnas = self.forma
+        if self.dispersa is not None:
+            self.dispersa.resize(self.forma)
+            return self.dispersa
+        return self.densa[:n_filas, :n_columnas]
+
+
+def contingencia_por_bloques(fuente, columna_filas, columna_columnas, filas_por_bloque=FILAS_POR_BLOQUE,
+                             limite_denso=LIMITE_DENSO):
+    """
+    Construye la tabla de contingencia leyendo solo las dos columnas (usecols) y por bloques.
+    Devuelve la matriz de conteos (densa o CSR) y las categorías de filas y columnas, en el
+    orden en que aparecieron en el archivo.
+    """
+    categorias_f, categorias_c = {}, {}
+    conteo = ConteoHibrido(limite_denso)
+    # dtype=str para que un mismo valor no cambie de tipo entre bloques (p. ej. 1 frente a '1')
+    lector = pd.read_csv(fuente, usecols=[columna_filas, columna_columnas], chunksize=filas_por_bloque,
+                         dtype={columna_filas: str, columna_columnas: str})
+    with lector:
+        for bloque in lector:
+            f = _codigos_globales(bloque[columna_filas], categorias_f)
+            c = _codigos_globales(bloque[columna_columnas], categorias_c)
+            validos = (f >= 0) & (c >= 0)
+            conteo.agregar(f[validos], c[validos], len(categorias_f), len(categorias_c))
+    return conteo.resultado(), list(categorias_f), list(categorias_c)
+
+
+def tabla_desde_conteos(conteos, categorias_f, categorias_c, nombre_filas=None, nombre_columnas=None):
+    """DataFrame de conteos con filas y columnas ordenadas por categoría, como pd.crosstab."""
+    from scipy import sparse
+
+    if sparse.issparse(conteos):
+        conteos = conteos.toarray()
+    # Se omiten las categorías que solo aparecieron junto a un valor faltante
+    orden_f = np.argsort(np.asarray(categorias_f, dtype=object))
+    orden_f = orden_f[conteos.sum(axis=1)[orden_f] > 0]
+    orden_c = np.argsort(np.asarray(categorias_c, dtype=object))
+    orden_c = orden_c[conteos.sum(axis=0)[orden_c] > 0]
+    return pd.DataFrame(
+        conteos[np.ix_(orden_f, orden_c)],
+        index=pd.Index(np.asarray(categorias_f, dtype=object)[orden_f], name=nombre_filas),
+        columns=pd.Index(np.asarray(categorias_c, dtype=object)[orden_c], name=nombre_columnas),
+    )
+
+
+# --- 5. Tablas Dispersas (muchas categorías) ---
+def _totales(conteos):
+    totales_f = np.asarray(conteos.sum(axis=1), dtype=np.float64).ravel()
+    totales_c = np.asarray(conteos.sum(axis=0), dtype=np.float64).ravel()
+    return totales_f, totales_c
+
+
+def chi2_disperso(conteos):
+    """
+    Prueba Chi-Cuadrado de independencia sin construir la matriz de frecuencias esperadas.
+    Como la suma de observadas y de esperadas es N, χ² = N · Σ O²/(fila·columna) − N,
+    y esa suma solo recorre las celdas no vacías. Acepta ndarray o matriz dispersa.
+    Devuelve (chi2, p_value, dof). A diferencia de chi2_contingency, no aplica la
+    corrección de Yates cuando dof = 1.
+    """
+    from scipy import sparse
+    from scipy.stats import chi2 as distribucion_chi2
+
+    coo = sparse.coo_matrix(conteos)
+    totales_f, totales_c = _totales(coo)
+    n = totales_f.sum()
+    dof = int((np.count_nonzero(totales_f) - 1) * (np.count_nonzero(totales_c) - 1))
+    if dof <= 0:
+        return 0.0, 1.0, 0
+    observados = coo.data.astype(np.float64)
+    estadistico = n * np.sum(observados ** 2 / (totales_f[coo.row] * totales_c[coo.col])) - n
+    return estadistico, distribucion_chi2.sf(estadistico, dof), dof
+
+
+def _indices_top_k(totales, categorias, k):
+    con_datos = np.flatnonzero(totales > 0)
+    if len(con_datos) > k:
+        con_datos = con_datos[np.argpartition(totales[con_datos], -k)[-k:]]
+    # Las categorías elegidas se muestran en orden alfabético, como en la tabla completa
+    return con_datos[np.argsort(np.asarray(categorias, dtype=object)[con_datos])]
+
+
+def tabla_top_k(conteos, categorias_f, categorias_c, k, nombre_filas=None, nombre_columnas=None):
+    """
+    Recorte de la tabla con las k filas y k columnas de mayor frecuencia total.
+    Los totales de la tabla completa quedan en tabla.attrs para que normalizar y
+    frecuencias_esperadas den los mismos valores que sobre la tabla entera.
+    """
+    from scipy import sparse
+
+    conteos = sparse.csr_matrix(conteos)
+    totales_f, totales_c = _totales(conteos)
+    top_f = _indices_top_k(totales_f, categorias_f, k)
+    top_c = _indices_top_k(totales_c, categorias_c, k)
+    tabla = pd.DataFrame(
+        conteos[top_f][:, top_c].toarray(),
+        index=pd.Index(np.asarray(categorias_f, dtype=object)[top_f], name=nombre_filas),
+        columns=pd.Index(np.asarray(categorias_c, dtype=object)[top_c], name=nombre_columnas),
+    )
+    tabla.attrs.update(
+        totales_filas=totales_f[top_f].tolist(),
+        totales_columnas=totales_c[top_c].tolist(),
+        total=float(totales_f.sum()),
+    )
+    return tabla
+
+
+def frecuencias_esperadas(tabla):
+    """Frecuencias esperadas bajo independencia (fila · columna / N) para las celdas de `tabla`."""
+    valores = tabla.to_numpy(dtype=np.float64)
+    totales_f = np.asarray(tabla.attrs.get("totales_filas", valores.sum(axis=1)), dtype=np.float64)
+    totales_c = np.asarray(tabla.attrs.get("totales_columnas", valores.sum(axis=0)), dtype=np.float64)
+    total = tabla.attrs.get("total", valores.sum())
+    return pd.DataFrame(np.outer(totales_f, totales_c) / total, index=tabla.index, columns=tabla.columns)
+
+
+# --- 6. Matriz de Asociación (todos los pares de variables) ---
+COLUMNAS_ASOCIACION = ["Variable 1", "Variable 2", "Chi-Cuadrado", "Valor p", "gl", "V de Cramér", "n"]
+
+
+def _codigos_compactos(codigos, n_categorias):
+    """Los códigos en el entero con signo más chico que admite n_categorias y el -1 de faltante."""
+    return codigos.astype(np.min_scalar_type(-max(n_categorias, 1)), copy=False)
+
+
+def cramer_v(chi2, n, n_filas, n_columnas):
+    """V de Cramér: χ² normalizado a [0, 1] según el tamaño de la tabla."""
+    k = min(n_filas, n_columnas) - 1
+    return float(np.sqrt(chi2 / (n * k))) if n > 0 and k > 0 else 0.0
+
+
+def _asociacion_par(a, b, columna_a, columna_b, limite_denso):
+    (codigos_a, n_a), (codigos_b, n_b) = columna_a, columna_b
+    # Un par de columnas con muchas categorías se cuenta en CSR, igual que la tabla individual
+    conteos = conteos_desde_codigos(codigos_a, n_a, codigos_b, n_b, limite_denso)
+    chi2, p_value, dof = chi2_disperso(conteos)
+    totales_f, totales_c = _totales(conteos)
+    n = int(totales_f.sum())
+    return a, b, chi2, p_value, dof, cramer_v(chi2, n, np.count_nonzero(totales_f), np.count_nonzero(totales_c)), n
+
+
+def _asociacion_pares(pares, codigos, limite_denso):
+    return [_asociacion_par(a, b, codigos[a], codigos[b], limite_denso) for a, b in pares]
+
+
+def matriz_asociacion(df, columnas, n_procesos=None, al_progresar=None, limite_denso=LIMITE_DENSO):
+    """
+    Prueba Chi-Cuadrado y V de Cramér para cada par de `columnas`. Cada columna se
+    factoriza una sola vez (códigos en el entero más chico posible) y los pares se reparten
+    en grupos por el pool compartido, con como mucho `n_procesos` grupos enviados a la vez;
+    cada grupo lleva solo los códigos de las columnas que usa.
+    Devuelve una tabla larga con una fila por par (ver COLUMNAS_ASOCIACION).
+    `al_progresar(pares_hechos, total_pares)` se llama cada vez que termina un grupo de pares.
+    """
+    codigos = {}
+    for columna in columnas:
+        codigos_columna, categorias = factorizar(df[columna])
+        codigos[columna] = (_codigos_compactos(codigos_columna, len(categorias)), len(categorias))
+    pares = list(combinations(columnas, 2))
+
+    n_procesos = n_procesos or N_PROCESOS
+    filas = []
+    if n_procesos == 1 or len(pares) < MIN_PARES_PARALELO:
+        for a, b in pares:
+            filas.append(_asociacion_par(a, b, codigos[a], codigos[b], limite_denso))
+            if al_progresar is not None:
+                al_progresar(len(filas), len(pares))
+        return pd.DataFrame(filas, columns=COLUMNAS_ASOCIACION)
+
+    tamano = max(1, len(pares) // (4 * n_procesos))
+    grupos = [pares[i:i + tamano] for i in range(0, len(pares), tamano)]
+    hechos = 0
+
+    def al_terminar(_, filas_grupo):
+        nonlocal hechos
+        hechos += len(filas_grupo)
+        if al_progresar is not None:
+            al_progresar(hechos, len(pares))
+
+    # Si al_progresar interrumpe el cálculo, repartir descarta los grupos que aún no empezaron
+    resultados = repartir(_asociacion_pares,
+                          [(grupo, {c: codigos[c] for par in grupo for c in par}, limite_denso) for grupo in grupos],
+                          al_terminar, en_vuelo=n_procesos)
+    return pd.DataFrame([fila for filas_grupo in resultados for fila in filas_grupo], columns=COLUMNAS_ASOCIACION)
+
+
+def matriz_cuadrada(asociaciones, columnas, valor="V de Cramér"):
+    """Pasa la tabla larga de matriz_asociacion a una matriz simétrica variable x variable."""
+    matriz = pd.DataFrame(np.eye(len(columnas)), index=columnas, columns=columnas)
+    for a, b, v in asociaciones[["Variable 1", "Variable 2", valor]].itertuples(index=False):
+        matriz.loc[a, b] = matriz.loc[b, a] = v
+    return matriz
+
+
+# --- 7. Prueba de Permutación (Monte Carlo) ---
+def _suma_ponderada(codigos_f, codigos_c, n_columnas, pesos, n_celdas):
+    # Con los totales fijos, χ² = N · Σ O²·peso − N: basta comparar la suma Σ O²·peso
+    conteos = np.bincount(codigos_f * n_columnas + codigos_c, minlength=n_celdas)
+    return float(np.dot(conteos.astype(np.float64) ** 2, pesos))
+
+
+def _lote_permutaciones(codigos_f, codigos_c, n_columnas, pesos, semilla, n_permutaciones, umbral,
+                        max_elementos=MAX_ELEMENTOS_LOTE):
+    """
+    Cuenta cuántas de `n_permutaciones` permutaciones dan un estadístico >= umbral. En cada
+    operación, tanto los códigos permutados (permutaciones x filas) como los conteos
+    (permutaciones x celdas) tienen como mucho `max_elementos` elementos.
+    """
+    # Los códigos llegan compactos (menos datos que enviar al proceso) y se amplían aquí
+    codigos_f = codigos_f.astype(np.int64)
+    codigos_c = codigos_c.astype(np.int64)
+    n_celdas = len(pesos)
+    rng = np.random.default_rng(semilla)
+
+    n = len(codigos_c)
+    # Con tablas de muchas celdas los conteos pesan más que las permutaciones
+    por_operacion = max(1, max_elementos // max(1, n, n_celdas))
+    extremos = 0
+    hechas = 0
+    while hechas < n_permutaciones:
+        b = min(por_operacion, n_permutaciones - hechas)
+        # Muchas permutaciones en una sola operación: cada fila de la matriz es una permutación
+        permutadas = rng.permuted(np.broadcast_to(codigos_c, (b, n)), axis=1)
+        celdas = codigos_f * n_columnas + permutadas + (np.arange(b, dtype=np.int64) * n_celdas)[:, None]
+        conteos = np.bincount(celdas.ravel(), minlength=b * n_celdas).reshape(b, n_celdas).astype(np.float64)
+        extremos += int(np.count_nonzero((conteos ** 2) @ pesos >= umbral))
+        hechas += b
+    return extremos
+
+
+def prueba_permutacion(codigos_f, codigos_c, max_permutaciones=10_000, permutaciones_por_lote=250,
+                       lotes_por_ronda=8, semilla=0, tolerancia=0.005, confianza=0.99, n_procesos=None,
+                       al_progresar=None):
+    """
+    Prueba de independencia por permutación: baraja los códigos de las columnas (los
+    totales de la tabla no cambian) y compara el χ² de cada permutación con el observado.
+    Los lotes se reparten por el pool compartido, con como mucho `n_procesos` lotes enviados a
+    la vez; cada lote usa su propia semilla derivada de `semilla`, así que el resultado es
+    reproducible sin importar el número de procesos.
+    Se detiene antes de `max_permutaciones` cuando la mitad del intervalo de confianza del
+    valor p es menor que `tolerancia`. `al_progresar(permutaciones, p_valor)` se llama tras cada ronda.
+    """
+    from scipy.stats import norm
+
+    validos = (codigos_f >= 0) & (codigos_c >= 0)
+    _, codigos_f = np.unique(codigos_f[validos], return_inverse=True)
+    _, codigos_c = np.unique(codigos_c[validos], return_inverse=True)
+    codigos_f = codigos_f.astype(np.int64)
+    codigos_c = codigos_c.astype(np.int64)
+    n_columnas = int(codigos_c.max()) + 1 if len(codigos_c) else 0
+    n_celdas = (int(codigos_f.max()) + 1 if len(codigos_f) else 0) * n_columnas
+
+    totales_f = np.bincount(codigos_f).astype(np.float64)
+    totales_c = np.bincount(codigos_c).astype(np.float64)
+    pesos = (1.0 / np.outer(totales_f, totales_c)).ravel()
+    n = float(len(codigos_f))
+
+    observado = _suma_ponderada(codigos_f, codigos_c, n_columnas, pesos, n_celdas)
+    estadistico = n * observado - n
+    umbral = observado * (1 - 1e-12)  # margen para errores de redondeo en empates exactos
+
+    semillas = iter(np.random.SeedSequence(semilla).spawn(-(-max_permutaciones // permutaciones_por_lote)))
+    z = norm.ppf(0.5 + confianza / 2)
+    extremos = hechas = 0
+    p_valor, mitad_intervalo = 1.0, 1.0
+
+    # El límite de memoria es para todo el pool: como mucho N_PROCESOS lotes corren a la vez
+    max_elementos = max(1, MAX_ELEMENTOS_LOTE // N_PROCESOS)
+    datos = (_codigos_compactos(codigos_f, len(totales_f)), _codigos_compactos(codigos_c, n_columnas), n_columnas, pesos)
+    while hechas < max_permutaciones:
+        tamanos = []
+        for _ in range(lotes_por_ronda):
+            restantes = max_permutaciones - hechas - sum(tamanos)
+            if restantes <= 0:
+                break
+            tamanos.append(min(permutaciones_por_lote, restantes))
+        extremos += sum(repartir(_lote_permutaciones,
+                                 [(*datos, next(semillas), tamano, umbral, max_elementos) for tamano in tamanos],
+                                 en_vuelo=n_procesos))
+        hechas += sum(tamanos)
+
+        # Valor p con la corrección +1 (la tabla observada cuenta como una permutación más)
+        p_valor = (extremos + 1) / (hechas + 1)
+        mitad_intervalo = z * np.sqrt(p_valor * (1 - p_valor) / hechas)
+        if al_progresar is not None:
+            al_progresar(hechas, p_valor)
+        if mitad_intervalo < tolerancia:
+            break
+
+    return {
+        "estadistico": estadistico,
+        "p_valor": p_valor,
+        "intervalo": (max(0.0, p_valor - mitad_intervalo), min(1.0, p_valor + mitad_intervalo)),
+        "permutaciones": hechas,
+        "detenida_antes": hechas < max_permutaciones,
+    }
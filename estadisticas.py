@@ -0,0 +1,183 @@
+# estadisticas.py (catálogo de estadísticos por columna, compartido entre herramientas)
+#
+# Las herramientas del capítulo 3 piden estadísticos que se solapan (media, mediana, desviación,
+# cuartiles) sobre la misma columna. Aquí cada columna de cada archivo tiene un catálogo que
+# calcula cada estadístico como mucho una vez y solo cuando se pide, a partir de los que ya
+# tiene: la mediana, los cuartiles, el IQR, los outliers y las modas salen del mismo arreglo
+# ordenado, que se ordena una sola vez por columna.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Catálogos que se conservan a la vez (cada uno guarda la columna y, si se pidió, su copia ordenada)
+MAX_CATALOGOS = 32
+# Los outliers son los valores a más de este número de IQR por fuera de los cuartiles.
+FACTOR_IQR = 1.5
+# Precálculo en segundo plano: hilos compartidos por todas las sesiones y columnas por archivo
+# (menos que MAX_CATALOGOS, para que los catálogos precalculados no se desalojen entre sí)
+HILOS_PRECALCULO = 2
+MAX_COLUMNAS_PRECALCULO = 16
+INTERVALO_PROGRESO = 1.0  # segundos entre actualizaciones del indicador de columnas listas
+
+
+def _sin_faltantes(datos):
+    # Vía pandas para descartar también pd.NA de las columnas enteras con faltantes
+    return np.asarray(pd.Series(datos).dropna(), dtype=np.float64)
+
+
+def _cuantil(ordenado, q):
+    """Cuantil con interpolación lineal, igual que np.percentile y Series.quantile."""
+    posicion = q * (len(ordenado) - 1)
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenado) - 1)
+    return ordenado[inferior] + (ordenado[superior] - ordenado[inferior]) * (posicion - inferior)
+
+
+def _modas(ordenado):
+    """Valores más frecuentes en orden ascendente, como Series.mode()."""
+    # En el arreglo ordenado los valores iguales son contiguos: basta medir cada tramo
+    inicios = np.flatnonzero(np.r_[True, ordenado[1:] != ordenado[:-1]])
+    conteos = np.diff(np.r_[inicios, len(ordenado)])
+    return ordenado[inicios[conteos == conteos.max()]].tolist()
+
+
+def _entre(ordenado, minimo, maximo):
+    """Cuántos valores caen en [minimo, maximo], con dos búsquedas binarias en lugar de una máscara."""
+    return int(np.searchsorted(ordenado, maximo, side="right") - np.searchsorted(ordenado, minimo, side="left"))
+
+
+def _outliers(ordenado, limite_inferior, limite_superior):
+    inicio_normales = np.searchsorted(ordenado, limite_inferior, side="left")
+    fin_normales = np.searchsorted(ordenado, limite_superior, side="right")
+    return np.r_[ordenado[:inicio_normales], ordenado[fin_normales:]].tolist()
+
+
+def _porcentajes_regla_empirica(ordenado, media, desviacion, n):
+    return tuple(_entre(ordenado, media - k * desviacion, media + k * desviacion) / n * 100 for k in (1, 2, 3))
+
+
+# Cada estadístico: (estadísticos de los que depende, función que los combina).
+# "datos" es la columna tal como llega; "valores", la misma en float64 y sin faltantes.
+ESTADISTICAS = {
+    "valores": (("datos",), _sin_faltantes),
+    "n": (("valores",), len),
+    "suma": (("valores",), np.sum),
+    "media": (("suma", "n"), lambda suma, n: suma / n),
+    "suma_cuadrados": (("valores", "media"), lambda valores, media: np.sum((valores - media) ** 2)),
+    "varianza": (("suma_cuadrados", "n"), lambda suma_cuadrados, n: suma_cuadrados / (n - 1) if n > 1 else np.nan),
+    "desviacion": (("varianza",), np.sqrt),
+    "ordenado": (("valores",), np.sort),
+    "minimo": (("ordenado",), lambda ordenado: ordenado[0]),
+    "maximo": (("ordenado",), lambda ordenado: ordenado[-1]),
+    "q1": (("ordenado",), lambda ordenado: _cuantil(ordenado, 0.25)),
+    "mediana": (("ordenado",), lambda ordenado: _cuantil(ordenado, 0.5)),
+    "q3": (("ordenado",), lambda ordenado: _cuantil(ordenado, 0.75)),
+    "iqr": (("q1", "q3"), lambda q1, q3: q3 - q1),
+    "limite_inferior": (("q1", "iqr"), lambda q1, iqr: q1 - FACTOR_IQR * iqr),
+    "limite_superior": (("q3", "iqr"), lambda q3, iqr: q3 + FACTOR_IQR * iqr),
+    "outliers": (("ordenado", "limite_inferior", "limite_superior"), _outliers),
+    "modas": (("ordenado",), _modas),
+    "porcentajes_regla_empirica": (("ordenado", "media", "desviacion", "n"), _porcentajes_regla_empirica),
+}
+
+
+class CatalogoColumna:
+    """
+    Estadísticos de una columna numérica (Series o arreglo; los faltantes se descartan),
+    calculados bajo demanda y guardados para las siguientes consultas. Pedir un estadístico
+    calcula antes sus dependencias que falten:
+
+        catalogo = CatalogoColumna(datos)
+        catalogo["mediana"]   # ordena la columna
+        catalogo["iqr"]       # reutiliza el arreglo ordenado; no vuelve a ordenar
+    """
+
+    def __init__(self, datos):
+        self._valores = {"datos": datos}
+        # El mismo catálogo lo pueden consultar varias sesiones (hilos) a la vez
+        self._candado = threading.RLock()
+
+    def __getitem__(self, nombre):
+        with self._candado:
+            if nombre not in self._valores:
+                dependencias, funcion = ESTADISTICAS[nombre]
+                self._valores[nombre] = funcion(*(self[dependencia] for dependencia in dependencias))
+                if nombre == "valores":
+                    # Con la copia en float64 la columna original sobra; no se mantiene viva su tabla
+                    del self._valores["datos"]
+            return self._valores[nombre]
+
+    def calculados(self):
+        """Nombres de los estadísticos que ya están en el catálogo."""
+        with self._candado:
+            return [nombre for nombre in self._valores if nombre not in ("datos", "valores")]
+
+    def resumen(self, nombre=None):
+        """El mismo resultado que Series.describe(), armado con los estadísticos del catálogo."""
+        return pd.Series({
+            "count": float(self["n"]), "mean": self["media"], "std": self["desviacion"], "min": self["minimo"],
+            "25%": self["q1"], "50%": self["mediana"], "75%": self["q3"], "max": self["maximo"],
+        }, name=nombre)
+
+
+@st.cache_resource(max_entries=MAX_CATALOGOS, show_spinner=False)
+def catalogo_columna(huella, columna, _datos):
+    """
+    Catálogo de la columna `columna` del archivo con huella `huella` (df.attrs["huella"] de
+    cargar_csv). Es el mismo objeto para todas las páginas y sesiones que abren ese archivo,
+    así que lo que una herramienta ya calculó está disponible en las demás.
+    """
+    return CatalogoColumna(_datos)
+
+
+# --- Precálculo en Segundo Plano ---
+# Lo que muestran las herramientas del capítulo 3 para cualquier columna
+RESUMEN_ESTANDAR = ("media", "desviacion", "minimo", "q1", "mediana", "q3", "maximo", "outliers", "modas",
+                    "porcentajes_regla_empirica")
+
+_ejecutor = ThreadPoolExecutor(max_workers=HILOS_PRECALCULO, thread_name_prefix="precalculo")
+
+
+def _calcular_resumen(catalogo):
+    for nombre in RESUMEN_ESTANDAR:
+        catalogo[nombre]
+
+
+@st.cache_resource(max_entries=MAX_CATALOGOS, show_spinner=False)
+def precalcular(huella, columnas, _df):
+    """
+    Encola, una sola vez por archivo, el cálculo de RESUMEN_ESTANDAR para las primeras
+    MAX_COLUMNAS_PRECALCULO `columnas`, en ese orden (el del selector). Devuelve un dict
+    {columna: Future}. Los catálogos son los mismos que usa la página, así que si el usuario
+    elige una columna que se está calculando, espera al hilo (candado del catálogo) en lugar
+    de repetir el trabajo.
+    """
+    # Los catálogos se piden aquí, en el hilo de la página; los hilos solo reciben el objeto
+    catalogos = {columna: catalogo_columna(huella, columna, _df[columna]) for columna in columnas[:MAX_COLUMNAS_PRECALCULO]}
+    return {columna: _ejecutor.submit(_calcular_resumen, catalogo) for columna, catalogo in catalogos.items()}
+
+
+def mostrar_precalculo(tareas):
+    """
+    Indicador de columnas listas. Mientras queda alguna pendiente se dibuja un fragmento que se
+    refresca cada INTERVALO_PROGRESO segundos; con todas listas es un texto fijo, sin consultas.
+    """
+    if all(tarea.done() for tarea in tareas.values()):
+        st.caption(f"✅ Estadísticos listos para {len(tareas)} columna(s).")
+        return
+    _mostrar_avance_precalculo(tareas)
+
+
+@st.fragment(run_every=INTERVALO_PROGRESO)
+def _mostrar_avance_precalculo(tareas):
+    listas = [columna for columna, tarea in tareas.items() if tarea.done()]
+    if len(listas) == len(tareas):
+        # Un rerun de la página cambia el fragmento periódico por el texto fijo y detiene el refresco
+        st.rerun()
+    st.progress(len(listas) / len(tareas), text=f"Precalculando estadísticos: {len(listas)} de {len(tareas)} columnas listas")
+    with st.expander("Ver columnas"):
+        st.markdown("\n".join(f"- {'✅' if columna in listas else '⏳'} {columna}" for columna in tareas))
@@ -0,0 +1,249 @@
+# figuras.py (gestor compartido del ciclo de vida de las figuras de matplotlib)
+#
+# plt.subplots registra cada figura en el gestor global de pyplot, que la mantiene viva hasta
+# un plt.close explícito. En un servidor de Streamlit eso significa una figura nueva por rerun
+# que nunca se libera. Aquí las figuras se crean con la API orientada a objetos (Figure + canvas
+# Agg, sin pasar por pyplot), se vacían al terminar de dibujarse y se reciclan en reruns posteriores.
+#
+# matplotlib se importa dentro de cada función: las aplicaciones importan este módulo al inicio,
+# pero mientras no se dibuje nada (p. ej. antes de subir un archivo) matplotlib no se carga.
+
+import base64
+import html
+import io
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import streamlit as st
+
+from instrumentacion import etapa
+
+# Figuras vacías que se conservan para reutilizar; las que sobran se descartan.
+MAX_FIGURAS_LIBRES = 8
+# Márgenes de figure.subplotpars, que se restauran a los de rcParams al reutilizar una figura
+MARGENES = ("left", "right", "bottom", "top", "wspace", "hspace")
+
+_libres = []
+_candado = threading.Lock()  # Cada sesión de Streamlit corre en su propio hilo
+
+
+def nueva_figura(figsize=(10, 5), dpi=None):
+    """
+    Devuelve una Figure con canvas Agg que pyplot no conoce, reciclando una libre si la hay.
+    Quien la pide es responsable de devolverla con liberar(); usa figura() para que sea automático.
+    """
+    from matplotlib import rcParams
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    dpi = dpi or rcParams["figure.dpi"]
+    with _candado:
+        fig = _libres.pop() if _libres else None
+    if fig is None:
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+    else:
+        fig.set_size_inches(figsize)
+        fig.set_dpi(dpi)
+        fig.set_facecolor(rcParams["figure.facecolor"])
+        fig.set_edgecolor(rcParams["figure.edgecolor"])
+        # fig.clear() no toca los márgenes ni el motor de layout: sin esto, el tight_layout o el
+        # subplots_adjust de una página se heredarían en el siguiente gráfico que use la figura
+        fig.subplotpars.update(**{nombre: rcParams[f"figure.subplot.{nombre}"] for nombre in MARGENES})
+        fig.set_layout_engine(None)
+    return fig
+
+
+def liberar(fig):
+    """Vacía la figura y la devuelve al depósito. Las figuras creadas por pyplot se cierran."""
+    if getattr(fig, "number", None) is not None:
+        # Solo llegan aquí figuras que otra librería creó con pyplot (p. ej. sns.clustermap)
+        import matplotlib.pyplot as plt
+        plt.close(fig)
+        return
+    fig.clear()
+    with _candado:
+        if len(_libres) < MAX_FIGURAS_LIBRES:
+            _libres.append(fig)
+
+
+@contextmanager
+def figura(figsize=(10, 5), nrows=1, ncols=1, dpi=None, **opciones_subplots):
+    """
+    Equivalente a plt.subplots que garantiza la liberación de la figura al salir del bloque,
+    incluso si el dibujo lanza una excepción:
+
+        with figura(figsize=(10, 5)) as (fig, ax):
+            ax.hist(datos)
+            st.pyplot(fig)
+    """
+    fig = nueva_figura(figsize, dpi)
+    try:
+        with etapa("dibujo"):
+            yield fig, fig.subplots(nrows, ncols, **opciones_subplots)
+    finally:
+        liberar(fig)
+
+
+@etapa("exportación")
+def a_png(fig, **opciones_savefig):
+    """Renderiza la figura a bytes PNG (para st.download_button o st.image)."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", **opciones_savefig)
+    return buf.getvalue()
+
+
+# --- Gráfico de Barras Persistente ---
+class GraficoBarras:
+    """
+    Gráfico de barras que se construye una sola vez por conjunto de parámetros y después solo
+    actualiza los artistas que cambian. Las barras y la leyenda son artistas animados: el resto
+    (ejes, ticks, rejilla y etiquetas de las barras) se guarda como fondo tras el primer dibujo,
+    y cada llamada a resaltar() restaura ese fondo y redibuja encima solo barras y leyenda.
+
+        grafico = GraficoBarras(k, probabilidades, 'skyblue', 'navy', alpha=0.7)
+        grafico.ax.set_title(...)
+        grafico.leyenda('Probabilidad P(X=k)', 'Probabilidad Calculada')
+        png = grafico.resaltar(k == 3, 'Probabilidad Calculada (0.2240)')
+        png_descarga = grafico.exportar()  # 300 dpi, recortado a su contenido (ver boton_descarga)
+    """
+
+    def __init__(self, x, alturas, color_base, color_resaltado, alpha=1.0, figsize=(12, 7), dpi=150, **opciones_barras):
+        from matplotlib.colors import to_rgba
+
+        self.fig = nueva_figura(figsize, dpi)
+        self.ax = self.fig.subplots()
+        self.x = np.asarray(x)
+        self.alturas = np.asarray(alturas, dtype=float)
+        # El alpha va dentro de cada color para que la barra resaltada pueda ser opaca
+        self._colores = (to_rgba(color_base, alpha), to_rgba(color_resaltado))
+        self.barras = self.ax.bar(self.x, self.alturas, color=self._colores[0], animated=True, **opciones_barras)
+        self._mascara = np.zeros(len(self.x), dtype=bool)
+        self._leyenda = None
+        self._fondo = None
+        self._exportado = None
+
+    def etiquetar_barras(self, textos, tamano=8, separacion=2):
+        """
+        Escribe un texto encima de cada barra con un solo artista (una PathCollection de
+        glifos, como los marcadores de un scatter) en lugar de un ax.text por barra.
+        """
+        from matplotlib.collections import PathCollection
+        from matplotlib.path import Path
+        from matplotlib.textpath import TextPath
+        from matplotlib.transforms import IdentityTransform
+
+        trayectorias = []
+        for texto in textos:
+            glifos = TextPath((0, 0), texto, size=tamano)
+            ancho = glifos.get_extents().width
+            trayectorias.append(Path(glifos.vertices + [-ancho / 2, separacion], glifos.codes))
+        coleccion = PathCollection(
+            trayectorias, sizes=[1], offsets=np.column_stack([self.x, self.alturas]),
+            offset_transform=self.ax.transData, transform=IdentityTransform(),
+            facecolors='black', edgecolors='none'
+        )
+        self.ax.add_collection(coleccion, autolim=False)
+        return coleccion
+
+    def leyenda(self, etiqueta_base, etiqueta_resaltado, **opciones):
+        from matplotlib.patches import Patch
+
+        muestras = [Patch(facecolor=color, edgecolor=self.barras[0].get_edgecolor()) for color in self._colores]
+        self._leyenda = self.ax.legend(muestras, [etiqueta_base, etiqueta_resaltado], **opciones)
+        self._leyenda.set_animated(True)
+        return self._leyenda
+
+    @etapa("dibujo")
+    def resaltar(self, mascara, etiqueta_resaltado=None):
+        """Cambia el color solo de las barras cuya máscara cambió y devuelve el gráfico en PNG."""
+        from matplotlib.image import imsave
+
+        mascara = np.asarray(mascara, dtype=bool)
+        for i in np.flatnonzero(mascara != self._mascara):
+            self.barras[i].set_facecolor(self._colores[int(mascara[i])])
+        self._mascara = mascara
+        if etiqueta_resaltado is not None and self._leyenda is not None:
+            self._leyenda.get_texts()[1].set_text(etiqueta_resaltado)
+
+        canvas = self.fig.canvas
+        if self._fondo is None:
+            canvas.draw()
+            self._fondo = canvas.copy_from_bbox(self.fig.bbox)
+        canvas.restore_region(self._fondo)
+        for barra in self.barras:
+            self.ax.draw_artist(barra)
+        if self._leyenda is not None:
+            self.ax.draw_artist(self._leyenda)
+
+        buf = io.BytesIO()
+        imsave(buf, np.asarray(canvas.buffer_rgba()), format="png")
+        return buf.getvalue()
+
+    def _clave_exportacion(self, dpi, bbox_inches):
+        return (self._mascara.tobytes(), self._leyenda.get_texts()[1].get_text() if self._leyenda else None, dpi, bbox_inches)
+
+    def exportacion_lista(self, dpi=300, bbox_inches='tight'):
+        """True si exportar() ya tiene guardado el PNG del resaltado actual."""
+        return self._exportado is not None and self._exportado[0] == self._clave_exportacion(dpi, bbox_inches)
+
+    def exportar(self, dpi=300, bbox_inches='tight'):
+        """
+        PNG para descargar con el resaltado actual: un dibujo completo a `dpi`, no la imagen
+        del blit. Se guarda por resaltado, así que los reruns que no lo cambian no vuelven a exportar.
+        """
+        clave = self._clave_exportacion(dpi, bbox_inches)
+        if self.exportacion_lista(dpi, bbox_inches):
+            return self._exportado[1]
+        # savefig omite los artistas animados: barras y leyenda se dibujan como estáticas solo mientras se guarda
+        animados = [*self.barras, *([self._leyenda] if self._leyenda is not None else [])]
+        for artista in animados:
+            artista.set_animated(False)
+        try:
+            png = a_png(self.fig, dpi=dpi, bbox_inches=bbox_inches)
+        finally:
+            for artista in animados:
+                artista.set_animated(True)
+        self._exportado = (clave, png)
+        return png
+
+    def liberar(self):
+        liberar(self.fig)
+
+
+def enlace_descarga(png, nombre_archivo, etiqueta="📥 Descargar Gráfico"):
+    """
+    Enlace para descargar el PNG, dibujado como elemento y no como widget. Un fragmento solo
+    puede crear widgets en su propio cuerpo: si corre en la barra lateral (junto a sus
+    controles), esto es lo que deja la descarga con el gráfico en el panel principal.
+    """
+    codificado = base64.b64encode(png).decode("ascii")
+    st.markdown(f'<a href="data:image/png;base64,{codificado}" download="{html.escape(nombre_archivo)}">{etiqueta}</a>',
+                unsafe_allow_html=True)
+
+
+def boton_descarga(grafico, nombre_archivo, clave):
+    """
+    Descarga del PNG de grafico.exportar() bajo demanda: el dibujo a 300 dpi solo se hace cuando
+    el usuario pulsa "Preparar descarga", no en cada rerun que mueve el resaltado. Mientras el
+    resaltado no cambie, el botón de descarga sigue disponible sin volver a exportar.
+    """
+    if grafico.exportacion_lista() or st.button("🖼️ Preparar descarga", key=clave):
+        st.download_button(label="📥 Descargar Gráfico", data=grafico.exportar(), file_name=nombre_archivo, mime="image/png")
+
+
+def reutilizar_grafico(almacen, nombre, clave, construir):
+    """
+    Devuelve el gráfico guardado en `almacen` (st.session_state) bajo `nombre` si se construyó
+    con la misma `clave`; si no, libera el anterior y guarda el que devuelve construir().
+    """
+    guardado = almacen.get(nombre)
+    if guardado is not None and guardado[0] == clave:
+        return guardado[1]
+    if guardado is not None:
+        guardado[1].liberar()
+    with etapa("dibujo", f"construcción de {nombre}"):
+        grafico = construir()
+    almacen[nombre] = (clave, grafico)
+    return grafico
@@ -0,0 +1,167 @@
+# graficos_interactivos.py (motor de gráficos Plotly para todas las aplicaciones)
+#
+# Con matplotlib el servidor rasteriza cada gráfico a PNG en cada interacción. Con este motor el
+# servidor solo arma un JSON con datos ya agregados (conteos por bin, cuartiles, vectores de
+# probabilidad, la tabla de contingencia) y el navegador dibuja el gráfico; las nubes de puntos
+# usan trazas WebGL (Scattergl) para que el navegador pueda con muchos puntos.
+#
+# plotly se importa dentro de cada función: el selector del motor está en todas las barras
+# laterales, pero plotly solo se carga si alguien lo activa.
+
+import numpy as np
+import streamlit as st
+
+from instrumentacion import etapa
+
+# Por encima de esta cantidad de puntos la dispersión se envía como una muestra aleatoria.
+MAX_PUNTOS_DISPERSION = 100_000
+# Estilos de línea de matplotlib -> plotly
+ESTILOS_LINEA = {"dashed": "dash", "--": "dash", "dotted": "dot", ":": "dot", "solid": "solid", "-": "solid"}
+
+
+def elegir_motor_graficos():
+    """Selector compartido del motor de gráficos; se llama dentro de `with st.sidebar:`."""
+    return st.toggle(
+        "Gráficos interactivos (Plotly)",
+        key="motor_plotly",
+        help="El navegador dibuja el gráfico y el servidor solo envía datos agregados (conteos, cuartiles, probabilidades)."
+    )
+
+
+def _maquetar(fig, titulo, xlabel, ylabel):
+    fig.update_layout(
+        title=dict(text=f"<b>{titulo}</b>", x=0.5),
+        xaxis_title=xlabel,
+        yaxis_title=ylabel,
+        template="plotly_white",
+        legend=dict(bgcolor="rgba(255,255,255,0.7)"),
+        margin=dict(l=40, r=20, t=60, b=40),
+    )
+    return fig
+
+
+def _lineas_verticales(fig, lineas, y_max):
+    import plotly.graph_objects as go
+
+    # Cada línea es una traza de dos puntos para que aparezca en la leyenda, igual que axvline(label=...)
+    for linea in lineas:
+        fig.add_trace(go.Scatter(
+            x=[linea["x"], linea["x"]], y=[0, y_max], mode="lines", name=linea.get("nombre"),
+            showlegend=linea.get("nombre") is not None,
+            line=dict(color=linea.get("color", "red"), dash=ESTILOS_LINEA.get(linea.get("estilo", "solid"), "solid"), width=2.5),
+        ))
+
+
+# --- 1. Histograma ---
+@etapa("dibujo")
+def histograma(frecuencias, bins, color, titulo, xlabel, lineas=(), curva=None, ylabel="Frecuencia"):
+    """
+    Histograma a partir de conteos ya calculados (np.histogram): se envían len(bins) números,
+    no los datos. `lineas` es una lista de dicts {x, color, estilo, nombre}; `curva` un par
+    (x, y) opcional, por ejemplo una densidad ya escalada a frecuencias.
+    """
+    import plotly.graph_objects as go
+
+    frecuencias = np.asarray(frecuencias)
+    bins = np.asarray(bins, dtype=float)
+    fig = go.Figure(go.Bar(
+        x=(bins[:-1] + bins[1:]) / 2, y=frecuencias, width=np.diff(bins), name="Frecuencia", showlegend=False,
+        marker=dict(color=color, opacity=0.7, line=dict(color="black", width=1)),
+    ))
+    if curva is not None:
+        fig.add_trace(go.Scatter(x=curva[0], y=curva[1], mode="lines", name="Densidad", line=dict(color=color, width=2)))
+    _lineas_verticales(fig, lineas, frecuencias.max() if frecuencias.size else 1)
+    fig.update_layout(bargap=0)
+    return _maquetar(fig, titulo, xlabel, ylabel)
+
+
+# --- 2. Diagrama de Caja ---
+@etapa("dibujo")
+def diagrama_caja(q1, mediana, q3, bigote_inf, bigote_sup, outliers, color, titulo, xlabel):
+    """Diagrama de caja con los cuartiles precalculados; de los datos solo viajan los valores atípicos."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Box(
+        q1=[q1], median=[mediana], q3=[q3], lowerfence=[bigote_inf], upperfence=[bigote_sup], y=[xlabel],
+        orientation="h", fillcolor=color, line=dict(color="black", width=2), name="Caja", showlegend=False,
+    ))
+    if len(outliers):
+        fig.add_trace(go.Scattergl(
+            x=np.asarray(outliers), y=[xlabel] * len(outliers), mode="markers", name="Outliers",
+            marker=dict(color="blue", size=9, line=dict(color="black", width=1)),
+        ))
+    fig.update_yaxes(showticklabels=False)
+    return _maquetar(fig, titulo, "Valores", None)
+
+
+# --- 3. Dispersión con Rectas ---
+@etapa("dibujo")
+def dispersion(x, y, rectas, titulo, xlabel, ylabel, punto=None, semilla=0):
+    """
+    Nube de puntos WebGL con rectas ajustadas. `rectas` es una lista de dicts
+    {pendiente, intercepto, nombre, color, estilo}; `punto` un par (x, y) opcional a destacar.
+    Con más de MAX_PUNTOS_DISPERSION puntos se envía una muestra aleatoria de ese tamaño.
+    Si el punto se mueve a menudo (p. ej. con un slider), conviene construir la figura una vez
+    y cambiar solo el punto con mover_punto().
+    """
+    import plotly.graph_objects as go
+
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(x) > MAX_PUNTOS_DISPERSION:
+        indices = np.random.default_rng(semilla).choice(len(x), MAX_PUNTOS_DISPERSION, replace=False)
+        x, y = x[indices], y[indices]
+    fig = go.Figure(go.Scattergl(x=x, y=y, mode="markers", name="Datos Observados", marker=dict(size=6, opacity=0.6)))
+
+    extremos = np.array([x.min(), x.max()]) if len(x) else np.array([0.0, 1.0])
+    for recta in rectas:
+        fig.add_trace(go.Scatter(
+            x=extremos, y=recta["intercepto"] + recta["pendiente"] * extremos, mode="lines", name=recta["nombre"],
+            line=dict(color=recta.get("color", "red"), dash=ESTILOS_LINEA.get(recta.get("estilo", "solid"), "solid"), width=2),
+        ))
+    if punto is not None:
+        fig.add_trace(go.Scatter(x=[punto[0]], y=[punto[1]], mode="markers", name="Predicción",
+                                 marker=dict(color="green", size=14)))
+    return _maquetar(fig, titulo, xlabel, ylabel)
+
+
+def mover_punto(fig, punto):
+    """Cambia en su lugar el punto destacado de una figura de dispersion() construida con `punto`."""
+    fig.data[-1].update(x=[punto[0]], y=[punto[1]])
+    return fig
+
+
+# --- 4. Mapa de Calor ---
+@etapa("dibujo")
+def mapa_calor(tabla, titulo, xlabel, ylabel, anotar=True, escala="Blues"):
+    """Mapa de calor de una tabla (DataFrame) ya agregada, con los valores como texto opcional."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Heatmap(
+        z=tabla.to_numpy(), x=tabla.columns.astype(str), y=tabla.index.astype(str), colorscale=escala,
+        texttemplate="%{z}" if anotar else None, hoverongaps=False,
+    ))
+    fig.update_yaxes(autorange="reversed")
+    return _maquetar(fig, titulo, xlabel, ylabel)
+
+
+# --- 5. Barras de Distribuciones Discretas ---
+@etapa("dibujo")
+def barras_distribucion(k, probabilidades, mascara, colores, nombres, titulo, xlabel, ylabel="Probabilidad", etiquetas=None):
+    """
+    Barras de una PMF con las barras de `mascara` resaltadas. `colores` y `nombres` son pares
+    (base, resaltado). Solo se envían el vector de probabilidades y la máscara.
+    """
+    import plotly.graph_objects as go
+
+    k = np.asarray(k)
+    probabilidades = np.asarray(probabilidades)
+    mascara = np.asarray(mascara, dtype=bool)
+    fig = go.Figure([
+        go.Bar(x=k, y=probabilidades, name=nombres[0], marker=dict(color=colores[0], opacity=0.7),
+               text=etiquetas, textposition="outside" if etiquetas is not None else None),
+        go.Bar(x=k[mascara], y=probabilidades[mascara], name=nombres[1], marker=dict(color=colores[1])),
+    ])
+    fig.update_layout(barmode="overlay")
+    fig.update_xaxes(tickmode="linear", dtick=1)
+    return _maquetar(fig, titulo, xlabel, ylabel)
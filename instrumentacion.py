@@ -0,0 +1,150 @@
+# instrumentacion.py (tiempo y memoria por etapa de cada ejecución, opcional)
+#
+# Uso:  MEDIR_ETAPAS=1 streamlit run app.py
+# Con la variable de entorno MEDIR_ETAPAS=1, cada ejecución de una página mide sus etapas:
+#   ingestión (lectura del archivo), cálculo (estadísticos, pruebas, ajustes),
+#   dibujo (construcción del gráfico y st.pyplot) y exportación (savefig a PNG para descargar).
+# Cada etapa registra su duración y su pico de memoria (tracemalloc) por encima de la memoria
+# con la que empezó. Al final de la página se muestra un desglose plegable, y cada etapa se
+# añade a REGISTRO_ETAPAS (JSONL, o CSV si la ruta termina en .csv) para analizarla después.
+# Sin la variable, etapa() no hace nada y tracemalloc no se activa.
+#
+# tracemalloc es global del proceso: con varias sesiones midiendo a la vez, el pico de una etapa
+# incluye lo que asignaron las demás. Para medir memoria conviene una sola sesión abierta.
+
+import csv
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+ACTIVA = os.environ.get("MEDIR_ETAPAS") == "1"
+REGISTRO_ETAPAS = os.environ.get("REGISTRO_ETAPAS", "registro_etapas.jsonl")
+ETAPAS = ("ingestión", "cálculo", "dibujo", "exportación")
+CAMPOS_REGISTRO = ("fecha", "pagina", "corrida", "etapa", "detalle", "nivel", "segundos", "memoria_pico_mb")
+CLAVE_MEDICION = "medicion_etapas"
+
+_candado_registro = threading.Lock()
+
+if ACTIVA:
+    tracemalloc.start()
+
+
+def _medicion():
+    """Medición de la ejecución en curso, o None fuera del hilo de una página (p. ej. en un trabajo)."""
+    if get_script_run_ctx() is None:
+        return None
+    medicion = st.session_state.get(CLAVE_MEDICION)
+    if medicion is not None and medicion["cerrada"]:
+        # La página ya mostró su desglose: lo que se mide ahora es la ejecución de un fragmento
+        medicion = _nueva_medicion(medicion["pagina"])
+    return medicion
+
+
+def _nueva_medicion(pagina):
+    medicion = {"pagina": pagina, "corrida": uuid.uuid4().hex[:8], "inicio": time.perf_counter(),
+                "etapas": [], "pila": [], "cerrada": False}
+    st.session_state[CLAVE_MEDICION] = medicion
+    return medicion
+
+
+def _registrar(fila):
+    with _candado_registro:
+        with open(REGISTRO_ETAPAS, "a", encoding="utf-8", newline="") as archivo:
+            if REGISTRO_ETAPAS.endswith(".csv"):
+                nuevo = archivo.tell() == 0
+                escritor = csv.DictWriter(archivo, fieldnames=CAMPOS_REGISTRO)
+                if nuevo:
+                    escritor.writeheader()
+                escritor.writerow(fila)
+            else:
+                archivo.write(json.dumps(fila, ensure_ascii=False) + "\n")
+
+
+def iniciar_medicion(pagina):
+    """Empieza la medición de esta ejecución; se llama al inicio de cada página, tras st.set_page_config."""
+    if ACTIVA:
+        _nueva_medicion(os.path.basename(pagina))
+
+
+@contextmanager
+def etapa(nombre, detalle=""):
+    """
+    Mide el bloque como una etapa de la ejecución en curso. Sirve también como decorador:
+
+        with etapa("exportación"):
+            fig.savefig(buf, format="png", dpi=300)
+
+        @etapa("cálculo")
+        @st.cache_data
+        def calcular(...): ...
+
+    Las etapas pueden anidarse (p. ej. la exportación dentro del dibujo de la figura); cada una
+    informa su tiempo total, incluido el de las etapas internas.
+    """
+    medicion = _medicion() if ACTIVA else None
+    if medicion is None:
+        yield
+        return
+
+    pila = medicion["pila"]
+    entrada = {"pico_internas": 0}
+    # El lugar se reserva al empezar, para que el desglose quede en orden de inicio (externas antes que internas)
+    posicion = len(medicion["etapas"])
+    medicion["etapas"].append(None)
+    memoria_inicial = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    pila.append(entrada)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        pila.pop()
+        # reset_peak() de las etapas internas borró el pico anterior a ellas: se recupera de la entrada
+        pico = max(tracemalloc.get_traced_memory()[1], entrada["pico_internas"])
+        if pila:
+            pila[-1]["pico_internas"] = max(pila[-1]["pico_internas"], pico)
+        fila = {
+            "fecha": datetime.now().isoformat(timespec="seconds"), "pagina": medicion["pagina"],
+            "corrida": medicion["corrida"], "etapa": nombre, "detalle": detalle, "nivel": len(pila),
+            "segundos": round(segundos, 6), "memoria_pico_mb": round(max(pico - memoria_inicial, 0) / 2**20, 3),
+        }
+        medicion["etapas"][posicion] = fila
+        _registrar(fila)
+
+
+def mostrar_tiempos():
+    """Desglose plegable de las etapas medidas en esta ejecución; se llama al final de cada página."""
+    medicion = _medicion() if ACTIVA else None
+    if medicion is None or not medicion["etapas"]:
+        return
+    medicion["cerrada"] = True
+    import pandas as pd
+
+    total = time.perf_counter() - medicion["inicio"]
+    filas = [fila for fila in medicion["etapas"] if fila is not None]  # None: etapa que sigue abierta
+    desglose = pd.DataFrame({
+        "Etapa": [" " * fila["nivel"] + fila["etapa"] + (f" ({fila['detalle']})" if fila["detalle"] else "")
+                  for fila in filas],
+        "Tiempo (s)": [fila["segundos"] for fila in filas],
+        "Memoria pico (MB)": [fila["memoria_pico_mb"] for fila in filas],
+    })
+    principales = pd.DataFrame([fila for fila in filas if fila["nivel"] == 0], columns=CAMPOS_REGISTRO)
+    por_etapa = principales.groupby("etapa", sort=False)["segundos"].sum().reindex(ETAPAS, fill_value=0.0)
+
+    with st.expander(f"⏱️ Tiempos por etapa: {total:.3f} s en esta ejecución"):
+        columnas = st.columns(len(ETAPAS) + 1)
+        for columna, (nombre, segundos) in zip(columnas, por_etapa.items()):
+            columna.metric(nombre.capitalize(), f"{segundos:.3f} s")
+        columnas[-1].metric("Sin medir", f"{max(total - por_etapa.sum(), 0):.3f} s",
+                            help="Widgets, Streamlit y todo lo que no está dentro de una etapa.")
+        st.dataframe(desglose.style.format({"Tiempo (s)": "{:.4f}", "Memoria pico (MB)": "{:.2f}"}), hide_index=True)
+        st.caption(f"Ejecución {medicion['corrida']}, registrada en {REGISTRO_ETAPAS}.")
@@ -0,0 +1,69 @@
+# procesos.py (pool de procesos único para todos los cálculos en paralelo del servidor)
+#
+# La prueba de permutación, el bootstrap, la matriz de asociación, los estimadores robustos y la
+# lectura de CSV por bloques abrían cada uno su propio ProcessPoolExecutor del tamaño de
+# os.cpu_count(): con varias sesiones calculando a la vez había (trabajos en curso) x núcleos
+# procesos compitiendo por los mismos núcleos. Aquí hay un solo pool de N_PROCESOS procesos, creado con el primer cálculo que lo usa
+# y compartido por todas las sesiones; cada cálculo envía sus lotes a ese pool.
+#
+# Este módulo no importa streamlit: los procesos del pool importan los módulos de las funciones
+# que reciben (contingencia, regresion, carga_datos), una sola vez por proceso.
+
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+N_PROCESOS = os.cpu_count() or 1
+
+_pool = None
+_candado = threading.Lock()
+
+
+def pool_compartido():
+    """Pool de N_PROCESOS procesos compartido por todas las sesiones; se crea con el primer uso."""
+    global _pool
+    with _candado:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=N_PROCESOS)
+        return _pool
+
+
+def repartir(funcion, argumentos, al_terminar=None, en_vuelo=None):
+    """
+    Ejecuta funcion(*args) en el pool compartido para cada tupla de `argumentos` y devuelve los
+    resultados en el mismo orden. Como mucho `en_vuelo` tareas (por defecto N_PROCESOS) están
+    enviadas a la vez, así que cada cálculo ocupa como mucho esa parte de la cola; `argumentos`
+    se consume a medida que hay lugar, así que con un generador solo existen a la vez los datos
+    de las tareas en vuelo. `al_terminar(i, resultado)` se llama al terminar cada tarea; si
+    lanza una excepción (p. ej. una cancelación), las tareas que no empezaron se descartan y se
+    espera a las que están corriendo antes de propagarla, para que el cálculo no siga ocupando
+    procesos después de devolver el control.
+    """
+    argumentos = iter(argumentos)
+    en_vuelo = max(1, en_vuelo or N_PROCESOS)
+    pool = pool_compartido()
+    resultados = {}
+    pendientes = {}
+    enviadas = 0
+    agotados = False
+    try:
+        while True:
+            while not agotados and len(pendientes) < en_vuelo:
+                args = next(argumentos, None)
+                if args is None:
+                    agotados = True
+                    break
+                pendientes[pool.submit(funcion, *args)] = enviadas
+                enviadas += 1
+            if not pendientes:
+                break
+            hechos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                i = pendientes.pop(futuro)
+                resultados[i] = futuro.result()
+                if al_terminar is not None:
+                    al_terminar(i, resultados[i])
+    finally:
+        corriendo = [futuro for futuro in pendientes if not futuro.cancel()]
+        wait(corriendo)
+    return [resultados[i] for i in range(enviadas)]
@@ -0,0 +1,441 @@
+# regresion.py (motor de regresión lineal a partir de estadísticos suficientes)
+#
+# scipy se importa dentro de las funciones que lo usan, para que las aplicaciones puedan importar
+# este módulo al inicio sin pagar la carga de scipy antes de que haya datos.
+
+import time
+from functools import reduce
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from procesos import N_PROCESOS, repartir
+
+FILAS_POR_BLOQUE = 1_000_000
+# Máximo de índices (remuestras x filas) que el bootstrap materializa a la vez, sumando todos
+# los procesos del pool compartido: cada lote usa MAX_ELEMENTOS_LOTE // N_PROCESOS por operación
+MAX_ELEMENTOS_LOTE = 20_000_000
+# Theil-Sen usa todos los pares hasta este número; por encima, una muestra aleatoria de pares
+MAX_PARES_THEIL_SEN = 500_000
+# RANSAC evalúa sus candidatos sobre una submuestra de este tamaño
+MUESTRA_RANSAC = 20_000
+
+
+# --- 1. Estadísticos Suficientes ---
+class Momentos(NamedTuple):
+    """
+    Estadísticos suficientes de la regresión simple en forma de co-momentos (centrados en
+    la media), que no pierden precisión como Σx² − (Σx)²/n. Las sumas clásicas se recuperan
+    con Σx = n·media_x, Σx² = m2_x + n·media_x², Σxy = c_xy + n·media_x·media_y.
+    """
+    n: int
+    media_x: float
+    media_y: float
+    m2_x: float   # Σ (x − media_x)²
+    m2_y: float   # Σ (y − media_y)²
+    c_xy: float   # Σ (x − media_x)(y − media_y)
+    min_x: float
+    max_x: float
+
+
+MOMENTOS_VACIOS = Momentos(0, 0.0, 0.0, 0.0, 0.0, 0.0, np.inf, -np.inf)
+
+
+def momentos(x, y):
+    """Momentos de un bloque de datos (sin valores faltantes) en dos pasadas vectorizadas."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if len(x) == 0:
+        return MOMENTOS_VACIOS
+    media_x, media_y = x.mean(), y.mean()
+    dx, dy = x - media_x, y - media_y
+    return Momentos(len(x), media_x, media_y, dx @ dx, dy @ dy, dx @ dy, x.min(), x.max())
+
+
+def combinar(a, b):
+    """Une los momentos de dos bloques (fórmula de Chan et al.), en cualquier orden."""
+    if a.n == 0:
+        return b
+    if b.n == 0:
+        return a
+    n = a.n + b.n
+    dx = b.media_x - a.media_x
+    dy = b.media_y - a.media_y
+    factor = a.n * b.n / n
+    return Momentos(
+        n,
+        a.media_x + dx * b.n / n,
+        a.media_y + dy * b.n / n,
+        a.m2_x + b.m2_x + dx * dx * factor,
+        a.m2_y + b.m2_y + dy * dy * factor,
+        a.c_xy + b.c_xy + dx * dy * factor,
+        min(a.min_x, b.min_x),
+        max(a.max_x, b.max_x),
+    )
+
+
+# --- 2. Ajuste ---
+class ResultadoRegresion(NamedTuple):
+    pendiente: float
+    intercepto: float
+    r: float
+    r2: float
+    p_valor: float
+    error_estandar: float
+    error_intercepto: float
+    n: int
+
+
+def ajustar(m):
+    """Recta de mínimos cuadrados y su inferencia, con los mismos resultados que scipy.stats.linregress."""
+    from scipy.stats import t as distribucion_t
+
+    if m.n < 2:
+        raise ValueError("Se necesitan al menos dos observaciones para ajustar la recta.")
+    if m.m2_x == 0:
+        raise ValueError("Todos los valores de X son iguales; la pendiente no está definida.")
+
+    pendiente = m.c_xy / m.m2_x
+    intercepto = m.media_y - pendiente * m.media_x
+    r = 0.0 if m.m2_y == 0 else float(np.clip(m.c_xy / np.sqrt(m.m2_x * m.m2_y), -1.0, 1.0))
+    gl = m.n - 2
+
+    if gl == 0 or abs(r) == 1.0:
+        p_valor, error_estandar = 0.0, 0.0
+    else:
+        estadistico_t = r * np.sqrt(gl / (1 - r * r))
+        p_valor = 2 * distribucion_t.sf(abs(estadistico_t), gl)
+        error_estandar = np.sqrt((1 - r * r) * m.m2_y / m.m2_x / gl)
+    error_intercepto = error_estandar * np.sqrt(m.m2_x / m.n + m.media_x ** 2)
+    return ResultadoRegresion(pendiente, intercepto, r, r * r, p_valor, error_estandar, error_intercepto, m.n)
+
+
+def intervalos_prediccion(m, valores_x, confianza=0.95):
+    """
+    Predicciones de la recta para varios valores de X, con el intervalo de confianza de la
+    media y el intervalo de predicción de una observación nueva. Solo usa los momentos.
+    """
+    from scipy.stats import t as distribucion_t
+
+    ajuste = ajustar(m)
+    valores_x = np.asarray(valores_x, dtype=np.float64)
+    gl = m.n - 2
+    sse = max(m.m2_y - m.c_xy ** 2 / m.m2_x, 0.0)
+    s = np.sqrt(sse / gl) if gl > 0 else np.nan
+    t_critico = distribucion_t.ppf(0.5 + confianza / 2, gl) if gl > 0 else np.nan
+
+    prediccion = ajuste.intercepto + ajuste.pendiente * valores_x
+    error_media = s * np.sqrt(1 / m.n + (valores_x - m.media_x) ** 2 / m.m2_x)
+    error_nueva = s * np.sqrt(1 + 1 / m.n + (valores_x - m.media_x) ** 2 / m.m2_x)
+    return pd.DataFrame({
+        "X": valores_x,
+        "Predicción": prediccion,
+        "IC Inferior": prediccion - t_critico * error_media,
+        "IC Superior": prediccion + t_critico * error_media,
+        "IP Inferior": prediccion - t_critico * error_nueva,
+        "IP Superior": prediccion + t_critico * error_nueva,
+    })
+
+
+# --- 3. Una Pasada sobre Archivos Grandes ---
+def _momentos_de_bloque(bloque, columna_x, columna_y):
+    limpio = bloque[[columna_x, columna_y]].apply(pd.to_numeric, errors="coerce").dropna()
+    return momentos(limpio[columna_x].to_numpy(), limpio[columna_y].to_numpy())
+
+
+def momentos_por_bloques(fuente, columna_x, columna_y, filas_por_bloque=FILAS_POR_BLOQUE):
+    """Recorre el CSV una sola vez, leyendo solo las dos columnas, y acumula sus momentos."""
+    lector = pd.read_csv(fuente, usecols=[columna_x, columna_y], chunksize=filas_por_bloque)
+    with lector:
+        return reduce(combinar, (_momentos_de_bloque(b, columna_x, columna_y) for b in lector), MOMENTOS_VACIOS)
+
+
+# --- 4. Regresión Múltiple con Matriz de Gram ---
+class Gram(NamedTuple):
+    """
+    Matriz de Gram centrada de todas las columnas numéricas: con ella se resuelve cualquier
+    regresión entre esas columnas (cualquier objetivo y subconjunto de predictores) sin
+    volver a leer las filas. `comomentos[i, j]` = Σ (x_i − media_i)(x_j − media_j).
+    """
+    n: int
+    columnas: tuple
+    medias: np.ndarray
+    comomentos: np.ndarray
+
+
+def _gram_vacia(columnas):
+    return Gram(0, tuple(columnas), np.zeros(len(columnas)), np.zeros((len(columnas), len(columnas))))
+
+
+def matriz_gram(datos, columnas):
+    """Gram centrada de `columnas` (filas completas) en una sola multiplicación de matrices (BLAS)."""
+    x = datos[list(columnas)].apply(pd.to_numeric, errors="coerce").dropna().to_numpy(dtype=np.float64)
+    if len(x) == 0:
+        return _gram_vacia(columnas)
+    medias = x.mean(axis=0)
+    centrada = x - medias
+    return Gram(len(x), tuple(columnas), medias, centrada.T @ centrada)
+
+
+def combinar_gram(a, b):
+    """Une las Gram de dos bloques con las mismas columnas (versión matricial de combinar)."""
+    if a.n == 0:
+        return b
+    if b.n == 0:
+        return a
+    n = a.n + b.n
+    d = b.medias - a.medias
+    return Gram(n, a.columnas, a.medias + d * b.n / n, a.comomentos + b.comomentos + np.outer(d, d) * (a.n * b.n / n))
+
+
+def gram_por_bloques(fuente, columnas, filas_por_bloque=FILAS_POR_BLOQUE):
+    """Gram de un CSV grande en una sola pasada, leyendo solo las columnas pedidas."""
+    lector = pd.read_csv(fuente, usecols=list(columnas), chunksize=filas_por_bloque)
+    with lector:
+        return reduce(combinar_gram, (matriz_gram(b, columnas) for b in lector), _gram_vacia(columnas))
+
+
+def ajustar_multiple(gram, objetivo, predictores):
+    """
+    Mínimos cuadrados de `objetivo` sobre `predictores` usando solo la submatriz de la Gram,
+    resuelta por Cholesky. Devuelve una tabla de coeficientes (con intercepto) y un dict con
+    R², R² ajustado, error estándar de la regresión, n y grados de libertad.
+    """
+    from scipy.linalg import LinAlgError, cho_factor, cho_solve
+    from scipy.stats import t as distribucion_t
+
+    indice = {c: i for i, c in enumerate(gram.columnas)}
+    p = [indice[c] for c in predictores]
+    y = indice[objetivo]
+    n, k = gram.n, len(p)
+    gl = n - k - 1
+    if gl <= 0:
+        raise ValueError("Hay más coeficientes que observaciones; elige menos predictores.")
+
+    sxx = gram.comomentos[np.ix_(p, p)]
+    sxy = gram.comomentos[p, y]
+    syy = gram.comomentos[y, y]
+    try:
+        factor = cho_factor(sxx)
+    except LinAlgError:
+        raise ValueError("Los predictores elegidos son colineales (o alguno es constante); quita alguno de ellos.") from None
+
+    betas = cho_solve(factor, sxy)
+    intercepto = gram.medias[y] - betas @ gram.medias[p]
+    sse = max(syy - betas @ sxy, 0.0)
+    r2 = 1 - sse / syy if syy > 0 else 0.0
+    sigma2 = sse / gl
+
+    covarianza = sigma2 * cho_solve(factor, np.eye(k))
+    errores = np.sqrt(np.diag(covarianza))
+    error_intercepto = np.sqrt(sigma2 / n + gram.medias[p] @ covarianza @ gram.medias[p])
+
+    coeficientes = np.concatenate([[intercepto], betas])
+    errores = np.concatenate([[error_intercepto], errores])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = coeficientes / errores
+    tabla = pd.DataFrame({
+        "Coeficiente": coeficientes,
+        "Error Estándar": errores,
+        "t": t,
+        "Valor p": 2 * distribucion_t.sf(np.abs(t), gl),
+    }, index=pd.Index(["Intercepto", *predictores], name="Término"))
+    resumen = {
+        "r2": r2,
+        "r2_ajustado": 1 - (1 - r2) * (n - 1) / gl,
+        "error_estandar": np.sqrt(sigma2),
+        "n": n,
+        "gl": gl,
+    }
+    return tabla, resumen
+
+
+# --- 5. Intervalos de Confianza Bootstrap ---
+def _lote_bootstrap(x, y, semilla, n_remuestras, max_elementos=MAX_ELEMENTOS_LOTE):
+    """
+    Pendiente e intercepto (en coordenadas centradas) de `n_remuestras` remuestras, con como
+    mucho `max_elementos` índices generados en cada operación.
+    Cada remuestra se representa por cuántas veces aparece cada fila (matriz de pesos W),
+    así que sus sumas Σx, Σy, Σx², Σxy salen de productos W @ x, sin reajustar nada.
+    """
+    n = len(x)
+    rng = np.random.default_rng(semilla)
+    por_operacion = max(1, max_elementos // n)
+    pendientes, interceptos = [], []
+    hechas = 0
+    while hechas < n_remuestras:
+        b = min(por_operacion, n_remuestras - hechas)
+        indices = rng.integers(0, n, size=(b, n)) + (np.arange(b) * n)[:, None]
+        pesos = np.bincount(indices.ravel(), minlength=b * n).reshape(b, n).astype(np.float64)
+        sx, sy = pesos @ x, pesos @ y
+        sxx, sxy = pesos @ (x * x), pesos @ (x * y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pendiente = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        pendientes.append(pendiente)
+        interceptos.append((sy - pendiente * sx) / n)
+        hechas += b
+    return np.concatenate(pendientes), np.concatenate(interceptos)
+
+
+def bootstrap_regresion(x, y, n_remuestras=2000, remuestras_por_lote=100, semilla=0, confianza=0.95,
+                        n_procesos=None, al_progresar=None):
+    """
+    Intervalos de confianza bootstrap (percentiles) para la pendiente y el intercepto.
+    Los lotes de remuestras se reparten por el pool compartido, con como mucho `n_procesos`
+    lotes enviados a la vez, cada uno con su propia semilla derivada de `semilla`, así que
+    el resultado no depende del número de procesos.
+    `al_progresar(remuestras_hechas)` se llama cada vez que termina un lote.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Se centran los datos para que las sumas de cuadrados no pierdan precisión
+    media_x, media_y = x.mean(), y.mean()
+    x_centrada, y_centrada = x - media_x, y - media_y
+
+    tamanos = [remuestras_por_lote] * (n_remuestras // remuestras_por_lote)
+    if n_remuestras % remuestras_por_lote:
+        tamanos.append(n_remuestras % remuestras_por_lote)
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+
+    hechas = 0
+
+    def al_terminar(i, _):
+        nonlocal hechas
+        hechas += tamanos[i]
+        if al_progresar is not None:
+            al_progresar(hechas)
+
+    # El límite de memoria es para todo el pool: como mucho N_PROCESOS lotes corren a la vez
+    max_elementos = max(1, MAX_ELEMENTOS_LOTE // N_PROCESOS)
+    # Si al_progresar interrumpe el cálculo, repartir descarta los lotes que aún no empezaron
+    resultados = repartir(_lote_bootstrap,
+                          [(x_centrada, y_centrada, semilla_lote, tamano, max_elementos)
+                           for semilla_lote, tamano in zip(semillas, tamanos)],
+                          al_terminar, en_vuelo=n_procesos or N_PROCESOS)
+
+    pendientes = np.concatenate([r[0] for r in resultados])
+    # De coordenadas centradas a originales: b0 = media_y + b0_c − b1·media_x
+    interceptos = media_y + np.concatenate([r[1] for r in resultados]) - pendientes * media_x
+    validas = np.isfinite(pendientes)
+    pendientes, interceptos = pendientes[validas], interceptos[validas]
+
+    colas = [100 * (1 - confianza) / 2, 100 * (1 + confianza) / 2]
+    return {
+        "pendientes": pendientes,
+        "interceptos": interceptos,
+        "intervalo_pendiente": tuple(np.percentile(pendientes, colas)),
+        "intervalo_intercepto": tuple(np.percentile(interceptos, colas)),
+        "remuestras": len(pendientes),
+    }
+
+
+# --- 6. Estimadores Robustos ---
+def _recta_ponderada(x, y, w):
+    # Mínimos cuadrados ponderados a partir de las sumas ponderadas (centradas en la media ponderada)
+    suma_w = w.sum()
+    media_x, media_y = (w @ x) / suma_w, (w @ y) / suma_w
+    dx = x - media_x
+    pendiente = (w * dx) @ (y - media_y) / ((w * dx) @ dx)
+    return pendiente, media_y - pendiente * media_x
+
+
+def _mad(valores):
+    # Desviación absoluta mediana escalada para estimar la desviación estándar con outliers
+    return np.median(np.abs(valores - np.median(valores))) / 0.6745
+
+
+def theil_sen(x, y, max_pares=MAX_PARES_THEIL_SEN, semilla=0):
+    """
+    Pendiente de Theil-Sen: mediana de las pendientes entre pares de puntos. Con muchos
+    datos usa una muestra aleatoria de `max_pares` pares en lugar de los n(n−1)/2.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n * (n - 1) // 2 <= max_pares:
+        i, j = np.triu_indices(n, k=1)
+    else:
+        rng = np.random.default_rng(semilla)
+        i = rng.integers(0, n, max_pares)
+        j = rng.integers(0, n, max_pares)
+    dx = x[j] - x[i]
+    distintos = dx != 0
+    pendiente = np.median((y[j] - y[i])[distintos] / dx[distintos])
+    return pendiente, np.median(y - pendiente * x)
+
+
+def huber_irls(x, y, c=1.345, max_iteraciones=50, tolerancia=1e-8):
+    """
+    Regresión de Huber por mínimos cuadrados reponderados (IRLS): en cada iteración los
+    puntos con residuos grandes pierden peso y la recta se recalcula con sumas ponderadas.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    pesos = np.ones_like(x)
+    pendiente, intercepto = _recta_ponderada(x, y, pesos)
+    for _ in range(max_iteraciones):
+        residuos = y - (intercepto + pendiente * x)
+        escala = _mad(residuos)
+        if escala == 0:
+            break
+        pesos = np.minimum(1.0, c / np.maximum(np.abs(residuos) / escala, 1e-12))
+        nueva_pendiente, nuevo_intercepto = _recta_ponderada(x, y, pesos)
+        cambio = abs(nueva_pendiente - pendiente) + abs(nuevo_intercepto - intercepto)
+        pendiente, intercepto = nueva_pendiente, nuevo_intercepto
+        if cambio <= tolerancia * (1 + abs(pendiente) + abs(intercepto)):
+            break
+    return pendiente, intercepto
+
+
+def ransac(x, y, n_candidatos=1000, umbral=None, muestra=MUESTRA_RANSAC, semilla=0):
+    """
+    RANSAC: prueba rectas que pasan por pares de puntos al azar, se queda con la que deja más
+    puntos a menos de `umbral` (por defecto, la MAD de y) y la reajusta con esos puntos.
+    Los candidatos se evalúan todos a la vez sobre una submuestra.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    rng = np.random.default_rng(semilla)
+    if umbral is None:
+        umbral = np.median(np.abs(y - np.median(y)))
+    if umbral == 0:
+        umbral = np.finfo(np.float64).eps
+
+    i = rng.integers(0, len(x), n_candidatos)
+    j = rng.integers(0, len(x), n_candidatos)
+    dx = x[j] - x[i]
+    validos = dx != 0
+    pendientes = (y[j] - y[i])[validos] / dx[validos]
+    interceptos = y[i][validos] - pendientes * x[i][validos]
+    if len(pendientes) == 0:
+        raise ValueError("Todos los valores de X son iguales; la pendiente no está definida.")
+
+    sub = rng.choice(len(x), size=min(muestra, len(x)), replace=False)
+    x_sub, y_sub = x[sub], y[sub]
+    # Una fila por candidato (en lotes de 100): cuántos puntos de la submuestra quedan dentro del umbral
+    internos_por_candidato = np.concatenate([
+        (np.abs(y_sub - (interceptos[k:k + 100, None] + pendientes[k:k + 100, None] * x_sub)) < umbral).sum(axis=1)
+        for k in range(0, len(pendientes), 100)
+    ])
+    mejor = np.argmax(internos_por_candidato)
+
+    internos = np.abs(y - (interceptos[mejor] + pendientes[mejor] * x)) < umbral
+    if internos.sum() < 2:
+        return pendientes[mejor], interceptos[mejor]
+    ajuste = ajustar(momentos(x[internos], y[internos]))
+    return ajuste.pendiente, ajuste.intercepto
+
+
+ESTIMADORES_ROBUSTOS = {
+    "Theil-Sen": theil_sen,
+    "Huber (IRLS)": huber_irls,
+    "RANSAC": ransac,
+}
+
+
+def ajustar_robusto(nombre, x, y):
+    """(pendiente, intercepto, segundos) del estimador `nombre`; función de módulo para poder enviarla a otro proceso."""
+    inicio = time.perf_counter()
+    pendiente, intercepto = ESTIMADORES_ROBUSTOS[nombre](x, y)
+    return pendiente, intercepto, time.perf_counter() - inicio
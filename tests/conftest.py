@@ -0,0 +1,5 @@
+# Los módulos del proyecto viven en la raíz del repositorio, junto a las páginas
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
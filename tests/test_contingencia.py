@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+from scipy.stats import chi2_contingency
+
+from contingencia import (_lote_permutaciones, chi2_disperso, conteos_contingencia, factorizar, matriz_asociacion,
+                          prueba_permutacion)
+
+
+@pytest.fixture
+def columnas():
+    rng = np.random.default_rng(0)
+    filas = pd.Series(rng.choice(["a", "b", "c"], 600, p=[0.5, 0.3, 0.2]))
+    columnas = pd.Series(np.where(filas == "a", rng.choice(["x", "y", "z", "w"], 600), rng.choice(["x", "y"], 600)))
+    return filas, columnas
+
+
+@pytest.fixture
+def independientes():
+    rng = np.random.default_rng(1)
+    return pd.Series(rng.choice(["a", "b", "c"], 400)), pd.Series(rng.choice(["x", "y", "z"], 400))
+
+
+def test_chi2_disperso_igual_a_scipy(columnas):
+    conteos, _, _ = conteos_contingencia(*columnas)
+    esperado = chi2_contingency(conteos, correction=False)
+    for matriz in (conteos, sparse.csr_matrix(conteos)):
+        chi2, p_value, dof = chi2_disperso(matriz)
+        assert chi2 == pytest.approx(esperado[0])
+        assert p_value == pytest.approx(esperado[1])
+        assert dof == esperado[2]
+
+
+def test_conteos_dispersos_igual_a_crosstab(columnas):
+    conteos, categorias_f, categorias_c = conteos_contingencia(*columnas, limite_denso=0)
+    assert sparse.issparse(conteos)
+    esperado = pd.crosstab(*columnas).reindex(index=categorias_f, columns=categorias_c, fill_value=0)
+    np.testing.assert_array_equal(conteos.toarray(), esperado.to_numpy())
+
+
+def test_matriz_asociacion_igual_a_scipy(columnas):
+    df = pd.DataFrame({"f": columnas[0], "c": columnas[1], "g": columnas[0].str.upper()})
+    asociaciones = matriz_asociacion(df, ["f", "c", "g"], n_procesos=1)
+    for a, b, chi2, p_value, dof in asociaciones[["Variable 1", "Variable 2", "Chi-Cuadrado", "Valor p", "gl"]].itertuples(index=False):
+        esperado = chi2_contingency(pd.crosstab(df[a], df[b]), correction=False)
+        assert chi2 == pytest.approx(esperado[0])
+        assert p_value == pytest.approx(esperado[1])
+        assert dof == esperado[2]
+
+
+def test_lote_permutaciones_no_depende_del_tamano_de_operacion(independientes):
+    codigos_f, _ = factorizar(independientes[0])
+    codigos_c, _ = factorizar(independientes[1])
+    n_columnas = int(codigos_c.max()) + 1
+    pesos = (1.0 / np.outer(np.bincount(codigos_f), np.bincount(codigos_c))).ravel()
+    semilla = np.random.SeedSequence(7)
+    umbral = float(np.dot(np.bincount(codigos_f * n_columnas + codigos_c, minlength=len(pesos)) ** 2.0, pesos))
+    conteos = {max_elementos: _lote_permutaciones(codigos_f, codigos_c, n_columnas, pesos, semilla, 100, umbral * 0.999,
+                                                  max_elementos)
+               for max_elementos in (1, 10 * len(codigos_c), 10**9)}
+    assert len(set(conteos.values())) == 1
+
+
+def test_prueba_permutacion_reproducible_y_cercana_a_chi2(independientes):
+    codigos_f, _ = factorizar(independientes[0])
+    codigos_c, _ = factorizar(independientes[1])
+    resultado = prueba_permutacion(codigos_f, codigos_c, max_permutaciones=2_000, semilla=3, tolerancia=0)
+    repetido = prueba_permutacion(codigos_f, codigos_c, max_permutaciones=2_000, semilla=3, tolerancia=0, n_procesos=1)
+    esperado = chi2_contingency(pd.crosstab(*independientes), correction=False)
+    assert resultado["p_valor"] == repetido["p_valor"]
+    assert resultado["permutaciones"] == 2_000
+    assert resultado["estadistico"] == pytest.approx(esperado[0])
+    assert resultado["p_valor"] == pytest.approx(esperado[1], abs=0.05)
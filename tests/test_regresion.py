@@ -0,0 +1,87 @@
+import io
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import linregress
+
+from regresion import (ESTIMADORES_ROBUSTOS, MOMENTOS_VACIOS, _lote_bootstrap, ajustar, ajustar_multiple, ajustar_robusto,
+                       bootstrap_regresion, combinar, gram_por_bloques, momentos)
+
+
+@pytest.fixture
+def datos_con_outliers():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 10, 500)
+    y = 2.0 * x + 1.0 + rng.normal(0, 0.1, 500)
+    y[:10] += 50  # outliers que un ajuste robusto debe ignorar
+    return x, y
+
+
+@pytest.mark.parametrize("nombre", list(ESTIMADORES_ROBUSTOS))
+def test_ajustar_robusto(nombre, datos_con_outliers):
+    x, y = datos_con_outliers
+    pendiente, intercepto, segundos = ajustar_robusto(nombre, x, y)
+    assert pendiente == pytest.approx(2.0, abs=0.1)
+    assert intercepto == pytest.approx(1.0, abs=0.5)
+    assert segundos >= 0
+
+
+@pytest.fixture
+def datos_multiples():
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame(rng.normal(size=(300, 3)), columns=["a", "b", "c"])
+    df["y"] = 1.5 * df["a"] - 2.0 * df["b"] + 0.5 * df["c"] + 3.0 + rng.normal(0, 0.3, 300)
+    return df
+
+
+def test_momentos_combinados_igual_a_linregress(datos_multiples):
+    x, y = datos_multiples["a"].to_numpy(), datos_multiples["y"].to_numpy()
+    m = reduce(combinar, (momentos(x[i:i + 70], y[i:i + 70]) for i in range(0, len(x), 70)), MOMENTOS_VACIOS)
+    assert m.n == len(x)
+    assert m.media_x == pytest.approx(x.mean())
+    assert m.m2_x == pytest.approx(((x - x.mean()) ** 2).sum())
+    assert m.c_xy == pytest.approx(((x - x.mean()) * (y - y.mean())).sum())
+
+    ajuste, esperado = ajustar(m), linregress(x, y)
+    assert ajuste.pendiente == pytest.approx(esperado.slope)
+    assert ajuste.intercepto == pytest.approx(esperado.intercept)
+    assert ajuste.r == pytest.approx(esperado.rvalue)
+    assert ajuste.p_valor == pytest.approx(esperado.pvalue, abs=1e-12)
+    assert ajuste.error_estandar == pytest.approx(esperado.stderr)
+    assert ajuste.error_intercepto == pytest.approx(esperado.intercept_stderr)
+
+
+def test_gram_por_bloques_igual_a_lstsq(datos_multiples):
+    columnas = ("a", "b", "c", "y")
+    gram = gram_por_bloques(io.StringIO(datos_multiples.to_csv(index=False)), columnas, filas_por_bloque=37)
+    tabla, resumen = ajustar_multiple(gram, "y", ["a", "b", "c"])
+
+    diseno = np.column_stack([np.ones(len(datos_multiples)), datos_multiples[["a", "b", "c"]].to_numpy()])
+    coeficientes, sse, _, _ = np.linalg.lstsq(diseno, datos_multiples["y"].to_numpy(), rcond=None)
+    np.testing.assert_allclose(tabla["Coeficiente"].to_numpy(), coeficientes, rtol=1e-10)
+    sst = ((datos_multiples["y"] - datos_multiples["y"].mean()) ** 2).sum()
+    assert resumen["r2"] == pytest.approx(1 - sse[0] / sst)
+
+
+def test_lote_bootstrap_igual_a_reajustar_cada_remuestra(datos_multiples):
+    x, y = datos_multiples["a"].to_numpy(), datos_multiples["y"].to_numpy()
+    semilla = np.random.SeedSequence(5)
+    pendientes, interceptos = _lote_bootstrap(x, y, semilla, 20, max_elementos=7 * len(x))
+
+    # Las mismas remuestras, generadas y ajustadas una por una
+    rng = np.random.default_rng(semilla)
+    indices = np.concatenate([rng.integers(0, len(x), size=(b, len(x))) for b in (7, 7, 6)])
+    esperadas = np.array([np.polyfit(x[i], y[i], 1) for i in indices])
+    np.testing.assert_allclose(pendientes, esperadas[:, 0], rtol=1e-8)
+    np.testing.assert_allclose(interceptos, esperadas[:, 1], rtol=1e-8)
+
+
+def test_bootstrap_regresion_reproducible(datos_multiples):
+    x, y = datos_multiples["a"].to_numpy(), datos_multiples["y"].to_numpy()
+    resultado = bootstrap_regresion(x, y, n_remuestras=300, remuestras_por_lote=64, semilla=1)
+    repetido = bootstrap_regresion(x, y, n_remuestras=300, remuestras_por_lote=64, semilla=1, n_procesos=1)
+    np.testing.assert_array_equal(resultado["pendientes"], repetido["pendientes"])
+    inferior, superior = resultado["intervalo_pendiente"]
+    assert inferior < linregress(x, y).slope < superior
@@ -0,0 +1,180 @@
+# trabajos.py (cálculos largos fuera del hilo de la página, con avance y cancelación)
+#
+# La prueba de permutación, el bootstrap, la matriz de asociación o los estimadores robustos
+# corrían dentro del script de Streamlit: la sesión quedaba ocupada hasta que terminaban y, si el
+# usuario movía un control, el cálculo obsoleto seguía hasta el final. Aquí cada cálculo es un
+# trabajo que corre en uno de dos sitios:
+#   - en un hilo propio, si la función ya reparte su trabajo entre procesos e informa su avance
+#     con `al_progresar` (el hilo solo coordina; el cálculo está en los procesos);
+#   - en el pool de procesos compartido de procesos.py, si es un cálculo de un solo hilo.
+# En ambos casos el cálculo corre en el mismo pool de N_PROCESOS procesos, y un trabajo
+# cancelado conserva su lugar hasta que sus tareas dejan de ocupar procesos.
+# Cada sesión tiene un gestor con una ranura por tipo de cálculo: enviar un trabajo con otra
+# clave (otros valores de los controles) cancela el que ocupaba la ranura, y como mucho
+# MAX_TRABAJOS_SESION trabajos de la sesión corren a la vez; los demás esperan su turno.
+
+import threading
+import time
+from concurrent.futures import wait
+
+import streamlit as st
+
+from procesos import pool_compartido
+
+MAX_TRABAJOS_SESION = 2
+INTERVALO_PROGRESO = 0.5  # segundos entre consultas de avance y de cancelación
+CLAVE_GESTOR = "gestor_trabajos"
+
+
+class TrabajoCancelado(Exception):
+    """Se lanza dentro del trabajo (desde al_progresar) cuando se canceló."""
+
+
+class Trabajo:
+    """
+    Un cálculo en segundo plano. Con en_proceso=False la función se llama en un hilo con el
+    argumento `al_progresar`, que guarda el último avance y lanza TrabajoCancelado si el
+    trabajo se canceló; con en_proceso=True se envía al pool de procesos y, si se cancela
+    mientras corre, se espera a que termine y su resultado se descarta. En ambos casos el
+    trabajo ocupa su lugar en el cupo de la sesión hasta que el cálculo terminó de verdad.
+    `formato(*avance)` convierte el último avance en (fracción, texto) para la barra de progreso.
+    """
+
+    def __init__(self, clave, funcion, args, kwargs, en_proceso, formato, cupo):
+        self.clave = clave
+        self.formato = formato
+        self.avance = None
+        self.inicio = None
+        self.fin = None
+        self._valor = None
+        self._error = None
+        self._cancelado = threading.Event()
+        self._terminado = threading.Event()
+        threading.Thread(target=self._ejecutar, args=(funcion, args, kwargs, en_proceso, cupo),
+                         name="trabajo", daemon=True).start()
+
+    def _ejecutar(self, funcion, args, kwargs, en_proceso, cupo):
+        try:
+            # Espera un lugar entre los trabajos de la sesión, atento a una cancelación
+            while not cupo.acquire(timeout=INTERVALO_PROGRESO):
+                if self._cancelado.is_set():
+                    raise TrabajoCancelado
+            try:
+                self.inicio = time.perf_counter()
+                if en_proceso:
+                    futuro = pool_compartido().submit(funcion, *args, **kwargs)
+                    while not wait([futuro], timeout=INTERVALO_PROGRESO).done:
+                        if self._cancelado.is_set():
+                            # Si ya empezó no se puede interrumpir: el lugar se libera cuando termina
+                            if not futuro.cancel():
+                                wait([futuro])
+                            raise TrabajoCancelado
+                    self._valor = futuro.result()
+                else:
+                    self._valor = funcion(*args, al_progresar=self._avanzar, **kwargs)
+            finally:
+                cupo.release()
+        except TrabajoCancelado:
+            pass
+        except Exception as e:  # Se vuelve a lanzar en el hilo de la página, en resultado()
+            self._error = e
+        finally:
+            self.fin = time.perf_counter()
+            self._terminado.set()
+
+    def _avanzar(self, *avance):
+        if self._cancelado.is_set():
+            raise TrabajoCancelado
+        self.avance = avance
+
+    @property
+    def terminado(self):
+        return self._terminado.is_set()
+
+    @property
+    def cancelado(self):
+        return self._cancelado.is_set()
+
+    def cancelar(self):
+        self._cancelado.set()
+
+    def resultado(self):
+        if self._error is not None:
+            raise self._error
+        return self._valor
+
+    def progreso(self):
+        """(fracción o None si no se conoce, texto) para mostrar en la página."""
+        if self.inicio is None:
+            return None, "En espera: otros cálculos de esta sesión están en curso..."
+        if self.avance is None or self.formato is None:
+            return None, f"Calculando... ({time.perf_counter() - self.inicio:.0f} s)"
+        fraccion, texto = self.formato(*self.avance)
+        return min(max(fraccion, 0.0), 1.0), texto
+
+
+class GestorTrabajos:
+    """Trabajos de una sesión, uno por ranura, con un máximo de trabajos en ejecución a la vez."""
+
+    def __init__(self, max_trabajos=MAX_TRABAJOS_SESION):
+        self._cupo = threading.BoundedSemaphore(max_trabajos)
+        self._ranuras = {}
+
+    def enviar(self, ranura, clave, funcion, *args, en_proceso=False, formato=None, **kwargs):
+        """
+        Devuelve el trabajo de `ranura` si se envió con la misma `clave`; si no, cancela el que
+        hubiera (quedó obsoleto) y lanza uno nuevo.
+        """
+        actual = self._ranuras.get(ranura)
+        if actual is not None and actual.clave == clave:
+            return actual
+        if actual is not None:
+            actual.cancelar()
+        trabajo = Trabajo(clave, funcion, args, kwargs, en_proceso, formato, self._cupo)
+        self._ranuras[ranura] = trabajo
+        return trabajo
+
+    def cancelar(self, *ranuras):
+        """Cancela y olvida los trabajos de estas ranuras (p. ej. al desactivar la opción que los pidió)."""
+        for ranura in ranuras:
+            trabajo = self._ranuras.pop(ranura, None)
+            if trabajo is not None:
+                trabajo.cancelar()
+
+
+def gestor():
+    """Gestor de trabajos de la sesión actual."""
+    if CLAVE_GESTOR not in st.session_state:
+        st.session_state[CLAVE_GESTOR] = GestorTrabajos()
+    return st.session_state[CLAVE_GESTOR]
+
+
+def enviar_trabajo(ranura, clave, funcion, *args, **opciones):
+    """Atajo para gestor().enviar(...)."""
+    return gestor().enviar(ranura, clave, funcion, *args, **opciones)
+
+
+@st.fragment(run_every=INTERVALO_PROGRESO)
+def _mostrar_avance(trabajo, etiqueta):
+    if trabajo.terminado:
+        st.rerun()  # La página completa vuelve a ejecutarse y ahora encuentra el resultado
+    fraccion, texto = trabajo.progreso()
+    st.progress(fraccion if fraccion is not None else 0.0, text=f"{etiqueta} {texto}")
+    if st.button("Cancelar", key=f"cancelar_{id(trabajo)}"):
+        trabajo.cancelar()
+        st.rerun()
+
+
+def resultado_o_esperar(trabajo, etiqueta="Calculando..."):
+    """
+    Devuelve el resultado de `trabajo` si ya terminó. Si no, muestra su avance (un fragmento
+    que se refresca solo) y detiene la página en este punto; los controles siguen respondiendo,
+    y cuando el trabajo termina la página se vuelve a ejecutar.
+    """
+    if not trabajo.terminado:
+        _mostrar_avance(trabajo, etiqueta)
+        st.stop()
+    if trabajo.cancelado:
+        st.info("Cálculo cancelado. Cambia alguna opción para volver a calcular.")
+        st.stop()
+    return trabajo.resultado()